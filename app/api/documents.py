@@ -1,18 +1,45 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Depends
-from sqlalchemy.orm import Session
-from app.db.models.documents import PrimaryDocumentModel, SecondaryDocumentModel
-from app.db.models.subjects import SubjectModel
+import json
+from typing import List, Literal, Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Depends, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.documents import (
+    PrimaryDocumentListItem,
+    PrimaryDocumentPage,
     PrimaryDocumentResponse, 
+    SecondaryDocumentListItem,
+    SecondaryDocumentPage,
     SecondaryDocumentListResponse,
     SecondaryDocumentResponse,
     SecondaryDocumentCreate,
     SecondaryDocumentCreateResponse,
+    IngestionJobResponse,
 )
-from app.ingestion.splitter import DocumentProcessor
-from app.service.workflow import document_workflow
+from app.ingestion.convertor import converter
+from app.service.ingestion import (
+    PRIMARY_FIELDS,
+    IngestionError,
+    afind_duplicate_primary,
+    afind_duplicate_secondary,
+    aget_primary_or_raise,
+    aload_primary_context,
+    build_duplicate_response,
+    ingest_primary,
+    ingest_secondary,
+)
+from app.service.bulk_ingestion import save_bulk_files, remove_bulk_files, ingest_secondaries
+from app.service.documents import (
+    InvalidCursorError,
+    delete_primary_document,
+    get_primary_document as query_primary_document,
+    list_primary_documents as query_primary_documents,
+    list_secondary_documents,
+)
+from app.service.export import export_documents
+from app.service.job_queue import job_queue
 from datetime import datetime
-from app.db.session import get_db_session
+from app.db.session import AsyncSessionLocal, get_async_db_session
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,8 +50,29 @@ router = APIRouter(
     responses={404: {"description": "Not found"}}
 )
 
-async def create_document_processor(collection_name: str):
-    return DocumentProcessor(collection_name=collection_name)
+async def enqueue_upload(db: AsyncSession, kind: str, file: UploadFile, content_hash: str, params: dict, force_reprocess: bool):
+    """
+    Grava o upload na fila de ingestão e responde 202 com o ID do job.
+
+    O conteúdo vai para o job como um único bytea (os workers podem rodar em
+    outras máquinas): uma leitura só do upload, feita pelo Starlette em uma
+    thread, sem cópia intermediária em disco.
+    """
+    job = await job_queue.aenqueue(
+        db,
+        kind=kind,
+        filename=file.filename,
+        payload=await file.read(),
+        content_hash=content_hash,
+        params=jsonable_encoder(params),
+        force_reprocess=force_reprocess
+    )
+    return JSONResponse(status_code=202, content={
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": router.url_path_for("get_ingestion_job", job_id=job.id),
+        "message": f"Documento {params['document_name']} enfileirado para processamento"
+    })
 
 @router.post("/upload_primary", summary="Faz upload e cria documento primário")
 async def create_primary(
@@ -36,99 +84,43 @@ async def create_primary(
     presented_by: str = Form(...),
     presented_at: datetime = Form(...),
     link: str = Form(..., description="Link do documento"),
-    db: Session = Depends(get_db_session)
+    force_reprocess: bool = Form(False, description="Reprocessa mesmo que o arquivo já tenha sido ingerido"),
+    run_async: bool = Form(False, description="Enfileira o processamento e retorna 202 com o ID do job"),
+    db: AsyncSession = Depends(get_async_db_session)
 ):
-    logger.info(f"Iniciando processamento do documento primário {document_name}")
+    params = {
+        "document_type": document_type,
+        "document_name": document_name,
+        "document_number": document_number,
+        "document_year": document_year,
+        "presented_by": presented_by,
+        "presented_at": presented_at,
+        "link": link,
+    }
     
     try:
-        collection_name = f"{document_type}_{document_name}"
-        
-        workflow_result = await document_workflow.process_document(
-            file=file,
-            filename=file.filename,
-            db_session=db,
-            primary_id=None
-        )
+        # Deduplicação pelo conteúdo do arquivo
+        content_hash = await converter.compute_hash(file)
         
-        # Verificar se o workflow foi bem-sucedido
-        if workflow_result["processing_status"] == "error":
-            logger.error(f"Erro no workflow: {workflow_result['error_message']}")
-            raise HTTPException(status_code=500, detail=workflow_result["error_message"])
+        if run_async:
+            if not force_reprocess:
+                existing = await afind_duplicate_primary(db, content_hash)
+                if existing:
+                    return build_duplicate_response(existing)
+            return await enqueue_upload(db, "primary", file, content_hash, params, force_reprocess)
         
-        # Verificar se documento é irrelevante
-        if workflow_result["processing_status"] == "irrelevant":
-            logger.warning(f"Documento {document_name} marcado como irrelevante")
-            return {
-                "document_name": document_name,
-                "status": "irrelevant",
-                "relevance_score": workflow_result["relevance_score"],
-                "reason": workflow_result["irrelevance_reasons"][0] if workflow_result["irrelevance_reasons"] else "Não relacionado ao mercado de energia",
-                "message": "Documento processado mas marcado como irrelevante"
-            }
-        
-        # Criar documento no banco com resultados do workflow
-        document = PrimaryDocumentModel(
+        # Ingestão na própria requisição (cada etapa abre sua sessão com o banco)
+        return await ingest_primary(
+            params,
             filename=file.filename,
-            document_type=document_type,
-            collection_name=collection_name,
-            summary=workflow_result["summary"],
-            central_theme=workflow_result["central_theme"],
-            key_points=workflow_result["key_points"],
-            document_number=document_number,
-            document_year=document_year,
-            document_name=document_name,
-            presented_by=presented_by,
-            presented_at=presented_at,
-            link=link
-        )
-        
-        db.add(document)
-        db.flush()  # Para obter o ID
-        
-        # Associar subjects identificados pelo workflow
-        for subject_name in workflow_result["subjects"]:
-            subject = db.query(SubjectModel).filter(SubjectModel.name == subject_name).first()
-            if subject:
-                document.subjects.append(subject)
-        
-        # Processar e armazenar chunks no vector store
-        splitter = await create_document_processor(collection_name)
-        processed_chunks = splitter.process_and_store_document(
-            md_text=workflow_result["summary"], 
-            doc_id=document.id, 
-            filename=file.filename, 
-            document_type=document_type,
-            subjects=workflow_result["subjects"]
+            content_hash=content_hash,
+            force_reprocess=force_reprocess,
+            file=file
         )
         
-        db.commit()
-        
-        logger.info(f"Documento primário {document_name} processado com sucesso")
-        
-        return {
-            "document_name": document_name,
-            "document_id": document.id,
-            "processing_status": workflow_result["processing_status"],
-            "subjects": workflow_result["subjects"],
-            "central_theme": workflow_result["central_theme"],
-            "key_points": workflow_result["key_points"],
-            "relevance_score": workflow_result["relevance_score"],
-            "chunks_processed": processed_chunks,
-            "message": f"{processed_chunks} chunks indexados na coleção '{collection_name}'"
-        }
-        
-    except HTTPException:
-        raise
+    except IngestionError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
-        # Cleanup em caso de erro
-        if 'document' in locals() and hasattr(document, 'id') and document.id:
-            db.rollback()
-            try:
-                splitter = await create_document_processor(collection_name)
-                splitter.delete_document_from_vector_db(document.id)
-            except:
-                pass  # Falha no cleanup não deve quebrar o erro principal
-        
         logger.error(f"Erro ao processar documento primário {document_name}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao processar documento: {str(e)}")
 
@@ -145,167 +137,230 @@ async def create_secondary(
     role: str = Form(..., description="Cargo do autor"),
     party_affiliation: str = Form(..., description="Partido político do autor"),
     link: str = Form(..., description="Link do documento"),
-    db: Session = Depends(get_db_session)
+    force_reprocess: bool = Form(False, description="Reprocessa mesmo que o arquivo já tenha sido ingerido"),
+    run_async: bool = Form(False, description="Enfileira o processamento e retorna 202 com o ID do job"),
+    db: AsyncSession = Depends(get_async_db_session)
 ):
-    logger.info(f"Iniciando processamento do documento secundário {document_name}")
+    params = {
+        "document_type": document_type,
+        "document_name": document_name,
+        "document_number": document_number,
+        "document_year": document_year,
+        "presented_by": presented_by,
+        "presented_at": presented_at,
+        "link": link,
+        "primary_id": primary_id,
+        "role": role,
+        "party_affiliation": party_affiliation,
+    }
     
     try:
-        # Verificar se documento primário existe
-        primary = db.query(PrimaryDocumentModel).filter(PrimaryDocumentModel.id == primary_id).first()
-        if not primary:
-            raise HTTPException(status_code=404, detail=f"Documento primário com ID {primary_id} não encontrado")
+        # Deduplicação pelo conteúdo do arquivo (no escopo do documento primário)
+        content_hash = await converter.compute_hash(file)
         
-        workflow_result = await document_workflow.process_document(
-            file=file,
-            filename=file.filename,
-            db_session=db,
-            primary_id=primary_id
-        )
+        if run_async:
+            primary = await aget_primary_or_raise(db, primary_id)
+            if not force_reprocess:
+                existing = await afind_duplicate_secondary(db, primary_id, content_hash)
+                if existing:
+                    return build_duplicate_response(existing, primary_document=primary.document_name)
+            return await enqueue_upload(db, "secondary", file, content_hash, params, force_reprocess)
         
-        # Verificar se o workflow foi bem-sucedido
-        if workflow_result["processing_status"] == "error":
-            logger.error(f"Erro no workflow: {workflow_result['error_message']}")
-            raise HTTPException(status_code=500, detail=workflow_result["error_message"])
-        
-        # Verificar se documento é irrelevante
-        if workflow_result["processing_status"] == "irrelevant":
-            logger.warning(f"Documento secundário {document_name} marcado como irrelevante")
-            return {
-                "document_name": document_name,
-                "status": "irrelevant", 
-                "primary_document": primary.document_name,
-                "relevance_score": workflow_result["relevance_score"],
-                "reason": workflow_result["irrelevance_reasons"][0] if workflow_result["irrelevance_reasons"] else "Não relacionado ao mercado de energia",
-                "message": "Documento processado mas marcado como irrelevante"
-            }
-        
-        # Criar documento secundário no banco com resultados do workflow
-        document = SecondaryDocumentModel(
+        return await ingest_secondary(
+            params,
             filename=file.filename,
-            document_type=document_type,
-            document_name=document_name,
-            presented_by=presented_by,
-            presented_at=presented_at,
-            summary=workflow_result["summary"],  # Summary contextualizado
-            central_theme=workflow_result["central_theme"],
-            key_points=workflow_result["key_points"],
-            party_affiliation=party_affiliation,
-            role=role,
-            document_number=document_number,
-            document_year=document_year,
-            primary_id=primary_id,
-            link=link
+            content_hash=content_hash,
+            force_reprocess=force_reprocess,
+            file=file
         )
         
-        db.add(document)
-        db.flush()  # Para obter o ID
+    except IngestionError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        logger.error(f"Erro ao processar documento secundário {document_name}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao processar documento: {str(e)}")
+
+@router.post("/upload_bulk", summary="Faz upload de um documento primário e de vários secundários")
+async def create_bulk(
+    files: Optional[List[UploadFile]] = File(None, description="PDFs dos documentos secundários"),
+    archive: Optional[UploadFile] = File(None, description="Zip com os PDFs dos secundários (e, opcionalmente, metadata.json)"),
+    metadata: Optional[str] = Form(None, description="JSON {nome_do_arquivo: campos do secundário}; sobrepõe o metadata.json do zip"),
+    primary_id: Optional[int] = Form(None, description="ID de um documento primário já ingerido"),
+    primary_file: Optional[UploadFile] = File(None, description="PDF do documento primário (em vez de primary_id)"),
+    primary_metadata: Optional[str] = Form(None, description="JSON com os campos do documento primário"),
+    force_reprocess: bool = Form(False, description="Reprocessa mesmo que os arquivos já tenham sido ingeridos")
+):
+    if (primary_id is None) == (primary_file is None):
+        raise HTTPException(status_code=400, detail="Informe primary_id ou primary_file (e primary_metadata)")
+    if not files and archive is None:
+        raise HTTPException(status_code=400, detail="Nenhum documento secundário enviado (files ou archive)")
+    
+    try:
+        form_metadata = json.loads(metadata) if metadata else {}
+        primary_params = json.loads(primary_metadata) if primary_metadata else None
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"JSON de metadados inválido: {e}")
+    if not isinstance(form_metadata, dict):
+        raise HTTPException(status_code=400, detail="metadata deve ser um objeto {nome_do_arquivo: campos}")
+    if primary_params is not None:
+        if not isinstance(primary_params, dict):
+            raise HTTPException(status_code=400, detail="primary_metadata deve ser um objeto com os campos do documento primário")
+        missing = [field for field in PRIMARY_FIELDS if primary_params.get(field) is None]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Campos ausentes em primary_metadata: {', '.join(missing)}")
+    
+    bulk_files = []
+    try:
+        primary_result = None
+        if primary_file is not None:
+            if not primary_params:
+                raise HTTPException(status_code=400, detail="primary_metadata é obrigatório com primary_file")
+            primary_result = await ingest_primary(
+                primary_params,
+                filename=primary_file.filename,
+                content_hash=await converter.compute_hash(primary_file),
+                force_reprocess=force_reprocess,
+                file=primary_file
+            )
+            if primary_result.get("status") == "irrelevant":
+                return {"primary": primary_result, "results": [], "message": "Documento primário marcado como irrelevante; secundários não processados"}
+            primary_id = primary_result["document_id"]
         
-        for subject_name in workflow_result["subjects"]:
-            subject = db.query(SubjectModel).filter(SubjectModel.name == subject_name).first()
-            if subject:
-                document.subjects.append(subject)
+        # Contexto do primário carregado uma única vez para todo o lote, em uma
+        # sessão curta (nenhuma conexão fica retida durante o processamento)
+        async with AsyncSessionLocal() as db:
+            primary = await aload_primary_context(db, primary_id)
         
-        # Processar e armazenar chunks no vector store
-        splitter = await create_document_processor(primary.collection_name)
-        processed_chunks = splitter.process_and_store_document(
-            md_text=workflow_result["summary"], 
-            doc_id=document.id, 
-            filename=file.filename, 
-            document_type=document_type,
-            parent_id=primary_id,
-            subjects=workflow_result["subjects"]
+        bulk_files, archive_metadata = await save_bulk_files(files, archive)
+        results = await ingest_secondaries(
+            primary,
+            bulk_files,
+            {**archive_metadata, **form_metadata},
+            force_reprocess=force_reprocess
         )
         
-        db.commit()
-        
-        logger.info(f"Documento secundário {document_name} processado com sucesso")
-        
+        failed = sum(1 for result in results if result["status"] == "error")
         return {
-            "document_name": document_name,
-            "document_id": document.id,
+            "primary_id": primary.id,
             "primary_document": primary.document_name,
-            "processing_status": workflow_result["processing_status"],
-            "subjects": workflow_result["subjects"],
-            "central_theme": workflow_result["central_theme"],
-            "key_points": workflow_result["key_points"],
-            "relevance_score": workflow_result["relevance_score"],
-            "chunks_processed": processed_chunks,
-            "message": f"{processed_chunks} chunks indexados na coleção '{primary.collection_name}'"
+            "primary": primary_result,
+            "total": len(results),
+            "failed": failed,
+            "results": results,
+            "message": f"{len(results) - failed} de {len(results)} documentos secundários processados"
         }
         
     except HTTPException:
         raise
+    except IngestionError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
-        # Cleanup em caso de erro
-        if 'document' in locals() and hasattr(document, 'id') and document.id:
-            db.rollback()
-            try:
-                splitter = await create_document_processor(primary.collection_name)
-                splitter.delete_document_from_vector_db(document.id)
-            except:
-                pass  # Falha no cleanup não deve quebrar o erro principal
-        
-        logger.error(f"Erro ao processar documento secundário {document_name}: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Erro ao processar documento: {str(e)}")
+        logger.error(f"Erro na ingestão em lote: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro na ingestão em lote: {str(e)}")
+    finally:
+        remove_bulk_files(bulk_files)
+
+@router.get("/jobs/{job_id}", summary="Obtém o status de um job de ingestão", response_model=IngestionJobResponse)
+async def get_ingestion_job(job_id: str, db: AsyncSession = Depends(get_async_db_session)):
+    job = await job_queue.aget(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' não encontrado")
+    return IngestionJobResponse.model_validate(job)
 
 # ==================== ENDPOINTS AUXILIARES ====================
 
-@router.get("/", summary="Lista todos os documentos principais")
-def list_primary_documents(db: Session = Depends(get_db_session)):
-    documents = db.query(PrimaryDocumentModel).all()
-    return [PrimaryDocumentResponse.model_validate(document) for document in documents]
+def page_response(page, page_schema, full_schema, compact_schema, view: str):
+    schema = compact_schema if view == "compact" else full_schema
+    return page_schema(
+        items=[schema.model_validate(document) for document in page.items],
+        next_cursor=page.next_cursor
+    )
+
+@router.get("/", summary="Lista os documentos principais (paginado por cursor)", response_model=PrimaryDocumentPage)
+async def list_primary_documents(
+    limit: int = Query(50, ge=1, le=200, description="Tamanho da página"),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    document_year: Optional[int] = Query(None, description="Filtra pelo ano do documento"),
+    document_type: Optional[str] = Query(None, description="Filtra pelo tipo do documento"),
+    subject: Optional[str] = Query(None, description="Filtra pelo nome de um subject"),
+    view: Literal["full", "compact"] = Query("full", description="compact omite summary e key_points"),
+    db: AsyncSession = Depends(get_async_db_session)
+):
+    try:
+        page = await query_primary_documents(
+            db,
+            limit=limit,
+            cursor=cursor,
+            document_year=document_year,
+            document_type=document_type,
+            subject=subject,
+            compact=view == "compact"
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return page_response(page, PrimaryDocumentPage, PrimaryDocumentResponse, PrimaryDocumentListItem, view)
+
+@router.get("/export", summary="Exporta todos os documentos em NDJSON (streaming)")
+async def export_all_documents(
+    kind: Literal["primary", "secondary", "all"] = Query("all", description="Tipos de documento exportados"),
+    compress: bool = Query(False, description="Compacta a saída com gzip (.ndjson.gz)"),
+):
+    kinds = ["primary", "secondary"] if kind == "all" else [kind]
+    filename = f"documents_{kind}.ndjson" + (".gz" if compress else "")
+    return StreamingResponse(
+        export_documents(kinds, compress=compress),
+        media_type="application/gzip" if compress else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @router.get("/primary/{doc_id}", summary="Obtém documento primário por ID")
-def get_primary_document(doc_id: int, db: Session = Depends(get_db_session)):
-    document = db.query(PrimaryDocumentModel).filter(PrimaryDocumentModel.id == doc_id).first()
+async def get_primary_document(doc_id: int, db: AsyncSession = Depends(get_async_db_session)):
+    document = await query_primary_document(db, doc_id)
     if not document:
         raise HTTPException(status_code=404, detail=f"Documento primário com ID {doc_id} não encontrado")
     return PrimaryDocumentResponse.model_validate(document)
 
 @router.delete("/{doc_id}", summary="Remove documento principal e secundários")
-async def delete_document(doc_id: int, db: Session = Depends(get_db_session)):
+async def delete_document(doc_id: int, db: AsyncSession = Depends(get_async_db_session)):
     try:
-        # Verificar existência
-        primary_document = db.query(PrimaryDocumentModel).filter(PrimaryDocumentModel.id == doc_id).first()
-        if not primary_document:
+        removed_secondaries = await delete_primary_document(db, doc_id)
+        if removed_secondaries is None:
             raise HTTPException(status_code=404, detail=f"Documento '{doc_id}' não encontrado")
         
-        secondary_documents = db.query(SecondaryDocumentModel).filter(SecondaryDocumentModel.primary_id == doc_id).all()
-        
-        # Remover do vector store
-        splitter = await create_document_processor(primary_document.collection_name)
-        
-        try:
-            splitter.delete_document_from_vector_db(doc_id)
-        except Exception as e:
-            logger.error(f"Erro ao remover coleção '{primary_document.collection_name}' do vector store: {str(e)}")
-        
-        # Remover documentos secundários
-        for secondary in secondary_documents:
-            try:
-                secondary_splitter = await create_document_processor(secondary.collection_name)
-                secondary_splitter.delete_document_from_vector_db(secondary.id)
-            except Exception as e:
-                logger.error(f"Erro ao remover documento secundário {secondary.id}: {str(e)}")
-            db.delete(secondary)
-        
-        # Remover documento principal
-        db.delete(primary_document)
-        db.commit()
-        
         return {
             "doc_id": doc_id,
-            "message": f"Documento principal e {len(secondary_documents)} secundários removidos"
+            "message": f"Documento principal e {removed_secondaries} secundários removidos"
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Erro ao deletar documento {doc_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Erro ao deletar documento")
 
-@router.get("/secondary/{primary_id}", summary="Lista documentos secundários por ID do documento principal")
-def list_secondary_documents_by_primary(primary_id: int, db: Session = Depends(get_db_session)):
-    documents = db.query(SecondaryDocumentModel).filter(SecondaryDocumentModel.primary_id == primary_id).all()
-    return [SecondaryDocumentResponse.model_validate(document) for document in documents]
\ No newline at end of file
+@router.get("/secondary/{primary_id}", summary="Lista documentos secundários por ID do documento principal (paginado por cursor)", response_model=SecondaryDocumentPage)
+async def list_secondary_documents_by_primary(
+    primary_id: int,
+    limit: int = Query(50, ge=1, le=200, description="Tamanho da página"),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    document_year: Optional[int] = Query(None, description="Filtra pelo ano do documento"),
+    document_type: Optional[str] = Query(None, description="Filtra pelo tipo do documento"),
+    subject: Optional[str] = Query(None, description="Filtra pelo nome de um subject"),
+    view: Literal["full", "compact"] = Query("full", description="compact omite summary e key_points"),
+    db: AsyncSession = Depends(get_async_db_session)
+):
+    try:
+        page = await list_secondary_documents(
+            db,
+            primary_id,
+            limit=limit,
+            cursor=cursor,
+            document_year=document_year,
+            document_type=document_type,
+            subject=subject,
+            compact=view == "compact"
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return page_response(page, SecondaryDocumentPage, SecondaryDocumentResponse, SecondaryDocumentListItem, view)
@@ -0,0 +1,26 @@
+from fastapi import APIRouter
+from app.db.session import async_engine, get_pool_status
+from app.vectorization.registry import vectorstore_registry
+from app.vectorization.embeddings import get_embeddings
+from app.service.llm_cache import llm_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"],
+    responses={404: {"description": "Not found"}}
+)
+
+@router.get("/", summary="Métricas de uso de recursos do processo")
+def get_metrics():
+    return {
+        "database_pool": get_pool_status(),
+        "async_database_pool": get_pool_status(async_engine.sync_engine),
+        "vector_stores": {
+            "cached_collections": len(vectorstore_registry.collections()),
+        },
+        "embedding_cache": get_embeddings().get_stats(),
+        "llm_cache": llm_cache.get_stats(),
+    }
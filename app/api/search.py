@@ -0,0 +1,97 @@
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query
+from app.schemas.search_schemas import WeightedSearchRequest
+from app.vectorization.search import CorpusSearch, HybridSearch, SearchFilter
+from app.vectorization.vector_store import WeightedVectorStore
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/search",
+    tags=["search"],
+    responses={404: {"description": "Not found"}}
+)
+
+@router.get("/", summary="Busca híbrida (full-text + vetorial) nos chunks de uma coleção")
+async def search(
+    query: str = Query(..., min_length=1, description="Texto da consulta; aceita \"frase exata\", -termo e OR"),
+    collection_name: str = Query(..., description="Nome da coleção"),
+    k: int = Query(4, ge=1, le=100, description="Número de resultados"),
+    document_type: Optional[str] = Query(None, description="Filtra pelo tipo do documento"),
+    doc_id: Optional[int] = Query(None, description="Filtra pelo ID do documento"),
+    primary_only: bool = Query(False, description="Apenas chunks de documentos principais"),
+):
+    filters = {
+        "document_type": document_type,
+        "doc_id": doc_id,
+        "hierarchy_level": 0 if primary_only else None,
+    }
+
+    try:
+        hybrid = HybridSearch(SearchFilter(collection_name, default_filters={}))
+        results = await hybrid.asearch(query, k=k, filters=filters)
+        return {
+            "query": query,
+            "collection_name": collection_name,
+            "results": results
+        }
+    except Exception as e:
+        logger.error(f"Erro na busca '{query}' em '{collection_name}': {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro na busca: {str(e)}")
+
+@router.get("/corpus", summary="Busca vetorial em todas as coleções, agrupada por documento primário")
+async def search_corpus(
+    query: str = Query(..., min_length=1, description="Texto da consulta"),
+    k: int = Query(5, ge=1, le=50, description="Número de documentos primários"),
+    chunks_per_document: int = Query(3, ge=1, le=20, description="Chunks retornados por documento"),
+    collections: Optional[List[str]] = Query(None, description="Restringe às coleções informadas"),
+    document_types: Optional[List[str]] = Query(None, description="Restringe aos tipos de documento primário"),
+    years: Optional[List[int]] = Query(None, description="Restringe aos anos dos documentos primários"),
+    primary_only: bool = Query(False, description="Apenas chunks de documentos principais"),
+):
+    try:
+        results = await CorpusSearch().asearch(
+            query,
+            k=k,
+            chunks_per_document=chunks_per_document,
+            collections=collections,
+            document_types=document_types,
+            years=years,
+            filter={"hierarchy_level": 0} if primary_only else None
+        )
+        return {
+            "query": query,
+            "results": results
+        }
+    except Exception as e:
+        logger.error(f"Erro na busca '{query}' no corpus: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro na busca: {str(e)}")
+
+@router.post("/weighted", summary="Busca vetorial com pesos por tipo de documento")
+async def weighted_search(request: WeightedSearchRequest):
+    try:
+        store = WeightedVectorStore(request.collection_name)
+        documents = await store.asimilarity_search(
+            request.query,
+            k=request.k,
+            document_type=request.document_type,
+            weights=request.weights,
+            default_weight=request.default_weight
+        )
+        return {
+            "query": request.query,
+            "collection_name": request.collection_name,
+            "results": [
+                {
+                    "id": document.id,
+                    "content": document.page_content,
+                    "metadata": document.metadata,
+                    "score": document.metadata["relevance_score"],
+                }
+                for document in documents
+            ]
+        }
+    except Exception as e:
+        logger.error(f"Erro na busca ponderada '{request.query}' em '{request.collection_name}': {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro na busca: {str(e)}")
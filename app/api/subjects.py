@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Depends
 from typing import List
-from sqlalchemy.orm import Session
-from app.db.models.subjects import SubjectModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.subjects_schemas import (
     SubjectResponse
 )
-from app.db.session import get_db_session
+from app.db.session import get_async_db_session
+from app.service.subjects import list_subjects as query_subjects
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,6 +17,6 @@ router = APIRouter(
 )
 
 @router.get("/", summary="Lista todos os assuntos", response_model=List[SubjectResponse])
-async def list_subjects(db: Session = Depends(get_db_session)):
-    subjects = db.query(SubjectModel).all()
-    return [SubjectResponse.model_validate(subject) for subject in subjects]
\ No newline at end of file
+async def list_subjects(db: AsyncSession = Depends(get_async_db_session)):
+    subjects = await query_subjects(db)
+    return [SubjectResponse.model_validate(subject) for subject in subjects]
@@ -11,6 +11,70 @@ class Settings(BaseModel):
     database_url: str = os.getenv("DATABASE_URL")
     chunk_size: int = 1000
     chunk_overlap: int = 100
+    # Pool de conexões compartilhado pelo ORM e pelo vector store
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    db_pool_timeout: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # Cache de respostas dos LLMs (memória local + Postgres)
+    llm_cache_enabled: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    llm_cache_ttl_seconds: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+    llm_cache_local_size: int = int(os.getenv("LLM_CACHE_LOCAL_SIZE", "1024"))
+    llm_cache_max_rows: int = int(os.getenv("LLM_CACHE_MAX_ROWS", "50000"))
+    # Modo de análise pós-resumo: "per_stage" (4 chamadas) ou "combined" (1 chamada)
+    analysis_mode: str = os.getenv("ANALYSIS_MODE", "per_stage")
+    # Sumarização map-reduce para documentos longos
+    summary_map_reduce_threshold_tokens: int = int(os.getenv("SUMMARY_MAP_REDUCE_THRESHOLD_TOKENS", "60000"))
+    summary_section_tokens: int = int(os.getenv("SUMMARY_SECTION_TOKENS", "12000"))
+    summary_max_concurrency: int = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "5"))
+    # Extração de PDFs: processos do pool (0 = número de CPUs) e páginas por lote
+    pdf_extraction_workers: int = int(os.getenv("PDF_EXTRACTION_WORKERS", "0"))
+    pdf_pages_per_batch: int = int(os.getenv("PDF_PAGES_PER_BATCH", "16"))
+    upload_chunk_size: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+    # Fila de ingestão assíncrona (workers em app/worker.py)
+    job_worker_concurrency: int = int(os.getenv("JOB_WORKER_CONCURRENCY", "2"))
+    job_poll_interval_seconds: float = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "2"))
+    job_lock_timeout_seconds: int = int(os.getenv("JOB_LOCK_TIMEOUT_SECONDS", "900"))
+    job_max_attempts: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    # Ingestão em lote: secundários processados simultaneamente
+    bulk_ingestion_concurrency: int = int(os.getenv("BULK_INGESTION_CONCURRENCY", "4"))
+    # Limites do lote: número de PDFs, tamanho de cada PDF e tamanho descompactado do zip
+    bulk_max_files: int = int(os.getenv("BULK_MAX_FILES", "200"))
+    bulk_max_file_bytes: int = int(os.getenv("BULK_MAX_FILE_BYTES", str(100 * 1024 * 1024)))
+    bulk_max_archive_bytes: int = int(os.getenv("BULK_MAX_ARCHIVE_BYTES", str(2 * 1024 * 1024 * 1024)))
+    # Geração de embeddings na ingestão: lotes limitados por tokens, enviados em paralelo sob limite de tokens/minuto
+    embedding_batch_max_tokens: int = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "50000"))
+    embedding_batch_max_inputs: int = int(os.getenv("EMBEDDING_BATCH_MAX_INPUTS", "512"))
+    embedding_max_concurrency: int = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+    embedding_tokens_per_minute: int = int(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", "1000000"))  # 0 = sem limite
+    # Embeddings e índice HNSW (até 2000 dimensões: vector; acima: halfvec)
+    embedding_dimensions: int = int(os.getenv("EMBEDDING_DIMENSIONS", "3072"))
+    hnsw_m: int = int(os.getenv("HNSW_M", "16"))
+    hnsw_ef_construction: int = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+    hnsw_ef_search: int = int(os.getenv("HNSW_EF_SEARCH", "40"))
+    # Varredura iterativa (pgvector >= 0.8): com o filtro por coleção sobre o índice global, sem ela as
+    # buscas devolvem menos de k resultados; vazio desativa (pgvector < 0.8)
+    hnsw_iterative_scan: str = os.getenv("HNSW_ITERATIVE_SCAN", "relaxed_order")  # "relaxed_order", "strict_order" ou ""
+    # Modo de busca vetorial: "hnsw" (cosseno) ou "binary" (Hamming + reordenação exata)
+    vector_search_mode: str = os.getenv("VECTOR_SEARCH_MODE", "hnsw")
+    binary_rerank_factor: int = int(os.getenv("BINARY_RERANK_FACTOR", "10"))
+    # Busca híbrida: candidatos de cada lista (full-text e vetorial) e constante do RRF
+    hybrid_candidates: int = int(os.getenv("HYBRID_CANDIDATES", "50"))
+    hybrid_rrf_k: int = int(os.getenv("HYBRID_RRF_K", "60"))
+    # Busca no corpus (todas as coleções): chunks avaliados antes do agrupamento por primário
+    corpus_search_candidates: int = int(os.getenv("CORPUS_SEARCH_CANDIDATES", "200"))
+    # Busca ponderada: vizinhos pré-selecionados pelo índice vetorial antes da ponderação por tipo
+    weighted_search_candidates: int = int(os.getenv("WEIGHTED_SEARCH_CANDIDATES", "100"))
+    # Cache em memória dos embeddings das consultas (LRU com TTL)
+    query_embedding_cache_size: int = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+    query_embedding_cache_ttl_seconds: int = int(os.getenv("QUERY_EMBEDDING_CACHE_TTL_SECONDS", str(24 * 3600)))
+    # Cache de resultados de busca (invalidado pela geração de escrita de cada coleção)
+    search_cache_enabled: bool = os.getenv("SEARCH_CACHE_ENABLED", "false").lower() == "true"
+    search_cache_size: int = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+    search_cache_ttl_seconds: int = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "600"))
+    search_cache_similarity_threshold: float = float(os.getenv("SEARCH_CACHE_SIMILARITY_THRESHOLD", "0.98"))
+    # Exportação NDJSON: documentos lidos do banco por vez (cursor do lado do servidor)
+    export_batch_size: int = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
     host: str = "localhost"
     port: int = 8000
 
@@ -1,6 +1,8 @@
+from sqlalchemy import text
 from app.db.base import Base
-from app.db.models import SubjectModel, PrimaryDocumentModel, SecondaryDocumentModel
+from app.db.models import SubjectModel, SubjectCatalogVersionModel, PrimaryDocumentModel, SecondaryDocumentModel, EmbeddingCacheModel, LLMResponseCacheModel, IngestionJobModel, CollectionGenerationModel
 from app.db.session import engine
+from app.db.migrate import run_migrations
 
 def drop_all_tables():
     """
@@ -12,7 +14,11 @@ def init_db():
     """
     Initialize the database by creating all tables defined in the models.
     """
+    # Extensão pgvector necessária para a tabela embedding_cache
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
     Base.metadata.create_all(bind=engine)
+    run_migrations()
 
 if __name__ == "__main__":
     print("Dropping existing tables...")
@@ -0,0 +1,335 @@
+"""
+Migrações idempotentes do schema para bancos já existentes.
+
+Uso:
+    python -m app.db.migrate
+
+Base.metadata.create_all não altera tabelas que já existem, e o init_db
+apaga todas as tabelas antes de recriá-las; este comando aplica apenas o
+que falta (tabelas, colunas, índices e triggers), sem perder dados, e
+pode ser executado quantas vezes for preciso. Os índices são criados com
+CONCURRENTLY, fora de transação, para não bloquear as escritas durante a
+construção.
+"""
+import logging
+import os
+from contextlib import contextmanager
+from typing import Callable, List
+from sqlalchemy import text
+from app.core.config import settings
+from app.db.base import Base
+from app.db.models import (
+    CollectionGenerationModel,
+    EmbeddingCacheModel,
+    IngestionJobModel,
+    LLMResponseCacheModel,
+    SubjectCatalogVersionModel,
+)
+from app.db.models.subjects import SUBJECT_CATALOG_TRIGGER, SUBJECT_CATALOG_TRIGGER_DDL
+from app.db.session import engine
+from app.vectorization.queries import (
+    EMBEDDING_TABLE,
+    HNSW_MAX_HALFVEC_DIMENSIONS,
+    HNSW_MAX_VECTOR_DIMENSIONS,
+    TEXT_SEARCH_CONFIG,
+    binary_expression,
+    embedding_expression,
+)
+
+logger = logging.getLogger(__name__)
+
+# Chave do advisory lock: execuções simultâneas (ex.: vários deploys) são serializadas
+MIGRATION_LOCK_KEY = "america-vector-db:migrate"
+
+# Versão do pgvector a partir da qual existe hnsw.iterative_scan
+ITERATIVE_SCAN_MIN_PGVECTOR = (0, 8)
+
+DOCUMENT_TABLES = ("primary_documents", "secondary_documents")
+
+# Tabelas adicionadas depois do schema original (fila, caches e versão do catálogo)
+SUPPORT_MODELS = (
+    IngestionJobModel,
+    LLMResponseCacheModel,
+    EmbeddingCacheModel,
+    CollectionGenerationModel,
+    SubjectCatalogVersionModel,
+)
+
+# Índices dos filtros das listagens e da busca no corpus (declarados nos modelos
+# com index=True; aqui para bancos criados antes deles)
+DOCUMENT_INDEXES = {
+    "ix_primary_documents_collection_name": "primary_documents (collection_name)",
+    "ix_primary_documents_document_year": "primary_documents (document_year)",
+    "ix_primary_documents_document_type": "primary_documents (document_type)",
+    "ix_secondary_documents_primary_id": "secondary_documents (primary_id)",
+    "ix_secondary_documents_document_year": "secondary_documents (document_year)",
+    "ix_secondary_documents_document_type": "secondary_documents (document_type)",
+}
+
+# Índices de expressão usados pela remoção (e filtros) por documento e pelo full-text
+EMBEDDING_INDEXES = {
+    "ix_embedding_collection_doc_id": f"{EMBEDDING_TABLE} (collection_id, (cmetadata->>'doc_id'))",
+    "ix_embedding_collection_parent_id": f"{EMBEDDING_TABLE} (collection_id, (cmetadata->>'parent_id'))",
+    "ix_embedding_document_tsv": f"{EMBEDDING_TABLE} USING gin (document_tsv)",
+}
+
+
+@contextmanager
+def migration_connection():
+    """Conexão em autocommit (exigido pelo CONCURRENTLY) com o advisory lock das migrações"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SELECT pg_advisory_lock(hashtext(:key))"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            yield conn
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), {"key": MIGRATION_LOCK_KEY})
+
+
+def _version_tuple(version: str) -> tuple:
+    """'0.8.0' -> (0, 8, 0)"""
+    return tuple(int(part) for part in version.split(".") if part.isdigit())
+
+
+def table_exists(conn, table: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:table)"), {"table": table}).scalar() is not None
+
+
+def column_exists(conn, table: str, column: str) -> bool:
+    """Consulta ao catálogo (sem lock na tabela, ao contrário de ADD COLUMN IF NOT EXISTS)"""
+    return conn.execute(
+        text("SELECT 1 FROM information_schema.columns WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column"),
+        {"table": table, "column": column}
+    ).scalar() is not None
+
+
+def trigger_exists(conn, name: str) -> bool:
+    return conn.execute(text("SELECT 1 FROM pg_trigger WHERE tgname = :name"), {"name": name}).scalar() is not None
+
+
+def index_exists(conn, name: str) -> bool:
+    return conn.execute(text("SELECT 1 FROM pg_indexes WHERE indexname = :name"), {"name": name}).scalar() is not None
+
+
+def drop_invalid_index(conn, name: str) -> None:
+    """Remove o índice deixado inválido por um CREATE INDEX CONCURRENTLY interrompido"""
+    invalid = conn.execute(
+        text(
+            "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": name}
+    ).scalar()
+    if invalid:
+        logger.warning(f"Índice {name} inválido (construção interrompida); recriando")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+
+def create_index_concurrently(conn, name: str, definition: str) -> None:
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS (definition = "tabela (colunas)")"""
+    drop_invalid_index(conn, name)
+    conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}"))
+
+
+# ==================== MIGRAÇÕES ====================
+
+def add_document_content_hash(conn) -> None:
+    """Coluna content_hash (deduplicação de uploads) e seu índice nos documentos"""
+    for table in DOCUMENT_TABLES:
+        if not table_exists(conn, table):
+            continue
+        if not column_exists(conn, table, "content_hash"):
+            # Coluna anulável sem default: alteração apenas no catálogo, sem reescrever a tabela
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS content_hash varchar(64)"))
+        create_index_concurrently(conn, f"ix_{table}_content_hash", f"{table} (content_hash)")
+
+
+def create_document_indexes(conn) -> None:
+    for name, definition in DOCUMENT_INDEXES.items():
+        if table_exists(conn, definition.split(" ", 1)[0]):
+            create_index_concurrently(conn, name, definition)
+
+
+def create_vector_store_tables(conn) -> None:
+    """
+    Extensão pgvector e tabelas do PGVector, que de outra forma só seriam
+    criadas no primeiro acesso a uma coleção (e sem a coluna/índices abaixo).
+    """
+    from langchain_postgres.vectorstores import Base as VectorStoreBase, _get_embedding_collection_store
+
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+    # Registra os modelos do PGVector (mesma chamada feita pelo PGVector ao ser instanciado)
+    _get_embedding_collection_store(settings.embedding_dimensions)
+    VectorStoreBase.metadata.create_all(conn)
+
+
+def create_support_tables(conn) -> None:
+    """
+    Tabelas da fila de ingestão, dos caches (embeddings, respostas de LLM e
+    gerações das coleções) e da versão do catálogo de subjects. Tabelas
+    novas, vazias: criadas (com seus índices) sem afetar as existentes.
+    """
+    Base.metadata.create_all(conn, tables=[model.__table__ for model in SUPPORT_MODELS], checkfirst=True)
+
+
+def install_subject_catalog_trigger(conn) -> None:
+    """Trigger que incrementa a versão do catálogo a cada escrita em subjects"""
+    if not table_exists(conn, "subjects") or trigger_exists(conn, SUBJECT_CATALOG_TRIGGER):
+        return
+    logger.info("Instalando trigger de versão do catálogo de subjects")
+    for statement in SUBJECT_CATALOG_TRIGGER_DDL:
+        conn.execute(text(statement))
+
+
+def add_embedding_document_tsv(conn) -> None:
+    """
+    Coluna gerada com o texto dos chunks indexado para full-text. Em uma
+    tabela com dados, o ADD COLUMN ... STORED reescreve a tabela inteira
+    com lock exclusivo: execute esta migração em uma janela de manutenção.
+    """
+    if column_exists(conn, EMBEDDING_TABLE, "document_tsv"):
+        return
+    logger.info(f"Adicionando coluna document_tsv em {EMBEDDING_TABLE} (reescreve a tabela)")
+    conn.execute(text(
+        f"ALTER TABLE {EMBEDDING_TABLE} ADD COLUMN IF NOT EXISTS document_tsv tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(document, ''))) STORED"
+    ))
+
+
+def create_embedding_indexes(conn) -> None:
+    for name, definition in EMBEDDING_INDEXES.items():
+        create_index_concurrently(conn, name, definition)
+
+
+def _ann_index_spec():
+    """
+    Prefixo do nome, expressão e operator class do índice do modo de busca
+    configurado (HNSW cosseno ou binário/Hamming), ou None sem índice possível.
+    """
+    dimensions = settings.embedding_dimensions
+    if settings.vector_search_mode == "binary":
+        # Cópia binária: 1 bit por dimensão (~32x menor que float32)
+        return f"ix_embedding_bq_hnsw_{dimensions}", binary_expression(None, dimensions), "bit_hamming_ops"
+
+    if dimensions > HNSW_MAX_HALFVEC_DIMENSIONS:
+        return None
+
+    opclass = "vector_cosine_ops" if dimensions <= HNSW_MAX_VECTOR_DIMENSIONS else "halfvec_cosine_ops"
+    return f"ix_embedding_hnsw_{dimensions}", embedding_expression(None, dimensions), opclass
+
+
+def _valid_indexes(conn, prefix: str):
+    """(nome, definição) dos índices válidos cujo nome começa com prefix"""
+    return conn.execute(
+        text(
+            "SELECT c.relname, pg_get_indexdef(c.oid) FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+            "WHERE left(c.relname, length(:prefix)) = :prefix AND i.indisvalid"
+        ),
+        {"prefix": prefix}
+    ).all()
+
+
+def create_embedding_ann_index(conn) -> None:
+    """
+    Índice HNSW parcial (vector_dims = dimensões configuradas, de modo que
+    vetores de outras dimensões já gravados não impedem a sua criação).
+
+    O nome inclui m e ef_construction: quando eles mudam, o novo índice é
+    construído com CONCURRENTLY enquanto o anterior continua atendendo as
+    buscas, e só então o anterior é removido (também com CONCURRENTLY).
+    Nenhuma etapa bloqueia escritas; execuções simultâneas são serializadas
+    pelo advisory lock das migrações.
+    """
+    spec = _ann_index_spec()
+    if spec is None:
+        logger.warning(f"Dimensão {settings.embedding_dimensions} acima do limite do HNSW; buscas sem índice vetorial")
+        return
+    prefix, expression, opclass = spec
+    dimensions, m, ef_construction = settings.embedding_dimensions, int(settings.hnsw_m), int(settings.hnsw_ef_construction)
+    name = f"{prefix}_m{m}_ef{ef_construction}"
+
+    existing = _valid_indexes(conn, prefix)
+    for _, definition in existing:
+        if f"m='{m}'" in definition and f"ef_construction='{ef_construction}'" in definition:
+            return
+
+    drop_invalid_index(conn, name)
+    logger.info(f"Criando índice HNSW {name} (m={m}, ef_construction={ef_construction}); as escritas continuam liberadas")
+    conn.execute(text(
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {EMBEDDING_TABLE} "
+        f"USING hnsw ({expression} {opclass}) "
+        f"WITH (m = {m}, ef_construction = {ef_construction}) "
+        f"WHERE vector_dims(embedding) = {int(dimensions)}"
+    ))
+    for old_name, _ in existing:
+        if old_name != name:
+            logger.info(f"Removendo índice HNSW anterior {old_name}")
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {old_name}"))
+
+
+# Executadas em ordem; cada uma deve ser idempotente
+MIGRATIONS: List[Callable] = [
+    add_document_content_hash,
+    create_document_indexes,
+    create_vector_store_tables,
+    create_support_tables,  # Após create_vector_store_tables: embedding_cache usa a extensão vector
+    install_subject_catalog_trigger,
+    add_embedding_document_tsv,
+    create_embedding_indexes,
+    create_embedding_ann_index,
+]
+
+
+def check_schema() -> List[str]:
+    """
+    Verifica, apenas com consultas ao catálogo (sem DDL e sem locks), se as
+    colunas e índices das migrações existem. Executado na subida dos
+    processos: o que faltar é registrado no log, e não criado. Também avisa
+    quando HNSW_ITERATIVE_SCAN está ativo em um pgvector sem suporte a ele.
+
+    Returns:
+        Objetos ausentes
+    """
+    missing: List[str] = []
+    with engine.connect() as conn:
+        for table in DOCUMENT_TABLES:
+            if table_exists(conn, table) and not column_exists(conn, table, "content_hash"):
+                missing.append(f"{table}.content_hash")
+        missing.extend(
+            model.__tablename__ for model in SUPPORT_MODELS if not table_exists(conn, model.__tablename__)
+        )
+        if table_exists(conn, "subjects") and not trigger_exists(conn, SUBJECT_CATALOG_TRIGGER):
+            missing.append(SUBJECT_CATALOG_TRIGGER)
+        if not table_exists(conn, EMBEDDING_TABLE):
+            missing.append(EMBEDDING_TABLE)
+        else:
+            if not column_exists(conn, EMBEDDING_TABLE, "document_tsv"):
+                missing.append(f"{EMBEDDING_TABLE}.document_tsv")
+            missing.extend(name for name in EMBEDDING_INDEXES if not index_exists(conn, name))
+            spec = _ann_index_spec()
+            if spec is not None and not _valid_indexes(conn, spec[0]):
+                missing.append(f"{spec[0]} (HNSW)")
+        missing.extend(name for name in DOCUMENT_INDEXES if not index_exists(conn, name))
+        pgvector_version = conn.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+
+    if settings.hnsw_iterative_scan and pgvector_version and _version_tuple(pgvector_version) < ITERATIVE_SCAN_MIN_PGVECTOR:
+        logger.warning(
+            f"pgvector {pgvector_version} não suporta HNSW_ITERATIVE_SCAN (requer >= 0.8); "
+            f"atualize a extensão ou defina HNSW_ITERATIVE_SCAN= (vazio)"
+        )
+    if missing:
+        logger.warning(f"Migrações pendentes ({', '.join(missing)}); execute: python -m app.db.migrate")
+    return missing
+
+
+def run_migrations() -> None:
+    """Aplica todas as migrações pendentes"""
+    with migration_connection() as conn:
+        for migration in MIGRATIONS:
+            logger.info(f"Migração: {migration.__name__}")
+            migration(conn)
+    logger.info("Migrações aplicadas")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    run_migrations()
@@ -1,7 +1,12 @@
-from app.db.models.subjects import SubjectModel, primary_subjects, secondary_subjects
+from app.db.models.subjects import SubjectModel, SubjectCatalogVersionModel, primary_subjects, secondary_subjects
 from app.db.models.documents import PrimaryDocumentModel, SecondaryDocumentModel
+from app.db.models.embedding_cache import EmbeddingCacheModel
+from app.db.models.llm_cache import LLMResponseCacheModel
+from app.db.models.ingestion_job import IngestionJobModel
+from app.db.models.collection_generation import CollectionGenerationModel
 
 __all__ = [
-    'SubjectModel', 'PrimaryDocumentModel', 'SecondaryDocumentModel',
-    'primary_subjects', 'secondary_subjects'
+    'SubjectModel', 'SubjectCatalogVersionModel', 'PrimaryDocumentModel', 'SecondaryDocumentModel',
+    'primary_subjects', 'secondary_subjects', 'EmbeddingCacheModel',
+    'LLMResponseCacheModel', 'IngestionJobModel', 'CollectionGenerationModel'
 ]
\ No newline at end of file
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, DateTime, func, BigInteger
+from app.db.base import Base
+
+class CollectionGenerationModel(Base):
+    """Contador de escritas por coleção do vector store (invalida o cache de resultados de busca)"""
+    __tablename__ = "collection_generations"
+    __table_args__ = {'extend_existing': True}
+
+    collection_name = Column(String, primary_key=True)
+    generation = Column(BigInteger, nullable=False, default=0)  # Incrementado a cada ingestão ou remoção de chunks
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<CollectionGenerationModel(collection_name={self.collection_name}, generation={self.generation})>"
@@ -8,9 +8,9 @@ class DocumentBaseModel(Base):
     
     id = Column(Integer, primary_key=True)
     filename = Column(String, nullable=False)
-    document_type = Column(String, nullable=False)
+    document_type = Column(String, nullable=False, index=True)
     document_number = Column(Integer, nullable=True)
-    document_year = Column(Integer, nullable=True)
+    document_year = Column(Integer, nullable=True, index=True)
     document_name = Column(String, nullable=False)
     presented_by = Column(String, nullable=True)
     presented_at = Column(DateTime(timezone=True), nullable=True)
@@ -18,6 +18,7 @@ class DocumentBaseModel(Base):
     central_theme = Column(String, nullable=True)
     key_points = Column(JSON, nullable=True)
     link = Column(String, nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 do arquivo enviado
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
@@ -28,7 +29,7 @@ class PrimaryDocumentModel(DocumentBaseModel):
     __tablename__ = "primary_documents"
     __table_args__ = {'extend_existing': True}
     
-    collection_name = Column(String, nullable=False)
+    collection_name = Column(String, nullable=False, index=True)
     
     secondary_documents = relationship("SecondaryDocumentModel", back_populates="primary")
     
@@ -42,7 +43,7 @@ class SecondaryDocumentModel(DocumentBaseModel):
     role = Column(String, nullable=True)
     party_affiliation = Column(String, nullable=False)
     
-    primary_id = Column(Integer, ForeignKey("primary_documents.id"), nullable=False)
+    primary_id = Column(Integer, ForeignKey("primary_documents.id"), nullable=False, index=True)
     primary = relationship("PrimaryDocumentModel", back_populates="secondary_documents")
 
     # Relacionamento com os subjects
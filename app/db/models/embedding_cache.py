@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, DateTime, func
+from pgvector.sqlalchemy import Vector
+from app.db.base import Base
+
+class EmbeddingCacheModel(Base):
+    """Cache persistente de embeddings, indexado por modelo e hash do texto normalizado"""
+    __tablename__ = "embedding_cache"
+    __table_args__ = {'extend_existing': True}
+
+    model = Column(String, primary_key=True)
+    content_hash = Column(String(64), primary_key=True)
+    embedding = Column(Vector(), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<EmbeddingCacheModel(model={self.model}, content_hash={self.content_hash})>"
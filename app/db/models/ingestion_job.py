@@ -0,0 +1,33 @@
+import uuid
+from sqlalchemy import Column, String, DateTime, func, Integer, Boolean, LargeBinary, JSON, Index
+from app.db.base import Base
+
+class IngestionJobModel(Base):
+    """Job de ingestão assíncrona: o upload fica no banco até um worker processá-lo"""
+    __tablename__ = "ingestion_jobs"
+    __table_args__ = (
+        # Usado pelos workers para encontrar o próximo job disponível
+        Index("ix_ingestion_jobs_status_created_at", "status", "created_at"),
+        {'extend_existing': True},
+    )
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    kind = Column(String, nullable=False)  # "primary" ou "secondary"
+    status = Column(String, nullable=False, default="queued")  # queued, running, succeeded, failed
+    current_node = Column(String, nullable=True)  # Último nó do workflow concluído
+    filename = Column(String, nullable=False)
+    payload = Column(LargeBinary, nullable=True)  # Conteúdo do arquivo (removido ao concluir)
+    content_hash = Column(String(64), nullable=False)
+    params = Column(JSON, nullable=False)  # Campos do formulário de upload
+    force_reprocess = Column(Boolean, nullable=False, default=False)
+    result = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    locked_by = Column(String, nullable=True)
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<IngestionJobModel(id={self.id}, kind={self.kind}, status={self.status})>"
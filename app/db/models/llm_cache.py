@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, DateTime, func, JSON
+from app.db.base import Base
+
+class LLMResponseCacheModel(Base):
+    """Cache persistente das respostas dos estágios de LLM (summarizer e classificadores)"""
+    __tablename__ = "llm_response_cache"
+    __table_args__ = {'extend_existing': True}
+
+    cache_key = Column(String(64), primary_key=True)
+    stage = Column(String, nullable=False, index=True)
+    response = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<LLMResponseCacheModel(stage={self.stage}, cache_key={self.cache_key})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, func, Integer, ForeignKey, Table
+from sqlalchemy import Column, String, DateTime, func, Integer, BigInteger, ForeignKey, Table, DDL, event
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
@@ -34,4 +34,32 @@ class SubjectModel(Base):
 
     # Relationships with documents
     primary_documents = relationship("PrimaryDocumentModel", secondary=primary_subjects, back_populates="subjects")
-    secondary_documents = relationship("SecondaryDocumentModel", secondary=secondary_subjects, back_populates="subjects")
\ No newline at end of file
+    secondary_documents = relationship("SecondaryDocumentModel", secondary=secondary_subjects, back_populates="subjects")
+
+class SubjectCatalogVersionModel(Base):
+    """Versão do catálogo de subjects: incrementada por trigger a cada alteração na tabela subjects"""
+    __tablename__ = "subject_catalog_version"
+    __table_args__ = {'extend_existing': True}
+
+    id = Column(Integer, primary_key=True, default=1)  # Linha única
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+SUBJECT_CATALOG_TRIGGER = "trg_subjects_catalog_version"
+
+# Qualquer escrita em subjects (inclusive fora da aplicação, ex.: seed_data.py) incrementa a versão
+SUBJECT_CATALOG_TRIGGER_DDL = (
+    "CREATE OR REPLACE FUNCTION bump_subject_catalog_version() RETURNS trigger AS $$ "
+    "BEGIN "
+    "INSERT INTO subject_catalog_version (id, version, updated_at) VALUES (1, 1, now()) "
+    "ON CONFLICT (id) DO UPDATE SET version = subject_catalog_version.version + 1, updated_at = now(); "
+    "RETURN NULL; "
+    "END $$ LANGUAGE plpgsql",
+    f"DROP TRIGGER IF EXISTS {SUBJECT_CATALOG_TRIGGER} ON subjects",
+    f"CREATE TRIGGER {SUBJECT_CATALOG_TRIGGER} AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON subjects "
+    "FOR EACH STATEMENT EXECUTE FUNCTION bump_subject_catalog_version()",
+)
+
+for statement in SUBJECT_CATALOG_TRIGGER_DDL:
+    event.listen(SubjectModel.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
@@ -1,47 +1,153 @@
-import base64
+import asyncio
+import hashlib
+import multiprocessing
 import os
 import tempfile
-from langchain_community.document_loaders import PyPDFLoader
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import AsyncIterator, List
 from fastapi import UploadFile
+from pypdf import PdfReader
+from app.core.config import settings
+
+
+def _count_pages(path: str) -> int:
+    """Retorna o número de páginas do PDF"""
+    return len(PdfReader(path).pages)
+
+
+def _extract_pages(path: str, start: int, end: int) -> List[str]:
+    """Extrai o texto das páginas [start, end) do PDF (executado no pool de processos)"""
+    reader = PdfReader(path)
+    return [reader.pages[index].extract_text() for index in range(start, end)]
+
 
 class Converter:
+    """
+    Conversor de PDFs para texto.
+
+    O upload é gravado em disco em blocos, sem ser carregado inteiro na
+    memória, e as páginas são extraídas em lotes por um pool de processos,
+    fora do event loop. iter_pages entrega as páginas em ordem assim que
+    cada lote fica pronto.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = settings.pdf_extraction_workers,
+        pages_per_batch: int = settings.pdf_pages_per_batch,
+        chunk_size: int = settings.upload_chunk_size
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_batch = pages_per_batch
+        self.chunk_size = chunk_size
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        """Cria o pool de processos na primeira extração"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # "spawn" evita herdar threads e conexões do processo da API
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._executor
+
+    def shutdown(self) -> None:
+        """Encerra o pool de processos"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    async def compute_hash(self, file: UploadFile, chunk_size: int = 1024 * 1024) -> str:
+        """Calcula o SHA-256 do upload lendo em blocos e volta o cursor ao início"""
+        digest = hashlib.sha256()
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+        await file.seek(0)
+        return digest.hexdigest()
+
+    async def save_upload(self, file: UploadFile, suffix: str = ".pdf") -> str:
+        """
+        Grava o upload em um arquivo temporário, bloco a bloco.
+
+        Returns:
+            Caminho do arquivo temporário (o chamador é responsável por removê-lo)
+        """
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+        try:
+            while True:
+                chunk = await file.read(self.chunk_size)
+                if not chunk:
+                    break
+                await asyncio.to_thread(temp_file.write, chunk)
+            temp_file.close()
+            return temp_file.name
+        except Exception:
+            temp_file.close()
+            os.unlink(temp_file.name)
+            raise
+
+    async def count_pages(self, path: str) -> int:
+        """Número de páginas do PDF (também valida que o arquivo pode ser lido)"""
+        return await asyncio.to_thread(_count_pages, path)
+
+    async def iter_pages(self, path: str, total_pages: int | None = None) -> AsyncIterator[str]:
+        """
+        Extrai o texto das páginas do PDF, em ordem.
+
+        Os lotes de páginas são processados em paralelo no pool de processos;
+        cada página é entregue assim que o seu lote termina, para que as etapas
+        seguintes possam começar antes do fim da extração.
+        """
+        if total_pages is None:
+            total_pages = await self.count_pages(path)
+
+        # Documentos pequenos não compensam o custo de despachar para o pool
+        if total_pages <= self.pages_per_batch:
+            for page in await asyncio.to_thread(_extract_pages, path, 0, total_pages):
+                yield page
+            return
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        batches = [
+            loop.run_in_executor(executor, _extract_pages, path, start, min(start + self.pages_per_batch, total_pages))
+            for start in range(0, total_pages, self.pages_per_batch)
+        ]
+        try:
+            for batch in batches:
+                for page in await batch:
+                    yield page
+        finally:
+            # Interrupção do consumidor: descarta os lotes ainda não iniciados
+            for batch in batches:
+                batch.cancel()
+
+    async def convert_path(self, path: str, filename: str | None = None) -> str:
+        """Converte um PDF já gravado em disco para texto"""
+        try:
+            return "\n".join([page async for page in self.iter_pages(path)])
+        except Exception as e:
+            print(f"Erro ao processar documento {filename or path}: {e}")
+            raise
 
     async def convert_file(self, file: UploadFile, filename: str) -> str:
         """Processa e converte um documento para texto"""
-        temp_file = None
+        path = await self.save_upload(file)
         try:
-            # Salva o arquivo temporariamente
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-            content = await file.read()
-            temp_file.write(content)
-            temp_file.flush()
-            temp_file.close()  # Fecha o arquivo antes de processá-lo
-            
-            # Processa o arquivo temporário
-            loader = PyPDFLoader(temp_file.name)
-            result = loader.load()
-            
-            # Limpa o arquivo temporário
+            return await self.convert_path(path, filename)
+        finally:
             try:
-                os.unlink(temp_file.name)
+                os.unlink(path)
             except Exception as e:
-                print(f"Aviso: Não foi possível deletar arquivo temporário {temp_file.name}: {e}")
-            
-            # Retorna o texto concatenado de todas as páginas
-            return "\n".join([page.page_content for page in result])
-                
-        except Exception as e:
-            print(f"Erro ao processar documento {filename}: {e}")
-            raise
-        finally:
-            # Garante que o arquivo temporário seja fechado
-            if temp_file and not temp_file.closed:
-                temp_file.close()
-            # Tenta limpar o arquivo temporário se ainda existir
-            if temp_file and os.path.exists(temp_file.name):
-                try:
-                    os.unlink(temp_file.name)
-                except:
-                    pass
-
-converter = Converter()
\ No newline at end of file
+                print(f"Aviso: Não foi possível deletar arquivo temporário {path}: {e}")
+
+converter = Converter()
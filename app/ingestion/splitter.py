@@ -1,30 +1,30 @@
+import asyncio
 from typing import List
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_postgres import PGVector
-from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document as LangchainDocument
-from app.core.config import settings
+from app.vectorization.embeddings import get_embeddings, ensure_embedding_dimension
+from app.vectorization.registry import vectorstore_registry
+from app.vectorization.batching import aembed_in_batches
+from app.vectorization.queries import adelete_chunks, delete_chunks, insert_chunks
+from app.vectorization.search_cache import search_cache
 
 class DocumentProcessor:
     """Processador de documentos para FastAPI"""
     
     def __init__(self, collection_name: str):
-        """Inicializa o processador de documentos"""
-        self.embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+        """Inicializa o processador de documentos (sem I/O de rede)"""
+        self.embeddings = get_embeddings()
         self.collection_name = collection_name
-        self.vectorstore = self.get_vectorstore()
-        test_vec = self.embeddings.embed_query("test")
-        if len(test_vec) != 3072:
-            raise ValueError(f"Expected 3072-dimension embeddings, but got {len(test_vec)}")
+    
+    @property
+    def vectorstore(self) -> PGVector:
+        """Vectorstore da coleção, obtido do registro compartilhado"""
+        return self.get_vectorstore()
         
     def get_vectorstore(self) -> PGVector:
-        """Conecta ao vectorstore PGVector via engine SQLAlchemy"""
-        return PGVector(
-            embeddings=self.embeddings,
-            connection=settings.database_url,
-            collection_name=self.collection_name,
-            use_jsonb=True
-        )
+        """Retorna o PGVector da coleção (engine e pool compartilhados)"""
+        return vectorstore_registry.get(self.collection_name)
     
     def process_document_text(self, md_text: str, doc_id: int, filename: str, document_type: str, parent_id: str = None, subjects: List[str] = None) -> List[LangchainDocument]:
         """Processa texto markdown e gera chunks do LangChain"""
@@ -49,16 +49,31 @@ class DocumentProcessor:
         return splitter.split_documents([langchain_doc])
     
     def create_vector_db_from_text(self, chunks: List[LangchainDocument]) -> int:
-        """Cria ou atualiza o vector store com novos chunks, em lotes de 100"""
-        db = self.get_vectorstore()
-        batch_size = 250
-        total = 0
-        
-        for i in range(0, len(chunks), batch_size):
-            batch = chunks[i:i + batch_size]
-            db.add_documents(batch)
-            total += len(batch)
-        
+        """Gera os embeddings dos chunks e grava todos com um único COPY"""
+        # Verificação de dimensão feita uma única vez por processo
+        ensure_embedding_dimension()
+        # Garante que a coleção exista antes da gravação direta
+        self.get_vectorstore()
+
+        vectors = self.embeddings.embed_documents([chunk.page_content for chunk in chunks])
+        return self._store_chunks(chunks, vectors)
+
+    async def acreate_vector_db_from_text(self, chunks: List[LangchainDocument]) -> int:
+        """
+        Versão assíncrona de create_vector_db_from_text: os embeddings são
+        gerados em lotes limitados por tokens, enviados em paralelo sob o
+        limitador de tokens/minuto do processo, e gravados com um único COPY.
+        """
+        await asyncio.to_thread(ensure_embedding_dimension)
+        await asyncio.to_thread(self.get_vectorstore)
+
+        vectors = await aembed_in_batches(self.embeddings, [chunk.page_content for chunk in chunks])
+        return await asyncio.to_thread(self._store_chunks, chunks, vectors)
+
+    def _store_chunks(self, chunks: List[LangchainDocument], vectors: List[List[float]]) -> int:
+        total = insert_chunks(self.collection_name, chunks, vectors)
+        if total:
+            search_cache.bump(self.collection_name)
         return total
     
     def process_and_store_document(self, md_text: str, doc_id: int, filename: str, document_type: str, parent_id: str = None, subjects: List[str] = None) -> int:
@@ -71,16 +86,64 @@ class DocumentProcessor:
             print(f"Erro ao processar documento {doc_id}: {e}")
             raise
     
-    def delete_document_from_vector_db(self, doc_id: int) -> None:
-        """Remove um documento do banco de dados do vector store"""
+    async def aprocess_and_store_document(self, md_text: str, doc_id: int, filename: str, document_type: str, parent_id: str = None, subjects: List[str] = None) -> int:
+        """Processa e vetoriza um documento sem bloquear o event loop"""
         try:
-            docs = self.vectorstore.similarity_search(query="", k=100, filter={"doc_id": doc_id})
-            ids_to_delete = [doc.id for doc in docs]
-            self.vectorstore.delete(ids=ids_to_delete)
+            chunks = self.process_document_text(md_text, doc_id, filename, document_type, parent_id, subjects)
+            return await self.acreate_vector_db_from_text(chunks)
+
+        except Exception as e:
+            print(f"Erro ao processar documento {doc_id}: {e}")
+            raise
+    
+    def delete_document_from_vector_db(self, doc_id: int, parent_id: int = None) -> int:
+        """
+        Remove os chunks de um documento do vector store.
+        
+        Args:
+            doc_id: ID do documento
+            parent_id: ID do primário, quando doc_id é um documento secundário
+            
+        Returns:
+            Número de chunks removidos
+        """
+        try:
+            deleted = delete_chunks(self.collection_name, doc_id=doc_id, parent_id=parent_id)
+            if deleted:
+                search_cache.bump(self.collection_name)
+            return deleted
         except Exception as e:
             print(f"Erro ao deletar documento {doc_id}: {e}")
             raise
     
-    def delete_all_documents_from_vector_db(self) -> None:
+    def delete_primary_from_vector_db(self, doc_id: int) -> int:
+        """Remove os chunks de um documento primário e de todos os seus secundários"""
+        try:
+            deleted = delete_chunks(self.collection_name, doc_id=doc_id, include_secondaries=True)
+            if deleted:
+                search_cache.bump(self.collection_name)
+            return deleted
+        except Exception as e:
+            print(f"Erro ao deletar documento {doc_id}: {e}")
+            raise
+    
+    async def adelete_document_from_vector_db(self, doc_id: int, parent_id: int = None) -> int:
+        """Versão assíncrona de delete_document_from_vector_db"""
+        deleted = await adelete_chunks(self.collection_name, doc_id=doc_id, parent_id=parent_id)
+        if deleted:
+            await search_cache.abump(self.collection_name)
+        return deleted
+    
+    async def adelete_primary_from_vector_db(self, doc_id: int) -> int:
+        """Versão assíncrona de delete_primary_from_vector_db"""
+        deleted = await adelete_chunks(self.collection_name, doc_id=doc_id, include_secondaries=True)
+        if deleted:
+            await search_cache.abump(self.collection_name)
+        return deleted
+    
+    def delete_all_documents_from_vector_db(self) -> int:
         """Remove todos os documentos do banco de dados do vector store"""
-        return self.vectorstore.delete(filter={"metadata": {}})
\ No newline at end of file
+        deleted = delete_chunks(self.collection_name)
+        if deleted:
+            search_cache.bump(self.collection_name)
+        return deleted
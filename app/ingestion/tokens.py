@@ -0,0 +1,26 @@
+from functools import lru_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Encoding usado pelos modelos de embedding da OpenAI; serve também como
+# aproximação para estimar o tamanho dos prompts enviados ao Gemini
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=4)
+def _get_encoding(encoding_name: str):
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        logger.warning(f"Encoding {encoding_name} indisponível, usando estimativa por caracteres: {e}")
+        return None
+
+
+def count_tokens(text: str, encoding_name: str = DEFAULT_ENCODING) -> int:
+    """Conta os tokens de um texto (estimativa de ~4 caracteres por token se o tiktoken falhar)"""
+    encoding = _get_encoding(encoding_name)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
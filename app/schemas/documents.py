@@ -1,4 +1,4 @@
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict, Union
 from datetime import datetime
 from pydantic import BaseModel, Field
 
@@ -98,4 +98,70 @@ class SecondaryDocumentChunksResponse(BaseModel):
 
 class SecondaryDocumentOperationResponse(BaseModel):
     doc_id: str = Field(..., description="Identificador do documento")
-    message: str = Field(..., description="Mensagem de confirmação da operação")
\ No newline at end of file
+    message: str = Field(..., description="Mensagem de confirmação da operação")
+
+# Listagens paginadas (view=compact omite summary e key_points)
+class PrimaryDocumentListItem(BaseModel):
+    id: int = Field(..., description="ID do documento")
+    filename: str = Field(..., description="Nome do arquivo")
+    subjects: List[SubjectResponse] = Field(..., description="Assuntos do documento")
+    created_at: datetime = Field(..., description="Data de criação")
+    updated_at: datetime = Field(..., description="Data de atualização")
+    document_type: str = Field(..., description="Tipo do documento")
+    document_year: int = Field(..., description="Ano do documento")
+    document_number: int = Field(..., description="Número do documento")
+    document_name: str = Field(..., description="Nome do documento")
+    presented_by: str = Field(..., description="Quem apresentou o documento")
+    presented_at: datetime = Field(..., description="Data de apresentação")
+    central_theme: str = Field(..., description="Tema central do documento")
+    link: str = Field(..., description="Link para o documento")
+    collection_name: str = Field(..., description="Nome da coleção")
+
+    class Config:
+        from_attributes = True
+
+class SecondaryDocumentListItem(BaseModel):
+    id: int = Field(..., description="ID do documento")
+    filename: str = Field(..., description="Nome do arquivo")
+    subjects: List[SubjectResponse] = Field(..., description="Assuntos do documento")
+    created_at: datetime = Field(..., description="Data de criação")
+    updated_at: datetime = Field(..., description="Data de atualização")
+    document_type: str = Field(..., description="Tipo do documento")
+    document_year: int = Field(..., description="Ano do documento")
+    document_number: int = Field(..., description="Número do documento")
+    document_name: str = Field(..., description="Nome do documento")
+    presented_by: str = Field(..., description="Quem apresentou o documento")
+    presented_at: datetime = Field(..., description="Data de apresentação")
+    central_theme: str = Field(..., description="Tema central do documento")
+    link: str = Field(..., description="Link para o documento")
+    role: str = Field(..., description="Papel do apresentador")
+    party_affiliation: str = Field(..., description="Afiliação partidária")
+    primary_id: int = Field(..., description="ID do documento principal associado")
+
+    class Config:
+        from_attributes = True
+
+class PrimaryDocumentPage(BaseModel):
+    items: List[Union[PrimaryDocumentResponse, PrimaryDocumentListItem]] = Field(..., description="Documentos da página (PrimaryDocumentListItem com view=compact)")
+    next_cursor: Optional[str] = Field(None, description="Cursor da próxima página (ausente na última)")
+
+class SecondaryDocumentPage(BaseModel):
+    items: List[Union[SecondaryDocumentResponse, SecondaryDocumentListItem]] = Field(..., description="Documentos da página (SecondaryDocumentListItem com view=compact)")
+    next_cursor: Optional[str] = Field(None, description="Cursor da próxima página (ausente na última)")
+
+# Ingestão assíncrona
+class IngestionJobResponse(BaseModel):
+    id: str = Field(..., description="ID do job")
+    kind: str = Field(..., description="Tipo do documento (primary ou secondary)")
+    status: str = Field(..., description="Status do job (queued, running, succeeded, failed)")
+    current_node: Optional[str] = Field(None, description="Último nó do workflow concluído")
+    filename: str = Field(..., description="Nome do arquivo")
+    attempts: int = Field(..., description="Número de tentativas de processamento")
+    error: Optional[str] = Field(None, description="Mensagem do último erro")
+    result: Optional[Dict[str, Any]] = Field(None, description="Resultado do processamento")
+    created_at: datetime = Field(..., description="Data de criação")
+    updated_at: datetime = Field(..., description="Data de atualização")
+    finished_at: Optional[datetime] = Field(None, description="Data de conclusão")
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,10 @@
+from typing import Dict, Optional
+from pydantic import BaseModel, Field
+
+class WeightedSearchRequest(BaseModel):
+    query: str = Field(..., min_length=1, description="Texto da consulta")
+    collection_name: str = Field(..., description="Nome da coleção")
+    k: int = Field(4, ge=1, le=100, description="Número de resultados")
+    document_type: Optional[str] = Field(None, description="Restringe a busca a um tipo de documento")
+    weights: Optional[Dict[str, float]] = Field(None, description="Peso de cada tipo de documento (padrão: MPV 1.0, EMENDA 0.6)")
+    default_weight: float = Field(1.0, description="Peso dos tipos ausentes em weights")
@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from fastapi import UploadFile
+from app.core.config import settings
+from app.ingestion.convertor import converter
+from app.service.ingestion import (
+    SECONDARY_FIELDS,
+    IngestionError,
+    PrimaryContext,
+    ingest_secondary,
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Arquivo opcional dentro do zip com os metadados de cada secundário
+ARCHIVE_METADATA_FILE = "metadata.json"
+
+
+@dataclass
+class BulkFile:
+    """Arquivo do lote já gravado em disco (ou recusado, com o motivo em error)"""
+    filename: str
+    path: Optional[str]
+    content_hash: Optional[str]
+    error: Optional[str] = None
+
+
+def _copy_and_hash(source, path: str, max_bytes: Optional[int] = None) -> str:
+    """Copia o conteúdo para path calculando o SHA-256 em blocos (até max_bytes)"""
+    digest = hashlib.sha256()
+    written = 0
+    with open(path, "wb") as target:
+        while True:
+            chunk = source.read(settings.upload_chunk_size)
+            if not chunk:
+                break
+            written += len(chunk)
+            if max_bytes is not None and written > max_bytes:
+                raise ValueError(f"Arquivo excede o limite de {max_bytes} bytes")
+            digest.update(chunk)
+            target.write(chunk)
+    return digest.hexdigest()
+
+
+def _extract_archive(
+    archive_path: str,
+    max_files: int = settings.bulk_max_files,
+    max_file_bytes: int = settings.bulk_max_file_bytes,
+    max_archive_bytes: int = settings.bulk_max_archive_bytes
+) -> tuple[List[BulkFile], Dict[str, Any]]:
+    """
+    Extrai os PDFs de um zip para arquivos temporários.
+
+    Os limites são verificados pelos tamanhos declarados no zip antes de
+    extrair qualquer arquivo, e a cópia de cada PDF é interrompida se
+    passar de max_file_bytes (zip com tamanhos adulterados).
+
+    Returns:
+        Arquivos extraídos (ou recusados) e o conteúdo de metadata.json (se existir)
+
+    Raises:
+        IngestionError: Se o zip exceder o número de PDFs ou o tamanho total
+    """
+    files: List[BulkFile] = []
+    metadata: Dict[str, Any] = {}
+    with zipfile.ZipFile(archive_path) as archive:
+        members = [member for member in archive.infolist() if not member.is_dir()]
+        pdfs = [member for member in members if member.filename.lower().endswith(".pdf")]
+        if len(pdfs) > max_files:
+            raise IngestionError(400, f"O zip contém {len(pdfs)} PDFs; o limite é {max_files}")
+        total_bytes = sum(member.file_size for member in members)
+        if total_bytes > max_archive_bytes:
+            raise IngestionError(400, f"O zip descompactado tem {total_bytes} bytes; o limite é {max_archive_bytes}")
+
+        for member in members:
+            # Apenas o nome base: os caminhos internos do zip não são usados em disco
+            filename = os.path.basename(member.filename)
+            if filename == ARCHIVE_METADATA_FILE:
+                if member.file_size > max_file_bytes:
+                    raise IngestionError(400, f"{ARCHIVE_METADATA_FILE} excede o limite de {max_file_bytes} bytes")
+                metadata = json.loads(archive.read(member).decode("utf-8"))
+            elif filename.lower().endswith(".pdf"):
+                if member.file_size > max_file_bytes:
+                    files.append(BulkFile(filename, None, None, f"Arquivo excede o limite de {max_file_bytes} bytes"))
+                    continue
+                fd, path = tempfile.mkstemp(suffix=".pdf")
+                os.close(fd)
+                try:
+                    with archive.open(member) as source:
+                        content_hash = _copy_and_hash(source, path, max_file_bytes)
+                except Exception:
+                    os.unlink(path)
+                    raise
+                files.append(BulkFile(filename, path, content_hash))
+    return files, metadata
+
+
+def _reject_duplicate_names(files: List[BulkFile]) -> None:
+    """
+    Os metadados são indexados pelo nome do arquivo: arquivos com o mesmo
+    nome (ex.: pastas diferentes do zip) seriam ingeridos com os mesmos
+    campos, então todos eles são recusados.
+    """
+    counts = Counter(bulk_file.filename for bulk_file in files)
+    for bulk_file in files:
+        if counts[bulk_file.filename] > 1 and bulk_file.error is None:
+            bulk_file.error = f"Nome de arquivo repetido no lote ({counts[bulk_file.filename]} arquivos '{bulk_file.filename}')"
+
+
+async def save_bulk_files(
+    files: Optional[List[UploadFile]],
+    archive: Optional[UploadFile]
+) -> tuple[List[BulkFile], Dict[str, Any]]:
+    """Grava em disco os secundários enviados como multi-file e/ou zip"""
+    saved: List[BulkFile] = []
+    archive_metadata: Dict[str, Any] = {}
+
+    if files and len(files) > settings.bulk_max_files:
+        raise IngestionError(400, f"Foram enviados {len(files)} arquivos; o limite é {settings.bulk_max_files}")
+
+    try:
+        for file in files or []:
+            if file.size is not None and file.size > settings.bulk_max_file_bytes:
+                saved.append(BulkFile(file.filename, None, None, f"Arquivo excede o limite de {settings.bulk_max_file_bytes} bytes"))
+                continue
+            content_hash = await converter.compute_hash(file)
+            path = await converter.save_upload(file)
+            saved.append(BulkFile(file.filename, path, content_hash))
+
+        if archive is not None:
+            archive_path = await converter.save_upload(archive, suffix=".zip")
+            try:
+                extracted, archive_metadata = await asyncio.to_thread(_extract_archive, archive_path)
+                saved.extend(extracted)
+            finally:
+                os.unlink(archive_path)
+
+        pdf_count = sum(1 for bulk_file in saved if bulk_file.error is None)
+        if pdf_count > settings.bulk_max_files:
+            raise IngestionError(400, f"O lote contém {pdf_count} PDFs; o limite é {settings.bulk_max_files}")
+    except Exception:
+        remove_bulk_files(saved)
+        raise
+
+    _reject_duplicate_names(saved)
+    return saved, archive_metadata
+
+
+def remove_bulk_files(files: List[BulkFile]) -> None:
+    for bulk_file in files:
+        if bulk_file.path is None:
+            continue
+        try:
+            os.unlink(bulk_file.path)
+        except Exception as e:
+            logger.warning(f"Não foi possível deletar arquivo temporário {bulk_file.path}: {e}")
+
+
+async def ingest_secondaries(
+    primary: PrimaryContext,
+    files: List[BulkFile],
+    metadata: Dict[str, Dict[str, Any]],
+    force_reprocess: bool = False,
+    max_concurrency: int = settings.bulk_ingestion_concurrency
+) -> List[Dict[str, Any]]:
+    """
+    Processa os secundários de um primário em paralelo.
+
+    O contexto do primário é carregado uma única vez pelo chamador; cada
+    arquivo roda em sua própria sessão do banco, com no máximo
+    max_concurrency workflows simultâneos. Falhas são reportadas por arquivo
+    sem interromper o restante do lote.
+
+    Args:
+        primary: Contexto do documento primário
+        files: Arquivos dos secundários já gravados em disco
+        metadata: Campos do formulário de cada secundário, por nome de arquivo
+        force_reprocess: Reprocessa mesmo que o conteúdo já tenha sido ingerido
+        max_concurrency: Número máximo de documentos processados ao mesmo tempo
+
+    Returns:
+        Resultado de cada arquivo, na ordem recebida
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    required_fields = [field for field in SECONDARY_FIELDS if field != "primary_id"]
+
+    async def process(bulk_file: BulkFile) -> Dict[str, Any]:
+        if bulk_file.error:
+            return {"filename": bulk_file.filename, "status": "error", "error": bulk_file.error}
+
+        params = metadata.get(bulk_file.filename)
+        if params is None:
+            return {"filename": bulk_file.filename, "status": "error", "error": "Metadados não informados para o arquivo"}
+
+        missing = [field for field in required_fields if params.get(field) is None]
+        if missing:
+            return {"filename": bulk_file.filename, "status": "error", "error": f"Campos ausentes: {', '.join(missing)}"}
+
+        async with semaphore:
+            try:
+                result = await ingest_secondary(
+                    {**params, "primary_id": primary.id},
+                    filename=bulk_file.filename,
+                    content_hash=bulk_file.content_hash,
+                    force_reprocess=force_reprocess,
+                    file_path=bulk_file.path,
+                    primary=primary
+                )
+                status = result.get("processing_status") or result.get("status")
+                return {"filename": bulk_file.filename, "status": status, "result": result}
+            except IngestionError as e:
+                return {"filename": bulk_file.filename, "status": "error", "error": e.detail}
+            except Exception as e:
+                logger.error(f"Erro ao processar {bulk_file.filename} no lote: {e}")
+                return {"filename": bulk_file.filename, "status": "error", "error": str(e)}
+
+    logger.info(f"Processando {len(files)} secundários do primário {primary.id} (concorrência {max_concurrency})")
+    return await asyncio.gather(*(process(bulk_file) for bulk_file in files))
@@ -0,0 +1,193 @@
+from typing import Dict, List, Any
+from langchain_core.prompts import (
+    ChatPromptTemplate,
+    SystemMessagePromptTemplate,
+    HumanMessagePromptTemplate
+)
+from langchain_core.output_parsers import PydanticOutputParser
+from pydantic import BaseModel, Field
+from app.service.subject_catalog import subject_catalog
+from app.service.llm_registry import llm_registry, DEFAULT_MODEL, DEFAULT_TEMPERATURE
+from app.service.llm_cache import llm_cache, prompt_version
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Estágio usado no cache de respostas
+CACHE_STAGE = "combined_analysis"
+
+class CombinedAnalysisResponse(BaseModel):
+    """Schema único com relevância, subjects, tema central e pontos-chave"""
+    is_energy_related: bool = Field(..., description="Se o documento é relacionado ao mercado de energia")
+    confidence_score: float = Field(..., description="Score de confiança da relevância (0.0 - 1.0)")
+    main_reason: str = Field(..., description="Principal razão da classificação de relevância")
+    subjects: List[str] = Field(default_factory=list, description="Lista de assuntos do documento")
+    central_theme: str = Field("", description="Tema central do documento em uma frase")
+    key_points: Dict[str, str] = Field(
+        default_factory=dict,
+        description="Dicionário com tópico como chave e descrição como valor"
+    )
+
+class CombinedAnalyzer:
+    """
+    Analisador combinado para documentos do mercado de energia.
+    Substitui RelevanceChecker, SubjectsClassifier, ThemeClassifier e
+    KeyPointsExtractor por uma única chamada ao Gemini com um schema
+    combinado: o resumo é enviado uma vez só.
+    """
+
+    def __init__(
+        self,
+        model: str = DEFAULT_MODEL,
+        temperature: float = DEFAULT_TEMPERATURE,
+        max_subjects: int = 10
+    ):
+        """
+        Inicializa o analisador combinado.
+
+        Args:
+            model: Modelo do Google Gemini a ser usado
+            temperature: Temperatura para geração (0.0 - 1.0)
+            max_subjects: Número máximo de subjects a retornar
+        """
+        self.max_subjects = max_subjects
+
+        # LLM compartilhado pelo processo (soma dos limites de saída dos estágios)
+        self.llm = llm_registry.get_llm(model, temperature, max_output_tokens=2100)
+
+        # Parser para estruturar resposta
+        self.parser = PydanticOutputParser(pydantic_object=CombinedAnalysisResponse)
+
+        # Construir prompt
+        self.prompt = self._build_prompt()
+
+        # Criar chain
+        self.chain = self.prompt | self.llm | self.parser
+
+        # Versão do prompt para o cache de respostas
+        self.cache_version = prompt_version(self.prompt, model, temperature, 2100)
+
+        logger.info("CombinedAnalyzer inicializado")
+
+    def _build_prompt(self) -> ChatPromptTemplate:
+        """Constrói o prompt da análise combinada"""
+
+        system_prompt = """
+Você é um especialista em análise de documentos do mercado de energia elétrica brasileiro.
+Sua tarefa é realizar, em uma única análise, as quatro etapas abaixo sobre o documento fornecido.
+
+1. RELEVÂNCIA
+Determine se o documento está relacionado ao setor energético.
+- Considere relacionado: geração, transmissão e distribuição de energia elétrica, comercialização
+  (mercado livre/cativo), tarifas e preços, regulamentação do setor (ANEEL, ONS, CCEE), eficiência
+  energética, consumidores e agentes do setor, infraestrutura e políticas energéticas.
+- Considere não relacionado: assuntos administrativos gerais, outros setores (telecomunicações,
+  petróleo, gás) e questões processuais sem impacto no setor.
+- Atribua um score de confiança (0.0 = certeza que não é, 1.0 = certeza que é) e explique brevemente o motivo.
+
+Se o documento NÃO for relacionado ao mercado de energia, retorne subjects vazio, central_theme vazio
+e key_points vazio.
+
+2. SUBJECTS
+Selecione APENAS subjects da lista abaixo que são REALMENTE relevantes, no máximo {max_subjects},
+ordenados por relevância (mais relevante primeiro). Prefira menos subjects bem escolhidos.
+
+SUBJECTS DISPONÍVEIS:
+{subjects_list}
+
+3. TEMA CENTRAL
+Uma frase clara e objetiva (máximo de 15 palavras), específica e com linguagem técnica do setor.
+
+4. PONTOS-CHAVE
+Os 3-6 pontos mais importantes do documento: tópico conciso (máximo 5 palavras) como chave e
+uma descrição clara do que o documento diz sobre esse tópico como valor.
+
+Responda APENAS no formato JSON especificado abaixo:
+{format_instructions}
+"""
+
+        human_prompt = """
+DOCUMENTO A ANALISAR:
+{input}
+
+Análise:"""
+
+        return ChatPromptTemplate.from_messages([
+            SystemMessagePromptTemplate.from_template(system_prompt),
+            HumanMessagePromptTemplate.from_template(human_prompt),
+        ]).partial(
+            format_instructions=self.parser.get_format_instructions(),
+            max_subjects=self.max_subjects
+        )
+
+    async def _aload_subjects_from_db(self) -> List[str]:
+        """Carrega lista de subjects disponíveis (catálogo em cache; sessão própria, fora do event loop)"""
+        try:
+            return await subject_catalog.anames()
+        except Exception as e:
+            logger.error(f"Erro ao carregar subjects do banco: {e}")
+            return []
+
+    def _prepare_input(self, document_text: str) -> str | None:
+        """Valida e trunca o texto de entrada; retorna None se estiver vazio"""
+        if not document_text or not document_text.strip():
+            logger.warning("Documento vazio fornecido para análise combinada")
+            return None
+
+        # Limitar tamanho do texto (maior limite entre os estágios individuais)
+        max_chars = 8000
+        if len(document_text) > max_chars:
+            document_text = document_text[:max_chars] + "..."
+            logger.info(f"Texto truncado para {max_chars} caracteres")
+
+        return document_text
+
+    def _build_result(self, response: CombinedAnalysisResponse) -> Dict[str, Any]:
+        """Converte a resposta do parser no dicionário usado pelo workflow"""
+        logger.info(
+            f"Análise combinada concluída: relevante={response.is_energy_related} "
+            f"(confiança: {response.confidence_score}), {len(response.subjects)} subjects, "
+            f"{len(response.key_points)} pontos-chave"
+        )
+        return response.model_dump()
+
+    async def aanalyze(self, document_text: str) -> Dict[str, Any]:
+        """
+        Executa relevância, subjects, tema central e pontos-chave em uma única chamada.
+
+        Args:
+            document_text: Texto do documento para analisar
+
+        Returns:
+            Dict com is_energy_related, confidence_score, main_reason,
+            subjects, central_theme e key_points
+
+        Raises:
+            Exception: Se houver erro na análise
+        """
+        try:
+            document_text = self._prepare_input(document_text)
+            if document_text is None:
+                return CombinedAnalysisResponse(
+                    is_energy_related=False,
+                    confidence_score=0.0,
+                    main_reason="Documento vazio"
+                ).model_dump()
+
+            chain_input = {
+                "input": document_text,
+                "subjects_list": json.dumps(await self._aload_subjects_from_db(), ensure_ascii=False, indent=2)
+            }
+
+            async def compute() -> Dict[str, Any]:
+                return self._build_result(await self.chain.ainvoke(chain_input))
+
+            logger.info("Iniciando análise combinada")
+            return await llm_cache.aget_or_compute(
+                CACHE_STAGE, llm_cache.make_key(CACHE_STAGE, self.cache_version, chain_input), compute
+            )
+
+        except Exception as e:
+            logger.error(f"Erro na análise combinada: {e}")
+            raise
@@ -1,5 +1,4 @@
 from typing import Dict, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import (
     ChatPromptTemplate,
     SystemMessagePromptTemplate,
@@ -7,7 +6,8 @@ from langchain_core.prompts import (
 )
 from langchain_core.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from app.service.llm_registry import llm_registry, DEFAULT_MODEL, DEFAULT_TEMPERATURE
+from app.service.llm_cache import llm_cache, prompt_version
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,6 +19,9 @@ class KeyPointsResponse(BaseModel):
         description="Dicionário com tópico como chave e descrição como valor"
     )
 
+# Estágio usado no cache de respostas
+CACHE_STAGE = "key_points"
+
 class KeyPointsExtractor:
     """
     Extrator de pontos-chave para documentos do mercado de energia.
@@ -28,26 +31,18 @@ class KeyPointsExtractor:
     
     def __init__(
         self, 
-        db_session: Session, 
-        model: str = "gemini-2.0-flash-001", 
-        temperature: float = 0.1
+        model: str = DEFAULT_MODEL, 
+        temperature: float = DEFAULT_TEMPERATURE
     ):
         """
         Inicializa o extrator de pontos-chave.
         
         Args:
-            db_session: Sessão do banco de dados (para consistência)
             model: Modelo do Google Gemini a ser usado
             temperature: Temperatura para geração (0.0 - 1.0)
         """
-        self.db_session = db_session
-        
-        # Inicializar LLM
-        self.llm = ChatGoogleGenerativeAI(
-            model=model, 
-            temperature=temperature,
-            max_output_tokens=800
-        )
+        # LLM compartilhado pelo processo (limite de saída aplicado por chamada)
+        self.llm = llm_registry.get_llm(model, temperature, max_output_tokens=800)
         
         # Parser para estruturar resposta
         self.parser = PydanticOutputParser(pydantic_object=KeyPointsResponse)
@@ -58,6 +53,9 @@ class KeyPointsExtractor:
         # Criar chain
         self.chain = self.prompt | self.llm | self.parser
         
+        # Versão do prompt para o cache de respostas
+        self.cache_version = prompt_version(self.prompt, model, temperature, 800)
+        
         logger.info("KeyPointsExtractor inicializado")
     
     def _build_prompt(self) -> ChatPromptTemplate:
@@ -98,6 +96,29 @@ Pontos-chave:"""
             HumanMessagePromptTemplate.from_template(human_prompt),
         ]).partial(format_instructions=self.parser.get_format_instructions())
     
+    def _prepare_input(self, document_text: str) -> str | None:
+        """Valida e trunca o texto de entrada; retorna None se estiver vazio"""
+        if not document_text or not document_text.strip():
+            logger.warning("Documento vazio fornecido para extração de pontos-chave")
+            return None
+        
+        # Limitar tamanho do texto
+        max_chars = 7000  # Suficiente para identificar pontos principais
+        if len(document_text) > max_chars:
+            document_text = document_text[:max_chars] + "..."
+            logger.info(f"Texto truncado para {max_chars} caracteres")
+        
+        return document_text
+    
+    def _cache_key(self, document_text: str) -> str:
+        return llm_cache.make_key(CACHE_STAGE, self.cache_version, {"input": document_text})
+    
+    def _invoke(self, document_text: str) -> Dict[str, str]:
+        return self.chain.invoke({"input": document_text}).key_points
+    
+    async def _ainvoke(self, document_text: str) -> Dict[str, str]:
+        return (await self.chain.ainvoke({"input": document_text})).key_points
+    
     def extract_key_points(self, document_text: str) -> Dict[str, str]:
         """
         Extrai os pontos-chave de um documento.
@@ -112,22 +133,42 @@ Pontos-chave:"""
             Exception: Se houver erro na extração
         """
         try:
-            # Validar input básico
-            if not document_text or not document_text.strip():
-                logger.warning("Documento vazio fornecido para extração de pontos-chave")
+            document_text = self._prepare_input(document_text)
+            if document_text is None:
                 return {}
             
-            # Limitar tamanho do texto
-            max_chars = 7000  # Suficiente para identificar pontos principais
-            if len(document_text) > max_chars:
-                document_text = document_text[:max_chars] + "..."
-                logger.info(f"Texto truncado para {max_chars} caracteres")
-            
             # Executar extração
             logger.info("Iniciando extração de pontos-chave")
-            response = self.chain.invoke({"input": document_text})
+            key_points = llm_cache.get_or_compute(
+                CACHE_STAGE, self._cache_key(document_text), lambda: self._invoke(document_text)
+            )
             
-            key_points = response.key_points
+            logger.info(f"Extração concluída: {len(key_points)} pontos-chave identificados")
+            return key_points
+            
+        except Exception as e:
+            logger.error(f"Erro na extração de pontos-chave: {e}")
+            raise
+    
+    async def aextract_key_points(self, document_text: str) -> Dict[str, str]:
+        """
+        Versão assíncrona de extract_key_points, baseada em ainvoke.
+        
+        Args:
+            document_text: Texto do documento para analisar
+            
+        Returns:
+            Dict com tópicos como chaves e descrições como valores
+        """
+        try:
+            document_text = self._prepare_input(document_text)
+            if document_text is None:
+                return {}
+            
+            logger.info("Iniciando extração de pontos-chave")
+            key_points = await llm_cache.aget_or_compute(
+                CACHE_STAGE, self._cache_key(document_text), lambda: self._ainvoke(document_text)
+            )
             
             logger.info(f"Extração concluída: {len(key_points)} pontos-chave identificados")
             return key_points
@@ -138,16 +179,15 @@ Pontos-chave:"""
 
 
 # Função de conveniência para usar no workflow
-def extract_document_key_points(document_text: str, db_session: Session) -> Dict[str, str]:
+def extract_document_key_points(document_text: str) -> Dict[str, str]:
     """
     Função de conveniência para extrair pontos-chave de um documento.
     
     Args:
         document_text: Texto do documento
-        db_session: Sessão do banco de dados
         
     Returns:
         Dict com pontos-chave extraídos
     """
-    extractor = KeyPointsExtractor(db_session)
+    extractor = llm_registry.get_service(KeyPointsExtractor)
     return extractor.extract_key_points(document_text)
\ No newline at end of file
@@ -1,5 +1,4 @@
 from typing import Dict, List, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import (
     ChatPromptTemplate,
     SystemMessagePromptTemplate,
@@ -7,7 +6,8 @@ from langchain_core.prompts import (
 )
 from langchain_core.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from app.service.llm_registry import llm_registry, DEFAULT_MODEL, DEFAULT_TEMPERATURE
+from app.service.llm_cache import llm_cache, prompt_version
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,6 +18,16 @@ class RelevanceResponse(BaseModel):
     confidence_score: float = Field(..., description="Score de confiança (0.0 - 1.0)")
     main_reason: str = Field(..., description="Principal razão da classificação")
 
+# Resultado padrão para documentos sem conteúdo
+EMPTY_DOCUMENT_RESULT = {
+    "is_energy_related": False,
+    "confidence_score": 0.0,
+    "main_reason": "Documento vazio"
+}
+
+# Estágio usado no cache de respostas
+CACHE_STAGE = "relevance"
+
 class RelevanceChecker:
     """
     Verificador de relevância para documentos do mercado de energia.
@@ -27,26 +37,18 @@ class RelevanceChecker:
     
     def __init__(
         self, 
-        db_session: Session, 
-        model: str = "gemini-2.0-flash-001", 
-        temperature: float = 0.1
+        model: str = DEFAULT_MODEL, 
+        temperature: float = DEFAULT_TEMPERATURE
     ):
         """
         Inicializa o verificador de relevância.
         
         Args:
-            db_session: Sessão do banco de dados (para consistência)
             model: Modelo do Google Gemini a ser usado
             temperature: Temperatura para geração (0.0 - 1.0)
         """
-        self.db_session = db_session
-        
-        # Inicializar LLM
-        self.llm = ChatGoogleGenerativeAI(
-            model=model, 
-            temperature=temperature,
-            max_output_tokens=200
-        )
+        # LLM compartilhado pelo processo (limite de saída aplicado por chamada)
+        self.llm = llm_registry.get_llm(model, temperature, max_output_tokens=200)
         
         # Parser para estruturar resposta
         self.parser = PydanticOutputParser(pydantic_object=RelevanceResponse)
@@ -57,6 +59,9 @@ class RelevanceChecker:
         # Criar chain
         self.chain = self.prompt | self.llm | self.parser
         
+        # Versão do prompt para o cache de respostas
+        self.cache_version = prompt_version(self.prompt, model, temperature, 200)
+        
         logger.info("RelevanceChecker inicializado")
     
     def _build_prompt(self) -> ChatPromptTemplate:
@@ -105,6 +110,38 @@ Análise:"""
             HumanMessagePromptTemplate.from_template(human_prompt),
         ]).partial(format_instructions=self.parser.get_format_instructions())
     
+    def _prepare_input(self, document_text: str) -> str | None:
+        """Valida e trunca o texto de entrada; retorna None se estiver vazio"""
+        if not document_text or not document_text.strip():
+            logger.warning("Documento vazio fornecido para verificação de relevância")
+            return None
+        
+        # Limitar tamanho do texto
+        max_chars = 5000  # Suficiente para determinar relevância
+        if len(document_text) > max_chars:
+            document_text = document_text[:max_chars] + "..."
+            logger.info(f"Texto truncado para {max_chars} caracteres")
+        
+        return document_text
+    
+    def _build_result(self, response: RelevanceResponse) -> Dict[str, Any]:
+        """Converte a resposta do parser no dicionário usado pelo workflow"""
+        logger.info(f"Relevância verificada: {response.is_energy_related} (confiança: {response.confidence_score})")
+        return {
+            "is_energy_related": response.is_energy_related,
+            "confidence_score": response.confidence_score,
+            "main_reason": response.main_reason
+        }
+    
+    def _cache_key(self, document_text: str) -> str:
+        return llm_cache.make_key(CACHE_STAGE, self.cache_version, {"input": document_text})
+    
+    def _invoke(self, document_text: str) -> Dict[str, Any]:
+        return self._build_result(self.chain.invoke({"input": document_text}))
+    
+    async def _ainvoke(self, document_text: str) -> Dict[str, Any]:
+        return self._build_result(await self.chain.ainvoke({"input": document_text}))
+    
     def check_relevance(self, document_text: str) -> Dict[str, Any]:
         """
         Verifica se um documento é relevante para o mercado de energia.
@@ -119,33 +156,39 @@ Análise:"""
             Exception: Se houver erro na verificação
         """
         try:
-            # Validar input básico
-            if not document_text or not document_text.strip():
-                logger.warning("Documento vazio fornecido para verificação de relevância")
-                return {
-                    "is_energy_related": False,
-                    "confidence_score": 0.0,
-                    "main_reason": "Documento vazio"
-                }
-            
-            # Limitar tamanho do texto
-            max_chars = 5000  # Suficiente para determinar relevância
-            if len(document_text) > max_chars:
-                document_text = document_text[:max_chars] + "..."
-                logger.info(f"Texto truncado para {max_chars} caracteres")
+            document_text = self._prepare_input(document_text)
+            if document_text is None:
+                return dict(EMPTY_DOCUMENT_RESULT)
             
             # Executar verificação
             logger.info("Iniciando verificação de relevância")
-            response = self.chain.invoke({"input": document_text})
+            return llm_cache.get_or_compute(
+                CACHE_STAGE, self._cache_key(document_text), lambda: self._invoke(document_text)
+            )
+            
+        except Exception as e:
+            logger.error(f"Erro na verificação de relevância: {e}")
+            raise
+    
+    async def acheck_relevance(self, document_text: str) -> Dict[str, Any]:
+        """
+        Versão assíncrona de check_relevance, baseada em ainvoke.
+        
+        Args:
+            document_text: Texto do documento para analisar
             
-            result = {
-                "is_energy_related": response.is_energy_related,
-                "confidence_score": response.confidence_score,
-                "main_reason": response.main_reason
-            }
+        Returns:
+            Dict com is_energy_related, confidence_score e main_reason
+        """
+        try:
+            document_text = self._prepare_input(document_text)
+            if document_text is None:
+                return dict(EMPTY_DOCUMENT_RESULT)
             
-            logger.info(f"Relevância verificada: {response.is_energy_related} (confiança: {response.confidence_score})")
-            return result
+            logger.info("Iniciando verificação de relevância")
+            return await llm_cache.aget_or_compute(
+                CACHE_STAGE, self._cache_key(document_text), lambda: self._ainvoke(document_text)
+            )
             
         except Exception as e:
             logger.error(f"Erro na verificação de relevância: {e}")
@@ -153,16 +196,15 @@ Análise:"""
 
 
 # Função de conveniência para usar no workflow
-def check_document_relevance(document_text: str, db_session: Session) -> Dict[str, Any]:
+def check_document_relevance(document_text: str) -> Dict[str, Any]:
     """
     Função de conveniência para verificar relevância de um documento.
     
     Args:
         document_text: Texto do documento
-        db_session: Sessão do banco de dados
         
     Returns:
         Dict com resultado da verificação
     """
-    checker = RelevanceChecker(db_session)
+    checker = llm_registry.get_service(RelevanceChecker)
     return checker.check_relevance(document_text)
\ No newline at end of file
@@ -1,5 +1,4 @@
 from typing import List, Optional
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import (
     ChatPromptTemplate,
     SystemMessagePromptTemplate,
@@ -7,13 +6,18 @@ from langchain_core.prompts import (
 )
 from langchain_core.output_parsers import PydanticOutputParser
 from sqlalchemy.orm import Session
-from app.db.models.subjects import SubjectModel
+from app.service.subject_catalog import subject_catalog
 from app.schemas.classifier_schemas import ClassifierResponse
+from app.service.llm_registry import llm_registry, DEFAULT_MODEL, DEFAULT_TEMPERATURE
+from app.service.llm_cache import llm_cache, prompt_version
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Estágio usado no cache de respostas
+CACHE_STAGE = "subjects"
+
 class SubjectsClassifier:
     """
     Classificador de assuntos para documentos do mercado de energia.
@@ -22,55 +26,67 @@ class SubjectsClassifier:
     
     def __init__(
         self, 
-        db_session: Session, 
-        model: str = "gemini-2.0-flash-001", 
-        temperature: float = 0.1,
+        model: str = DEFAULT_MODEL, 
+        temperature: float = DEFAULT_TEMPERATURE,
         max_subjects: int = 10
     ):
         """
         Inicializa o classificador de subjects.
         
+        A lista de subjects é lida do banco a cada chamada (com a sessão
+        recebida) e injetada como variável do prompt, de modo que a chain
+        é compilada uma única vez.
+        
         Args:
-            db_session: Sessão do banco de dados
             model: Modelo do Google Gemini a ser usado
             temperature: Temperatura para geração (0.0 - 1.0)
             max_subjects: Número máximo de subjects a retornar
         """
-        self.db_session = db_session
         self.max_subjects = max_subjects
         
-        # Inicializar LLM
-        self.llm = ChatGoogleGenerativeAI(
-            model=model, 
-            temperature=temperature,
-            max_output_tokens=1000
-        )
+        # LLM compartilhado pelo processo (limite de saída aplicado por chamada)
+        self.llm = llm_registry.get_llm(model, temperature, max_output_tokens=1000)
         
         # Parser para estruturar a resposta
         self.parser = PydanticOutputParser(pydantic_object=ClassifierResponse)
         
-        # Carregar subjects disponíveis do banco
-        self.available_subjects = self._load_subjects_from_db()
-        
         # Construir prompt
         self.prompt = self._build_prompt()
         
         # Criar chain
         self.chain = self.prompt | self.llm | self.parser
         
-        logger.info(f"SubjectsClassifier inicializado com {len(self.available_subjects)} subjects")
+        # Versão do prompt para o cache de respostas (a lista de subjects entra na chave)
+        self.cache_version = prompt_version(self.prompt, model, temperature, 1000)
+        
+        logger.info("SubjectsClassifier inicializado")
     
-    def _load_subjects_from_db(self) -> List[str]:
-        """Carrega lista de subjects disponíveis do banco de dados"""
+    def _load_subjects_from_db(self, db_session: Session) -> List[str]:
+        """Carrega lista de subjects disponíveis (catálogo em cache, relido só quando muda)"""
         try:
-            subjects = self.db_session.query(SubjectModel).all()
-            subjects_list = [subject.name for subject in subjects]
+            subjects_list = subject_catalog.names(db_session)
             
             if not subjects_list:
                 logger.warning("Nenhum subject encontrado no banco de dados")
                 return []
                 
-            logger.info(f"Carregados {len(subjects_list)} subjects do banco")
+            logger.info(f"Carregados {len(subjects_list)} subjects do catálogo")
+            return subjects_list
+            
+        except Exception as e:
+            logger.error(f"Erro ao carregar subjects do banco: {e}")
+            return []
+    
+    async def _aload_subjects_from_db(self) -> List[str]:
+        """Versão assíncrona de _load_subjects_from_db (sessão própria, fora do event loop)"""
+        try:
+            subjects_list = await subject_catalog.anames()
+            
+            if not subjects_list:
+                logger.warning("Nenhum subject encontrado no banco de dados")
+                return []
+                
+            logger.info(f"Carregados {len(subjects_list)} subjects do catálogo")
             return subjects_list
             
         except Exception as e:
@@ -117,16 +133,50 @@ Baseado na análise do documento acima, identifique os subjects mais relevantes
             HumanMessagePromptTemplate.from_template(human_prompt),
         ]).partial(
             format_instructions=self.parser.get_format_instructions(),
-            subjects_list=json.dumps(self.available_subjects, ensure_ascii=False, indent=2),
             max_subjects=self.max_subjects
         )
     
-    def classify_document(self, document_text: str) -> List[str]:
+    def _build_chain_input(self, document_text: str, available_subjects: List[str]) -> dict:
+        """Monta as variáveis da chain para um documento"""
+        return {
+            "input": document_text,
+            "subjects_list": json.dumps(available_subjects, ensure_ascii=False, indent=2)
+        }
+    
+    def _prepare_input(self, document_text: str, available_subjects: List[str]) -> str | None:
+        """Valida e trunca o texto de entrada; retorna None se não houver o que classificar"""
+        if not document_text or not document_text.strip():
+            logger.warning("Documento vazio fornecido para classificação")
+            return None
+        
+        if not available_subjects:
+            logger.error("Nenhum subject disponível para classificação")
+            return None
+        
+        # Limitar tamanho do texto se necessário (evitar tokens excessivos)
+        max_chars = 8000  # Aproximadamente 2000 tokens
+        if len(document_text) > max_chars:
+            document_text = document_text[:max_chars] + "..."
+            logger.info(f"Texto truncado para {max_chars} caracteres")
+        
+        return document_text
+    
+    def _cache_key(self, chain_input: dict) -> str:
+        return llm_cache.make_key(CACHE_STAGE, self.cache_version, chain_input)
+    
+    def _invoke(self, chain_input: dict) -> List[str]:
+        return self.chain.invoke(chain_input).subjects
+    
+    async def _ainvoke(self, chain_input: dict) -> List[str]:
+        return (await self.chain.ainvoke(chain_input)).subjects
+    
+    def classify_document(self, document_text: str, db_session: Session) -> List[str]:
         """
         Classifica um documento e retorna lista de subjects relevantes.
         
         Args:
             document_text: Texto do documento para classificar
+            db_session: Sessão do banco de dados (para ler os subjects)
             
         Returns:
             Lista de subjects identificados
@@ -135,44 +185,58 @@ Baseado na análise do documento acima, identifique os subjects mais relevantes
             Exception: Se houver erro na classificação
         """
         try:
-            # Validar input
-            if not document_text or not document_text.strip():
-                logger.warning("Documento vazio fornecido para classificação")
+            available_subjects = self._load_subjects_from_db(db_session)
+            document_text = self._prepare_input(document_text, available_subjects)
+            if document_text is None:
                 return []
             
-            if not self.available_subjects:
-                logger.error("Nenhum subject disponível para classificação")
-                return []
-            
-            # Limitar tamanho do texto se necessário (evitar tokens excessivos)
-            max_chars = 8000  # Aproximadamente 2000 tokens
-            if len(document_text) > max_chars:
-                document_text = document_text[:max_chars] + "..."
-                logger.info(f"Texto truncado para {max_chars} caracteres")
-            
             # Executar classificação
             logger.info("Iniciando classificação de subjects")
-            response = self.chain.invoke({"input": document_text})
+            chain_input = self._build_chain_input(document_text, available_subjects)
+            subjects = llm_cache.get_or_compute(
+                CACHE_STAGE, self._cache_key(chain_input), lambda: self._invoke(chain_input)
+            )
             
-            logger.info(f"Classificação concluída: {len(response.subjects)} subjects identificados")
-            return response.subjects
+            logger.info(f"Classificação concluída: {len(subjects)} subjects identificados")
+            return subjects
             
         except Exception as e:
             logger.error(f"Erro na classificação de subjects: {e}")
             raise
     
-
+    async def aclassify_document(self, document_text: str) -> List[str]:
+        """
+        Versão assíncrona de classify_document, baseada em ainvoke (os
+        subjects são lidos com uma sessão própria, em uma thread).
+        
+        Args:
+            document_text: Texto do documento para classificar
+            
+        Returns:
+            Lista de subjects identificados
+        """
+        try:
+            available_subjects = await self._aload_subjects_from_db()
+            document_text = self._prepare_input(document_text, available_subjects)
+            if document_text is None:
+                return []
+            
+            logger.info("Iniciando classificação de subjects")
+            chain_input = self._build_chain_input(document_text, available_subjects)
+            subjects = await llm_cache.aget_or_compute(
+                CACHE_STAGE, self._cache_key(chain_input), lambda: self._ainvoke(chain_input)
+            )
+            
+            logger.info(f"Classificação concluída: {len(subjects)} subjects identificados")
+            return subjects
+            
+        except Exception as e:
+            logger.error(f"Erro na classificação de subjects: {e}")
+            raise
     
-    def get_available_subjects(self) -> List[str]:
+    def get_available_subjects(self, db_session: Session) -> List[str]:
         """Retorna lista de subjects disponíveis"""
-        return self.available_subjects.copy()
-    
-    def refresh_subjects(self) -> None:
-        """Recarrega subjects do banco de dados"""
-        logger.info("Recarregando subjects do banco de dados")
-        self.available_subjects = self._load_subjects_from_db()
-        self.prompt = self._build_prompt()
-        self.chain = self.prompt | self.llm | self.parser
+        return self._load_subjects_from_db(db_session)
 
 
 # Função de conveniência para usar no workflow
@@ -192,5 +256,5 @@ def classify_document_subjects(
     Returns:
         Lista de subjects classificados
     """
-    classifier = SubjectsClassifier(db_session, max_subjects=max_subjects)
-    return classifier.classify_document(document_text)
\ No newline at end of file
+    classifier = llm_registry.get_service(SubjectsClassifier, max_subjects=max_subjects)
+    return classifier.classify_document(document_text, db_session)
\ No newline at end of file
@@ -1,14 +1,17 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import (
     ChatPromptTemplate,
     SystemMessagePromptTemplate,
     HumanMessagePromptTemplate
 )
-from sqlalchemy.orm import Session
+from app.service.llm_registry import llm_registry, DEFAULT_MODEL, DEFAULT_TEMPERATURE
+from app.service.llm_cache import llm_cache, prompt_version
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Estágio usado no cache de respostas
+CACHE_STAGE = "theme"
+
 class ThemeClassifier:
     """
     Classificador de tema central para documentos do mercado de energia.
@@ -18,26 +21,18 @@ class ThemeClassifier:
     
     def __init__(
         self, 
-        db_session: Session, 
-        model: str = "gemini-2.0-flash-001", 
-        temperature: float = 0.1
+        model: str = DEFAULT_MODEL, 
+        temperature: float = DEFAULT_TEMPERATURE
     ):
         """
         Inicializa o classificador de tema central.
         
         Args:
-            db_session: Sessão do banco de dados (para consistência com outros classificadores)
             model: Modelo do Google Gemini a ser usado
             temperature: Temperatura para geração (0.0 - 1.0)
         """
-        self.db_session = db_session
-        
-        # Inicializar LLM
-        self.llm = ChatGoogleGenerativeAI(
-            model=model, 
-            temperature=temperature,
-            max_output_tokens=100  # Tema central deve ser conciso
-        )
+        # LLM compartilhado pelo processo (limite de saída aplicado por chamada)
+        self.llm = llm_registry.get_llm(model, temperature, max_output_tokens=100)  # Tema central deve ser conciso
         
         # Construir prompt
         self.prompt = self._build_prompt()
@@ -45,6 +40,9 @@ class ThemeClassifier:
         # Criar chain
         self.chain = self.prompt | self.llm
         
+        # Versão do prompt para o cache de respostas
+        self.cache_version = prompt_version(self.prompt, model, temperature, 100)
+        
         logger.info("ThemeClassifier inicializado")
     
     def _build_prompt(self) -> ChatPromptTemplate:
@@ -82,6 +80,40 @@ TEMA CENTRAL:"""
             HumanMessagePromptTemplate.from_template(human_prompt),
         ])
     
+    def _prepare_input(self, document_text: str) -> str | None:
+        """Valida e trunca o texto de entrada; retorna None se estiver vazio"""
+        if not document_text or not document_text.strip():
+            logger.warning("Documento vazio fornecido para classificação de tema")
+            return None
+        
+        # Limitar tamanho do texto
+        max_chars = 6000  # Menor que subjects pois tema é mais simples
+        if len(document_text) > max_chars:
+            document_text = document_text[:max_chars] + "..."
+            logger.info(f"Texto truncado para {max_chars} caracteres")
+        
+        return document_text
+    
+    def _clean_theme(self, content: str) -> str:
+        """Limpa e valida a resposta do modelo"""
+        theme = content.strip()
+        
+        # Remover aspas se existirem
+        if theme.startswith('"') and theme.endswith('"'):
+            theme = theme[1:-1]
+        
+        logger.info(f"Tema central identificado: {theme}")
+        return theme
+    
+    def _cache_key(self, document_text: str) -> str:
+        return llm_cache.make_key(CACHE_STAGE, self.cache_version, {"input": document_text})
+    
+    def _invoke(self, document_text: str) -> str:
+        return self._clean_theme(self.chain.invoke({"input": document_text}).content)
+    
+    async def _ainvoke(self, document_text: str) -> str:
+        return self._clean_theme((await self.chain.ainvoke({"input": document_text})).content)
+    
     def classify_theme(self, document_text: str) -> str:
         """
         Identifica o tema central de um documento.
@@ -96,30 +128,39 @@ TEMA CENTRAL:"""
             Exception: Se houver erro na classificação
         """
         try:
-            # Validar input básico
-            if not document_text or not document_text.strip():
-                logger.warning("Documento vazio fornecido para classificação de tema")
+            document_text = self._prepare_input(document_text)
+            if document_text is None:
                 return ""
             
-            # Limitar tamanho do texto
-            max_chars = 6000  # Menor que subjects pois tema é mais simples
-            if len(document_text) > max_chars:
-                document_text = document_text[:max_chars] + "..."
-                logger.info(f"Texto truncado para {max_chars} caracteres")
-            
             # Executar classificação
             logger.info("Iniciando classificação de tema central")
-            response = self.chain.invoke({"input": document_text})
+            return llm_cache.get_or_compute(
+                CACHE_STAGE, self._cache_key(document_text), lambda: self._invoke(document_text)
+            )
             
-            # Limpar e validar resposta
-            theme = response.content.strip()
+        except Exception as e:
+            logger.error(f"Erro na classificação de tema central: {e}")
+            raise
+    
+    async def aclassify_theme(self, document_text: str) -> str:
+        """
+        Versão assíncrona de classify_theme, baseada em ainvoke.
+        
+        Args:
+            document_text: Texto do documento para analisar
             
-            # Remover aspas se existirem
-            if theme.startswith('"') and theme.endswith('"'):
-                theme = theme[1:-1]
+        Returns:
+            String com o tema central identificado
+        """
+        try:
+            document_text = self._prepare_input(document_text)
+            if document_text is None:
+                return ""
             
-            logger.info(f"Tema central identificado: {theme}")
-            return theme
+            logger.info("Iniciando classificação de tema central")
+            return await llm_cache.aget_or_compute(
+                CACHE_STAGE, self._cache_key(document_text), lambda: self._ainvoke(document_text)
+            )
             
         except Exception as e:
             logger.error(f"Erro na classificação de tema central: {e}")
@@ -127,16 +168,15 @@ TEMA CENTRAL:"""
 
 
 # Função de conveniência para usar no workflow
-def classify_central_theme(document_text: str, db_session: Session) -> str:
+def classify_central_theme(document_text: str) -> str:
     """
     Função de conveniência para classificar tema central de um documento.
     
     Args:
         document_text: Texto do documento
-        db_session: Sessão do banco de dados
         
     Returns:
         Tema central identificado
     """
-    classifier = ThemeClassifier(db_session)
+    classifier = llm_registry.get_service(ThemeClassifier)
     return classifier.classify_theme(document_text)
\ No newline at end of file
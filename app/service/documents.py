@@ -0,0 +1,160 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from typing import Generic, List, Optional, TypeVar
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer, selectinload
+from app.db.models.documents import PrimaryDocumentModel, SecondaryDocumentModel
+from app.db.models.subjects import SubjectModel
+from app.ingestion.splitter import DocumentProcessor
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class InvalidCursorError(ValueError):
+    """Cursor de paginação malformado ou adulterado"""
+
+
+@dataclass
+class Page(Generic[T]):
+    """Página de resultados com o cursor da próxima (None na última)"""
+    items: List[T]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(last_id: int) -> str:
+    """Cursor opaco com a chave do último item da página"""
+    payload = json.dumps({"id": last_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))["id"]
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError) as e:
+        raise InvalidCursorError(f"Cursor inválido: {cursor}") from e
+    if not isinstance(last_id, int) or isinstance(last_id, bool):
+        raise InvalidCursorError(f"Cursor inválido: {cursor}")
+    return last_id
+
+
+async def _paginate(db: AsyncSession, statement, model, limit: int, cursor: Optional[str]) -> Page:
+    """
+    Paginação por keyset sobre a chave primária: a página seguinte começa
+    após o último ID retornado, então o custo não depende da posição da
+    página (ao contrário de OFFSET).
+    """
+    if cursor:
+        statement = statement.where(model.id > decode_cursor(cursor))
+    # Um item a mais indica se existe próxima página
+    result = await db.execute(statement.order_by(model.id).limit(limit + 1))
+    items = list(result.scalars().all())
+    next_cursor = encode_cursor(items[limit - 1].id) if len(items) > limit else None
+    return Page(items=items[:limit], next_cursor=next_cursor)
+
+
+def _document_query(model, compact: bool, document_year: Optional[int], document_type: Optional[str], subject: Optional[str]):
+    """SELECT dos documentos com subjects em lote (selectinload) e filtros opcionais"""
+    statement = select(model).options(selectinload(model.subjects))
+    if compact:
+        # Projeção leve: campos longos não saem do banco
+        statement = statement.options(defer(model.summary), defer(model.key_points))
+    if document_year is not None:
+        statement = statement.where(model.document_year == document_year)
+    if document_type:
+        statement = statement.where(model.document_type == document_type)
+    if subject:
+        statement = statement.where(model.subjects.any(SubjectModel.name == subject))
+    return statement
+
+
+async def list_primary_documents(
+    db: AsyncSession,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    document_year: Optional[int] = None,
+    document_type: Optional[str] = None,
+    subject: Optional[str] = None,
+    compact: bool = False
+) -> Page[PrimaryDocumentModel]:
+    """
+    Lista uma página de documentos primários, com os subjects já carregados.
+
+    Args:
+        limit: Tamanho da página
+        cursor: next_cursor da página anterior
+        document_year: Filtra pelo ano
+        document_type: Filtra pelo tipo
+        subject: Filtra pelo nome de um subject associado
+        compact: Não carrega summary e key_points
+
+    Raises:
+        InvalidCursorError: Se o cursor for inválido
+    """
+    statement = _document_query(PrimaryDocumentModel, compact, document_year, document_type, subject)
+    return await _paginate(db, statement, PrimaryDocumentModel, limit, cursor)
+
+
+async def get_primary_document(db: AsyncSession, doc_id: int) -> Optional[PrimaryDocumentModel]:
+    result = await db.execute(
+        select(PrimaryDocumentModel)
+        .options(selectinload(PrimaryDocumentModel.subjects))
+        .where(PrimaryDocumentModel.id == doc_id)
+    )
+    return result.scalars().first()
+
+
+async def list_secondary_documents(
+    db: AsyncSession,
+    primary_id: int,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    document_year: Optional[int] = None,
+    document_type: Optional[str] = None,
+    subject: Optional[str] = None,
+    compact: bool = False
+) -> Page[SecondaryDocumentModel]:
+    """Lista uma página dos secundários de um documento primário (mesmos filtros de list_primary_documents)"""
+    statement = _document_query(SecondaryDocumentModel, compact, document_year, document_type, subject)
+    statement = statement.where(SecondaryDocumentModel.primary_id == primary_id)
+    return await _paginate(db, statement, SecondaryDocumentModel, limit, cursor)
+
+
+async def delete_primary_document(db: AsyncSession, doc_id: int) -> Optional[int]:
+    """
+    Remove um documento primário, seus secundários e os chunks de ambos no
+    vector store (um único DELETE).
+
+    Returns:
+        Número de secundários removidos, ou None se o primário não existir
+    """
+    primary_document = await get_primary_document(db, doc_id)
+    if not primary_document:
+        return None
+
+    result = await db.execute(
+        select(SecondaryDocumentModel)
+        .options(selectinload(SecondaryDocumentModel.subjects))
+        .where(SecondaryDocumentModel.primary_id == doc_id)
+    )
+    secondary_documents = list(result.scalars().all())
+
+    splitter = DocumentProcessor(collection_name=primary_document.collection_name)
+    try:
+        removed_chunks = await splitter.adelete_primary_from_vector_db(doc_id)
+        logger.info(f"{removed_chunks} chunks removidos da coleção '{primary_document.collection_name}'")
+    except Exception as e:
+        logger.error(f"Erro ao remover chunks da coleção '{primary_document.collection_name}' do vector store: {str(e)}")
+
+    for secondary in secondary_documents:
+        await db.delete(secondary)
+    await db.delete(primary_document)
+    await db.commit()
+
+    return len(secondary_documents)
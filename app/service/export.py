@@ -0,0 +1,77 @@
+import zlib
+from typing import AsyncIterator, Iterable
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from app.core.config import settings
+from app.db.models.documents import PrimaryDocumentModel, SecondaryDocumentModel
+from app.db.session import AsyncSessionLocal
+from app.schemas.documents import PrimaryDocumentResponse, SecondaryDocumentResponse
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXPORT_KINDS = {
+    "primary": (PrimaryDocumentModel, PrimaryDocumentResponse),
+    "secondary": (SecondaryDocumentModel, SecondaryDocumentResponse),
+}
+
+# Bytes acumulados antes de cada envio ao cliente
+_FLUSH_BYTES = 64 * 1024
+
+
+async def _ndjson_lines(kinds: Iterable[str], batch_size: int) -> AsyncIterator[bytes]:
+    """
+    Uma linha JSON por documento, lida do banco com cursor do lado do
+    servidor (yield_per): apenas batch_size documentos ficam em memória.
+
+    A sessão é aberta aqui, e não recebida do endpoint, porque ela precisa
+    continuar aberta enquanto a resposta é enviada.
+    """
+    async with AsyncSessionLocal() as session:
+        for kind in kinds:
+            model, schema = EXPORT_KINDS[kind]
+            statement = (
+                select(model)
+                .options(selectinload(model.subjects))
+                .order_by(model.id)
+                .execution_options(yield_per=batch_size)
+            )
+            exported = 0
+            result = await session.stream(statement)
+            async for partition in result.scalars().partitions():
+                for document in partition:
+                    row = schema.model_validate(document).model_dump()
+                    row["kind"] = kind
+                    yield orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE)
+                # Documentos já serializados não precisam continuar na sessão
+                session.expunge_all()
+                exported += len(partition)
+            logger.info(f"Exportação: {exported} documentos '{kind}' enviados")
+
+
+async def export_documents(
+    kinds: Iterable[str],
+    compress: bool = False,
+    batch_size: int = settings.export_batch_size
+) -> AsyncIterator[bytes]:
+    """
+    Gera a exportação em NDJSON (ou NDJSON gzip) em blocos de até ~64 KB,
+    prontos para uma StreamingResponse.
+
+    Args:
+        kinds: Tipos exportados, na ordem ("primary" e/ou "secondary")
+        compress: Comprime a saída com gzip
+        batch_size: Documentos lidos do banco por vez
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+    buffer = bytearray()
+    async for line in _ndjson_lines(kinds, batch_size):
+        buffer += compressor.compress(line) if compressor else line
+        if len(buffer) >= _FLUSH_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if compressor:
+        buffer += compressor.flush()
+    if buffer:
+        yield bytes(buffer)
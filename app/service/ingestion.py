@@ -0,0 +1,404 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from fastapi import UploadFile
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.db.models.documents import PrimaryDocumentModel, SecondaryDocumentModel
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.service.subject_catalog import subject_catalog
+from app.ingestion.splitter import DocumentProcessor
+from app.service.workflow import document_workflow
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Campos do formulário de cada tipo de documento (gravados nos jobs assíncronos)
+PRIMARY_FIELDS = (
+    "document_type", "document_name", "document_number", "document_year",
+    "presented_by", "presented_at", "link"
+)
+SECONDARY_FIELDS = PRIMARY_FIELDS + ("primary_id", "role", "party_affiliation")
+
+
+class IngestionError(Exception):
+    """Erro de ingestão com o status HTTP correspondente"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _parse_datetime(value: Any) -> Any:
+    """Aceita datetime ou string ISO (parâmetros vindos de um job)"""
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def build_duplicate_response(document, **extra):
+    """Monta a resposta de um upload cujo conteúdo já foi processado"""
+    return {
+        "document_name": document.document_name,
+        "document_id": document.id,
+        **extra,
+        "processing_status": "duplicate",
+        "subjects": [subject.name for subject in document.subjects],
+        "central_theme": document.central_theme,
+        "key_points": document.key_points,
+        "relevance_score": None,
+        "chunks_processed": 0,
+        "message": f"Arquivo já processado anteriormente (documento {document.id}); use force_reprocess para reprocessar"
+    }
+
+
+async def afind_duplicate_primary(db: AsyncSession, content_hash: str) -> Optional[PrimaryDocumentModel]:
+    """Retorna o documento primário mais recente com o mesmo conteúdo (com os subjects já carregados)"""
+    result = await db.execute(
+        select(PrimaryDocumentModel)
+        .options(selectinload(PrimaryDocumentModel.subjects))
+        .where(PrimaryDocumentModel.content_hash == content_hash)
+        .order_by(PrimaryDocumentModel.id.desc())
+        .limit(1)
+    )
+    return result.scalars().first()
+
+
+async def afind_duplicate_secondary(db: AsyncSession, primary_id: int, content_hash: str) -> Optional[SecondaryDocumentModel]:
+    """Retorna o secundário mais recente com o mesmo conteúdo, no escopo do primário (com os subjects já carregados)"""
+    result = await db.execute(
+        select(SecondaryDocumentModel)
+        .options(selectinload(SecondaryDocumentModel.subjects))
+        .where(
+            SecondaryDocumentModel.primary_id == primary_id,
+            SecondaryDocumentModel.content_hash == content_hash
+        )
+        .order_by(SecondaryDocumentModel.id.desc())
+        .limit(1)
+    )
+    return result.scalars().first()
+
+
+@dataclass(frozen=True)
+class PrimaryContext:
+    """Dados do documento primário usados na ingestão dos seus secundários"""
+    id: int
+    document_name: str
+    collection_name: str
+    summary: Optional[str]
+
+
+async def aload_primary_context(db: AsyncSession, primary_id: int) -> PrimaryContext:
+    """Carrega os dados do primário uma única vez (compartilháveis entre sessões)"""
+    primary = await aget_primary_or_raise(db, primary_id)
+    return PrimaryContext(
+        id=primary.id,
+        document_name=primary.document_name,
+        collection_name=primary.collection_name,
+        summary=primary.summary
+    )
+
+
+async def aget_primary_or_raise(db: AsyncSession, primary_id: int) -> PrimaryDocumentModel:
+    """Retorna o documento primário ou lança IngestionError 404"""
+    primary = await db.get(PrimaryDocumentModel, primary_id)
+    if not primary:
+        raise IngestionError(404, f"Documento primário com ID {primary_id} não encontrado")
+    return primary
+
+
+def _save_document(document, subject_names) -> int:
+    """
+    Grava o documento e associa os subjects identificados pelo workflow em
+    uma transação curta, com sessão própria (executada em uma thread, fora
+    do event loop).
+
+    Returns:
+        ID do documento gravado
+    """
+    with SessionLocal() as db:
+        db.add(document)
+        db.flush()  # Para obter o ID
+        document_id = document.id
+        subject_catalog.link(db, document, subject_names)
+        db.commit()
+    return document_id
+
+
+def _delete_document(model, document_id: int) -> None:
+    """Remove o documento gravado por _save_document (e as associações com subjects)"""
+    with SessionLocal() as db:
+        document = db.get(model, document_id)
+        if document is not None:
+            db.delete(document)
+            db.commit()
+
+
+async def _store_chunks(model, document, workflow_result: Dict[str, Any], collection_name: str, parent_id: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Grava o documento (commit antes da indexação, para que nenhuma transação
+    fique aberta durante as chamadas de embedding) e indexa seus chunks no
+    vector store. Se a indexação falhar, o documento e os chunks já gravados
+    são removidos.
+
+    Returns:
+        (ID do documento, número de chunks indexados)
+    """
+    # Lidos antes da gravação: após o commit a instância fica expirada e desanexada
+    filename, document_type = document.filename, document.document_type
+    document_id = await asyncio.to_thread(_save_document, document, workflow_result["subjects"])
+    splitter = DocumentProcessor(collection_name=collection_name)
+    try:
+        processed_chunks = await splitter.aprocess_and_store_document(
+            md_text=workflow_result["summary"],
+            doc_id=document_id,
+            filename=filename,
+            document_type=document_type,
+            parent_id=parent_id,
+            subjects=workflow_result["subjects"]
+        )
+    except Exception:
+        # Cleanup em caso de erro; falhas aqui não devem esconder o erro principal
+        try:
+            await splitter.adelete_document_from_vector_db(document_id, parent_id=parent_id)
+        except Exception as e:
+            logger.error(f"Erro ao remover chunks do documento {document_id}: {e}")
+        try:
+            await asyncio.to_thread(_delete_document, model, document_id)
+        except Exception as e:
+            logger.error(f"Erro ao remover documento {document_id} após falha na indexação: {e}")
+        raise
+    return document_id, processed_chunks
+
+
+def _irrelevant_response(document_name: str, workflow_result: Dict[str, Any], **extra) -> Dict[str, Any]:
+    return {
+        "document_name": document_name,
+        "status": "irrelevant",
+        **extra,
+        "relevance_score": workflow_result["relevance_score"],
+        "reason": workflow_result["irrelevance_reasons"][0] if workflow_result["irrelevance_reasons"] else "Não relacionado ao mercado de energia",
+        "message": "Documento processado mas marcado como irrelevante"
+    }
+
+
+async def ingest_primary(
+    params: Dict[str, Any],
+    filename: str,
+    content_hash: str,
+    force_reprocess: bool = False,
+    file: Optional[UploadFile] = None,
+    file_path: Optional[str] = None,
+    on_node: Optional[Callable[[str], Awaitable[None]]] = None
+) -> Dict[str, Any]:
+    """
+    Processa um documento primário: workflow, gravação no banco e indexação.
+
+    Cada acesso ao banco usa uma sessão própria e curta: nenhuma conexão
+    fica presa (ou com transação aberta) durante as chamadas de LLM e de
+    embedding.
+
+    Args:
+        params: Campos do formulário (PRIMARY_FIELDS)
+        filename: Nome original do arquivo
+        content_hash: SHA-256 do arquivo (deduplicação)
+        force_reprocess: Reprocessa mesmo que o conteúdo já tenha sido ingerido
+        file: Upload a converter (ou file_path)
+        file_path: PDF já gravado em disco (ou file)
+        on_node: Callback de progresso por nó do workflow
+
+    Returns:
+        Resposta do processamento (sucesso, duplicado ou irrelevante)
+
+    Raises:
+        IngestionError: Se o processamento falhar
+    """
+    document_name = params["document_name"]
+    document_type = params["document_type"]
+    logger.info(f"Iniciando processamento do documento primário {document_name}")
+
+    collection_name = f"{document_type}_{document_name}"
+    try:
+        # Deduplicação pelo conteúdo do arquivo
+        if not force_reprocess:
+            async with AsyncSessionLocal() as db:
+                existing = await afind_duplicate_primary(db, content_hash)
+            if existing:
+                logger.info(f"Documento primário {document_name} já processado (ID {existing.id})")
+                return build_duplicate_response(existing)
+
+        workflow_result = await document_workflow.process_document(
+            file=file,
+            file_path=file_path,
+            filename=filename,
+            primary_id=None,
+            on_node=on_node
+        )
+
+        # Verificar se o workflow foi bem-sucedido
+        if workflow_result["processing_status"] == "error":
+            logger.error(f"Erro no workflow: {workflow_result['error_message']}")
+            raise IngestionError(500, workflow_result["error_message"])
+
+        # Verificar se documento é irrelevante
+        if workflow_result["processing_status"] == "irrelevant":
+            logger.warning(f"Documento {document_name} marcado como irrelevante")
+            return _irrelevant_response(document_name, workflow_result)
+
+        # Criar documento no banco com resultados do workflow
+        document = PrimaryDocumentModel(
+            filename=filename,
+            document_type=document_type,
+            collection_name=collection_name,
+            summary=workflow_result["summary"],
+            central_theme=workflow_result["central_theme"],
+            key_points=workflow_result["key_points"],
+            document_number=params["document_number"],
+            document_year=params["document_year"],
+            document_name=document_name,
+            presented_by=params["presented_by"],
+            presented_at=_parse_datetime(params["presented_at"]),
+            link=params["link"],
+            content_hash=content_hash
+        )
+        document_id, processed_chunks = await _store_chunks(
+            PrimaryDocumentModel, document, workflow_result, collection_name
+        )
+
+        logger.info(f"Documento primário {document_name} processado com sucesso")
+
+        return {
+            "document_name": document_name,
+            "document_id": document_id,
+            "processing_status": workflow_result["processing_status"],
+            "subjects": workflow_result["subjects"],
+            "central_theme": workflow_result["central_theme"],
+            "key_points": workflow_result["key_points"],
+            "relevance_score": workflow_result["relevance_score"],
+            "chunks_processed": processed_chunks,
+            "message": f"{processed_chunks} chunks indexados na coleção '{collection_name}'"
+        }
+
+    except IngestionError:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao processar documento primário {document_name}: {str(e)}")
+        raise IngestionError(500, f"Erro ao processar documento: {str(e)}")
+
+
+async def ingest_secondary(
+    params: Dict[str, Any],
+    filename: str,
+    content_hash: str,
+    force_reprocess: bool = False,
+    file: Optional[UploadFile] = None,
+    file_path: Optional[str] = None,
+    on_node: Optional[Callable[[str], Awaitable[None]]] = None,
+    primary: Optional[PrimaryContext] = None
+) -> Dict[str, Any]:
+    """
+    Processa um documento secundário, resumido no contexto do seu primário
+    (sessões curtas, como em ingest_primary).
+
+    Args:
+        params: Campos do formulário (SECONDARY_FIELDS)
+        filename: Nome original do arquivo
+        content_hash: SHA-256 do arquivo (deduplicação no escopo do primário)
+        force_reprocess: Reprocessa mesmo que o conteúdo já tenha sido ingerido
+        file: Upload a converter (ou file_path)
+        file_path: PDF já gravado em disco (ou file)
+        on_node: Callback de progresso por nó do workflow
+        primary: Contexto do primário já carregado (ex.: ingestão em lote)
+
+    Returns:
+        Resposta do processamento (sucesso, duplicado ou irrelevante)
+
+    Raises:
+        IngestionError: Se o primário não existir ou o processamento falhar
+    """
+    document_name = params["document_name"]
+    document_type = params["document_type"]
+    primary_id = params["primary_id"]
+    logger.info(f"Iniciando processamento do documento secundário {document_name}")
+
+    try:
+        existing = None
+        async with AsyncSessionLocal() as db:
+            if primary is None:
+                primary = await aload_primary_context(db, primary_id)
+            # Deduplicação pelo conteúdo do arquivo (no escopo do documento primário)
+            if not force_reprocess:
+                existing = await afind_duplicate_secondary(db, primary_id, content_hash)
+        if existing:
+            logger.info(f"Documento secundário {document_name} já processado (ID {existing.id})")
+            return build_duplicate_response(existing, primary_document=primary.document_name)
+
+        workflow_result = await document_workflow.process_document(
+            file=file,
+            file_path=file_path,
+            filename=filename,
+            primary_id=primary_id,
+            on_node=on_node,
+            primary_context=primary.summary
+        )
+
+        # Verificar se o workflow foi bem-sucedido
+        if workflow_result["processing_status"] == "error":
+            logger.error(f"Erro no workflow: {workflow_result['error_message']}")
+            raise IngestionError(500, workflow_result["error_message"])
+
+        # Verificar se documento é irrelevante
+        if workflow_result["processing_status"] == "irrelevant":
+            logger.warning(f"Documento secundário {document_name} marcado como irrelevante")
+            return _irrelevant_response(document_name, workflow_result, primary_document=primary.document_name)
+
+        # Criar documento secundário no banco com resultados do workflow
+        document = SecondaryDocumentModel(
+            filename=filename,
+            document_type=document_type,
+            document_name=document_name,
+            presented_by=params["presented_by"],
+            presented_at=_parse_datetime(params["presented_at"]),
+            summary=workflow_result["summary"],  # Summary contextualizado
+            central_theme=workflow_result["central_theme"],
+            key_points=workflow_result["key_points"],
+            party_affiliation=params["party_affiliation"],
+            role=params["role"],
+            document_number=params["document_number"],
+            document_year=params["document_year"],
+            primary_id=primary_id,
+            link=params["link"],
+            content_hash=content_hash
+        )
+        document_id, processed_chunks = await _store_chunks(
+            SecondaryDocumentModel, document, workflow_result, primary.collection_name, parent_id=primary_id
+        )
+
+        logger.info(f"Documento secundário {document_name} processado com sucesso")
+
+        return {
+            "document_name": document_name,
+            "document_id": document_id,
+            "primary_document": primary.document_name,
+            "processing_status": workflow_result["processing_status"],
+            "subjects": workflow_result["subjects"],
+            "central_theme": workflow_result["central_theme"],
+            "key_points": workflow_result["key_points"],
+            "relevance_score": workflow_result["relevance_score"],
+            "chunks_processed": processed_chunks,
+            "message": f"{processed_chunks} chunks indexados na coleção '{primary.collection_name}'"
+        }
+
+    except IngestionError:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao processar documento secundário {document_name}: {str(e)}")
+        raise IngestionError(500, f"Erro ao processar documento: {str(e)}")
+
+
+# Funções de ingestão por tipo de documento (usadas pelos workers da fila)
+INGESTORS = {
+    "primary": ingest_primary,
+    "secondary": ingest_secondary,
+}
@@ -0,0 +1,190 @@
+from datetime import timedelta
+from typing import Any, Dict, Optional
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.models.ingestion_job import IngestionJobModel
+from app.db.session import SessionLocal
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """
+    Fila durável de jobs de ingestão sobre a tabela ingestion_jobs.
+
+    Os workers disputam os jobs com SELECT ... FOR UPDATE SKIP LOCKED, de
+    modo que cada job é entregue a um único worker sem broker externo.
+    Jobs "running" cujo lock não é renovado dentro de lock_timeout_seconds
+    (worker que caiu) voltam a ser elegíveis até esgotarem max_attempts.
+    """
+
+    def __init__(self, lock_timeout_seconds: int = 900, max_attempts: int = 3):
+        self.lock_timeout_seconds = lock_timeout_seconds
+        self.max_attempts = max_attempts
+
+    def _lock_cutoff(self):
+        return func.now() - timedelta(seconds=self.lock_timeout_seconds)
+
+    @staticmethod
+    def _new_job(kind, filename, payload, content_hash, params, force_reprocess) -> IngestionJobModel:
+        return IngestionJobModel(
+            kind=kind,
+            status="queued",
+            filename=filename,
+            payload=payload,
+            content_hash=content_hash,
+            params=params,
+            force_reprocess=force_reprocess
+        )
+
+    def enqueue(
+        self,
+        db: Session,
+        kind: str,
+        filename: str,
+        payload: bytes,
+        content_hash: str,
+        params: Dict[str, Any],
+        force_reprocess: bool = False
+    ) -> IngestionJobModel:
+        """Cria um job na fila e retorna o registro gravado"""
+        job = self._new_job(kind, filename, payload, content_hash, params, force_reprocess)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        logger.info(f"Job {job.id} ({kind}) enfileirado para {filename}")
+        return job
+
+    async def aenqueue(
+        self,
+        db: AsyncSession,
+        kind: str,
+        filename: str,
+        payload: bytes,
+        content_hash: str,
+        params: Dict[str, Any],
+        force_reprocess: bool = False
+    ) -> IngestionJobModel:
+        """Versão assíncrona de enqueue"""
+        job = self._new_job(kind, filename, payload, content_hash, params, force_reprocess)
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+        logger.info(f"Job {job.id} ({kind}) enfileirado para {filename}")
+        return job
+
+    def get(self, db: Session, job_id: str) -> Optional[IngestionJobModel]:
+        return db.query(IngestionJobModel).filter(IngestionJobModel.id == job_id).first()
+
+    async def aget(self, db: AsyncSession, job_id: str) -> Optional[IngestionJobModel]:
+        return await db.get(IngestionJobModel, job_id)
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Reserva o próximo job disponível para o worker.
+
+        Returns:
+            Dados do job (incluindo o payload) ou None se a fila estiver vazia
+        """
+        with SessionLocal() as session:
+            # Jobs abandonados que já esgotaram as tentativas não voltam à fila
+            session.execute(
+                update(IngestionJobModel)
+                .where(
+                    IngestionJobModel.status == "running",
+                    IngestionJobModel.locked_at < self._lock_cutoff(),
+                    IngestionJobModel.attempts >= self.max_attempts
+                )
+                .values(
+                    status="failed",
+                    error="Worker interrompido e tentativas esgotadas",
+                    payload=None,
+                    finished_at=func.now()
+                )
+            )
+
+            job = session.execute(
+                select(IngestionJobModel)
+                .where(or_(
+                    IngestionJobModel.status == "queued",
+                    and_(
+                        IngestionJobModel.status == "running",
+                        IngestionJobModel.locked_at < self._lock_cutoff()
+                    )
+                ))
+                .order_by(IngestionJobModel.created_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            ).scalar_one_or_none()
+
+            if job is None:
+                session.commit()
+                return None
+
+            if job.status == "running":
+                logger.warning(f"Retomando job {job.id} abandonado por {job.locked_by}")
+
+            job.status = "running"
+            job.attempts += 1
+            job.current_node = None
+            job.locked_by = worker_id
+            job.locked_at = func.now()
+            claimed = {
+                "id": job.id,
+                "kind": job.kind,
+                "filename": job.filename,
+                "payload": job.payload,
+                "content_hash": job.content_hash,
+                "params": job.params,
+                "force_reprocess": job.force_reprocess,
+                "attempts": job.attempts,
+            }
+            session.commit()
+            return claimed
+
+    def _update(self, job_id: str, worker_id: str, **values: Any) -> None:
+        """Atualiza o job se ele ainda pertencer ao worker"""
+        with SessionLocal() as session:
+            session.execute(
+                update(IngestionJobModel)
+                .where(IngestionJobModel.id == job_id, IngestionJobModel.locked_by == worker_id)
+                .values(**values)
+            )
+            session.commit()
+
+    def heartbeat(self, job_id: str, worker_id: str, current_node: Optional[str] = None) -> None:
+        """Renova o lock do job (e registra o último nó concluído, se informado)"""
+        values: Dict[str, Any] = {"locked_at": func.now()}
+        if current_node is not None:
+            values["current_node"] = current_node
+        self._update(job_id, worker_id, **values)
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> None:
+        """Marca o job como concluído e descarta o payload"""
+        self._update(
+            job_id, worker_id,
+            status="succeeded", result=result, error=None, payload=None,
+            locked_at=None, finished_at=func.now()
+        )
+
+    def fail(self, job_id: str, worker_id: str, error: str, attempts: int, retryable: bool = True) -> None:
+        """Devolve o job à fila ou, sem novas tentativas, marca-o como falho"""
+        if retryable and attempts < self.max_attempts:
+            logger.warning(f"Job {job_id} falhou (tentativa {attempts}); voltando para a fila: {error}")
+            self._update(job_id, worker_id, status="queued", error=error, locked_by=None, locked_at=None)
+        else:
+            logger.error(f"Job {job_id} falhou definitivamente: {error}")
+            self._update(
+                job_id, worker_id,
+                status="failed", error=error, payload=None, locked_at=None, finished_at=func.now()
+            )
+
+
+# Instância única da fila para o processo
+job_queue = JobQueue(
+    lock_timeout_seconds=settings.job_lock_timeout_seconds,
+    max_attempts=settings.job_max_attempts
+)
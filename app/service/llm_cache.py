@@ -0,0 +1,206 @@
+import asyncio
+import copy
+import hashlib
+import json
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict
+from cachetools import TTLCache
+from langchain_core.prompts import ChatPromptTemplate
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from app.core.config import settings
+from app.db.models.llm_cache import LLMResponseCacheModel
+from app.db.session import SessionLocal
+import logging
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def prompt_version(prompt: ChatPromptTemplate, *extra: Any) -> str:
+    """
+    Gera a versão de um prompt a partir do texto de seus templates e das
+    variáveis parciais. Qualquer alteração no prompt (ex.: em promt.py)
+    muda a versão e, portanto, invalida as entradas de cache do estágio.
+
+    Args:
+        prompt: Template do prompt do estágio
+        *extra: Parâmetros adicionais que afetam a resposta (modelo, temperatura...)
+    """
+    templates = [
+        getattr(getattr(message, "prompt", None), "template", repr(message))
+        for message in prompt.messages
+    ]
+    payload = json.dumps(
+        [templates, sorted((k, str(v)) for k, v in prompt.partial_variables.items()), [str(e) for e in extra]],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class LLMResponseCache:
+    """
+    Cache de respostas dos estágios de LLM em duas camadas.
+
+    A primeira camada é um LRU local com TTL; a segunda é a tabela
+    llm_response_cache no Postgres, compartilhada entre processos, com
+    TTL e limite de linhas (as mais antigas são removidas periodicamente).
+    As chaves combinam estágio, versão do prompt (que inclui modelo e
+    temperatura) e hash da entrada. Mantém contadores de hit/miss por estágio.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        ttl_seconds: int = 30 * 24 * 3600,
+        local_size: int = 1024,
+        max_rows: int = 50000,
+        prune_every: int = 100
+    ):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self.prune_every = prune_every
+        self._local = TTLCache(maxsize=local_size, ttl=ttl_seconds)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"local_hits": 0, "db_hits": 0, "misses": 0})
+
+    @staticmethod
+    def make_key(stage: str, version: str, inputs: Dict[str, Any]) -> str:
+        """Monta a chave de cache de uma chamada"""
+        payload = json.dumps([stage, version, inputs], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # ==================== CAMADAS ====================
+
+    def _count(self, stage: str, counter: str) -> None:
+        with self._lock:
+            self._stats[stage][counter] += 1
+
+    def _get_local(self, key: str) -> Any:
+        with self._lock:
+            value = self._local.get(key, _MISSING)
+        # Cópia para que o chamador não altere a entrada em memória
+        return value if value is _MISSING else copy.deepcopy(value)
+
+    def _set_local(self, key: str, value: Any) -> None:
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._local[key] = value
+
+    def _get_db(self, key: str) -> Any:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+        try:
+            with SessionLocal() as session:
+                row = session.execute(
+                    select(LLMResponseCacheModel.response).where(
+                        LLMResponseCacheModel.cache_key == key,
+                        LLMResponseCacheModel.created_at >= cutoff
+                    )
+                ).first()
+                return row[0] if row else _MISSING
+        except Exception as e:
+            logger.error(f"Erro ao consultar cache de LLM: {e}")
+            return _MISSING
+
+    def _set_db(self, stage: str, key: str, value: Any) -> None:
+        try:
+            with SessionLocal() as session:
+                statement = insert(LLMResponseCacheModel).values(cache_key=key, stage=stage, response=value)
+                session.execute(statement.on_conflict_do_update(
+                    index_elements=[LLMResponseCacheModel.cache_key],
+                    set_={"response": statement.excluded.response, "created_at": datetime.now(timezone.utc)}
+                ))
+                session.commit()
+
+            with self._lock:
+                self._writes += 1
+                should_prune = self._writes % self.prune_every == 0
+            if should_prune:
+                self.prune()
+        except Exception as e:
+            logger.error(f"Erro ao gravar cache de LLM: {e}")
+
+    def prune(self) -> int:
+        """Remove entradas expiradas e as mais antigas acima do limite de linhas"""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+        with SessionLocal() as session:
+            expired = session.execute(
+                delete(LLMResponseCacheModel).where(LLMResponseCacheModel.created_at < cutoff)
+            ).rowcount
+            overflow_keys = (
+                select(LLMResponseCacheModel.cache_key)
+                .order_by(LLMResponseCacheModel.created_at.desc())
+                .offset(self.max_rows)
+                .scalar_subquery()
+            )
+            evicted = session.execute(
+                delete(LLMResponseCacheModel).where(LLMResponseCacheModel.cache_key.in_(overflow_keys))
+            ).rowcount
+            session.commit()
+        logger.info(f"Cache de LLM: {expired} entradas expiradas e {evicted} excedentes removidas")
+        return expired + evicted
+
+    # ==================== API ====================
+
+    def get_or_compute(self, stage: str, key: str, compute: Callable[[], Any]) -> Any:
+        """Retorna a resposta em cache ou executa compute() e a armazena"""
+        if not self.enabled:
+            return compute()
+
+        value = self._get_local(key)
+        if value is not _MISSING:
+            self._count(stage, "local_hits")
+            return value
+
+        value = self._get_db(key)
+        if value is not _MISSING:
+            self._count(stage, "db_hits")
+            self._set_local(key, value)
+            return value
+
+        self._count(stage, "misses")
+        value = compute()
+        self._set_local(key, value)
+        self._set_db(stage, key, value)
+        return value
+
+    async def aget_or_compute(self, stage: str, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Versão assíncrona de get_or_compute (acesso ao banco fora do event loop)"""
+        if not self.enabled:
+            return await compute()
+
+        value = self._get_local(key)
+        if value is not _MISSING:
+            self._count(stage, "local_hits")
+            return value
+
+        value = await asyncio.to_thread(self._get_db, key)
+        if value is not _MISSING:
+            self._count(stage, "db_hits")
+            self._set_local(key, value)
+            return value
+
+        self._count(stage, "misses")
+        value = await compute()
+        self._set_local(key, value)
+        await asyncio.to_thread(self._set_db, stage, key, value)
+        return value
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Retorna os contadores de hit/miss por estágio"""
+        with self._lock:
+            return {stage: dict(counters) for stage, counters in self._stats.items()}
+
+
+# Instância única do cache para o processo
+llm_cache = LLMResponseCache(
+    enabled=settings.llm_cache_enabled,
+    ttl_seconds=settings.llm_cache_ttl_seconds,
+    local_size=settings.llm_cache_local_size,
+    max_rows=settings.llm_cache_max_rows
+)
@@ -0,0 +1,92 @@
+import threading
+from typing import Any, Dict, Tuple, Type, TypeVar
+from langchain_core.runnables import Runnable
+from langchain_google_genai import ChatGoogleGenerativeAI
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gemini-2.0-flash-001"
+DEFAULT_TEMPERATURE = 0.1
+
+ServiceT = TypeVar("ServiceT")
+
+
+class LLMRegistry:
+    """
+    Registro de clientes LLM e serviços compartilhados por todo o processo.
+
+    Os clientes ChatGoogleGenerativeAI são criados uma única vez por
+    (modelo, temperatura) e reaproveitados por todos os serviços, que assim
+    compartilham o mesmo canal HTTP/gRPC em vez de abrir conexões a cada
+    documento. Os serviços (summarizer e classificadores) também são
+    instanciados uma vez, com prompt, parser e chain já compilados.
+    """
+
+    def __init__(self):
+        self._llms: Dict[Tuple[str, float], ChatGoogleGenerativeAI] = {}
+        self._services: Dict[Tuple[Any, ...], Any] = {}
+        self._lock = threading.RLock()
+
+    def get_llm(
+        self,
+        model: str = DEFAULT_MODEL,
+        temperature: float = DEFAULT_TEMPERATURE,
+        max_output_tokens: int | None = None
+    ) -> Runnable:
+        """
+        Retorna o cliente compartilhado para (modelo, temperatura).
+
+        Args:
+            model: Modelo do Google Gemini
+            temperature: Temperatura para geração (0.0 - 1.0)
+            max_output_tokens: Limite de tokens de saída, aplicado por chamada
+                sem criar um novo cliente
+
+        Returns:
+            Cliente LLM (ou binding do cliente com o limite de saída)
+        """
+        key = (model, temperature)
+        llm = self._llms.get(key)
+        if llm is None:
+            with self._lock:
+                llm = self._llms.get(key)
+                if llm is None:
+                    logger.info(f"Criando cliente LLM {model} (temperatura={temperature})")
+                    llm = ChatGoogleGenerativeAI(model=model, temperature=temperature)
+                    self._llms[key] = llm
+
+        if max_output_tokens is not None:
+            return llm.bind(generation_config={"max_output_tokens": max_output_tokens})
+        return llm
+
+    def get_service(self, service_cls: Type[ServiceT], **kwargs: Any) -> ServiceT:
+        """
+        Retorna a instância compartilhada de um serviço LLM.
+
+        Args:
+            service_cls: Classe do serviço (ex.: SummaryzerModel, RelevanceChecker)
+            **kwargs: Argumentos de construção; cada combinação gera uma instância
+
+        Returns:
+            Instância do serviço, criada na primeira chamada
+        """
+        key = (service_cls, tuple(sorted(kwargs.items())))
+        service = self._services.get(key)
+        if service is None:
+            with self._lock:
+                service = self._services.get(key)
+                if service is None:
+                    service = service_cls(**kwargs)
+                    self._services[key] = service
+        return service
+
+    def clear(self) -> None:
+        """Descarta clientes e serviços registrados (útil em testes)"""
+        with self._lock:
+            self._llms.clear()
+            self._services.clear()
+
+
+# Instância única do registro para o processo
+llm_registry = LLMRegistry()
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.db.models.subjects import (
+    SubjectCatalogVersionModel,
+    SubjectModel,
+    primary_subjects,
+    secondary_subjects,
+)
+from app.db.models.documents import PrimaryDocumentModel
+from app.db.session import SessionLocal
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SubjectCatalog:
+    """
+    Cache do catálogo de subjects (nome -> id) compartilhado pelo processo.
+
+    A cada uso, apenas a linha de subject_catalog_version é lida; a tabela
+    subjects só é relida quando a versão muda. A versão é incrementada por
+    um trigger em subjects (instalado por python -m app.db.migrate), de modo
+    que alterações feitas por outros processos (ou direto no banco) também
+    invalidam o cache.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _current_version(self, db: Session) -> int:
+        return db.execute(
+            select(SubjectCatalogVersionModel.version).where(SubjectCatalogVersionModel.id == 1)
+        ).scalar() or 0
+
+    def get(self, db: Session) -> Dict[str, int]:
+        """
+        Retorna o mapa nome -> id, recarregando-o se a versão mudou. As
+        consultas rodam fora do lock, que protege apenas a troca do catálogo.
+        """
+        version = self._current_version(db)
+        with self._lock:
+            if version == self._version:
+                return self._ids
+
+        rows = db.execute(select(SubjectModel.name, SubjectModel.id).order_by(SubjectModel.id)).all()
+        ids = {name: subject_id for name, subject_id in rows}
+        with self._lock:
+            # Outra thread pode ter carregado uma versão mais recente enquanto esta relia a tabela
+            if self._version is None or version >= self._version:
+                self._ids, self._version = ids, version
+                logger.info(f"Catálogo de subjects carregado: {len(ids)} subjects (versão {version})")
+        return ids
+
+    def names(self, db: Session) -> List[str]:
+        """Nomes dos subjects disponíveis (lista usada nos prompts dos classificadores)"""
+        return list(self.get(db))
+
+    async def anames(self) -> List[str]:
+        """
+        Versão assíncrona de names: a consulta roda em uma thread, com sessão
+        própria, para não bloquear o event loop (nem reter uma sessão do chamador).
+        """
+        def load() -> List[str]:
+            with SessionLocal() as db:
+                return self.names(db)
+
+        return await asyncio.to_thread(load)
+
+    def ids_for(self, db: Session, names: Iterable[str]) -> List[int]:
+        """IDs dos subjects informados, sem repetições; nomes desconhecidos são ignorados"""
+        catalog = self.get(db)
+        ids = []
+        for name in names:
+            subject_id = catalog.get(name)
+            if subject_id is None:
+                logger.warning(f"Subject '{name}' não encontrado no catálogo")
+            elif subject_id not in ids:
+                ids.append(subject_id)
+        return ids
+
+    def link(self, db: Session, document, names: Iterable[str]) -> int:
+        """
+        Associa os subjects ao documento com um único INSERT na tabela de
+        associação (primary_subjects ou secondary_subjects). O documento
+        já deve ter ID (após flush); a gravação segue a transação de db.
+
+        Returns:
+            Número de subjects associados
+        """
+        subject_ids = self.ids_for(db, names)
+        if not subject_ids:
+            return 0
+
+        if isinstance(document, PrimaryDocumentModel):
+            table, column = primary_subjects, "primary_id"
+        else:
+            table, column = secondary_subjects, "secondary_id"
+        db.execute(
+            insert(table)
+            .values([{column: document.id, "subject_id": subject_id} for subject_id in subject_ids])
+            .on_conflict_do_nothing()
+        )
+        return len(subject_ids)
+
+
+# Instância única do catálogo para o processo
+subject_catalog = SubjectCatalog()
@@ -0,0 +1,10 @@
+from typing import List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models.subjects import SubjectModel
+
+
+async def list_subjects(db: AsyncSession) -> List[SubjectModel]:
+    """Lista todos os subjects cadastrados"""
+    result = await db.execute(select(SubjectModel).order_by(SubjectModel.id))
+    return list(result.scalars().all())
@@ -1,41 +1,258 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterable, List
 from langchain_core.prompts import (
     ChatPromptTemplate,
     SystemMessagePromptTemplate,
     HumanMessagePromptTemplate
 )
-from app.service.summarization.promt import SUMMARY_PROMPT_SYSTEM
-from sqlalchemy.orm import Session
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from app.core.config import settings
+from app.ingestion.tokens import count_tokens
+from app.service.summarization.promt import (
+    SUMMARY_PROMPT_SYSTEM,
+    SUMMARY_MAP_PROMPT_SYSTEM,
+    SUMMARY_REDUCE_PROMPT_HUMAN
+)
+from app.service.llm_registry import llm_registry, DEFAULT_MODEL, DEFAULT_TEMPERATURE
+from app.service.llm_cache import llm_cache, prompt_version
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Estágios usados no cache de respostas
+CACHE_STAGE = "summary"
+MAP_CACHE_STAGE = "summary_map"
 
 class SummaryzerModel:
-    def __init__(self, db: Session, model: str = "gemini-2.0-flash-001", temperature: float = 0.1):
-        self.llm = ChatGoogleGenerativeAI(model=model, temperature=temperature)
-        self.db = db
-        
+    def __init__(
+        self,
+        model: str = DEFAULT_MODEL,
+        temperature: float = DEFAULT_TEMPERATURE,
+        map_reduce_threshold_tokens: int = settings.summary_map_reduce_threshold_tokens,
+        section_tokens: int = settings.summary_section_tokens,
+        max_concurrency: int = settings.summary_max_concurrency
+    ):
+        self.llm = llm_registry.get_llm(model, temperature)
+        self.map_reduce_threshold_tokens = map_reduce_threshold_tokens
+        self.section_tokens = section_tokens
+        self.max_concurrency = max_concurrency
+
         # Template base sem contexto
         self.base_prompt = ChatPromptTemplate.from_messages([
             SystemMessagePromptTemplate.from_template(SUMMARY_PROMPT_SYSTEM),
             HumanMessagePromptTemplate.from_template("{input}"),
         ])
-        
+
         # Template com contexto
         self.context_prompt = ChatPromptTemplate.from_messages([
             SystemMessagePromptTemplate.from_template(SUMMARY_PROMPT_SYSTEM),
             HumanMessagePromptTemplate.from_template("{input}"),
             HumanMessagePromptTemplate.from_template("{context}"),
         ])
-        
+
+        # Templates do modo map-reduce (documentos longos)
+        self.map_prompt = ChatPromptTemplate.from_messages([
+            SystemMessagePromptTemplate.from_template(SUMMARY_MAP_PROMPT_SYSTEM),
+            HumanMessagePromptTemplate.from_template("Seção {section}\n\n{input}"),
+        ])
+        self.reduce_prompt = ChatPromptTemplate.from_messages([
+            SystemMessagePromptTemplate.from_template(SUMMARY_PROMPT_SYSTEM),
+            HumanMessagePromptTemplate.from_template(SUMMARY_REDUCE_PROMPT_HUMAN),
+        ])
+        self.reduce_context_prompt = ChatPromptTemplate.from_messages([
+            SystemMessagePromptTemplate.from_template(SUMMARY_PROMPT_SYSTEM),
+            HumanMessagePromptTemplate.from_template(SUMMARY_REDUCE_PROMPT_HUMAN),
+            HumanMessagePromptTemplate.from_template("{context}"),
+        ])
+
+        # Chains compiladas uma única vez
+        self.base_chain = self.base_prompt | self.llm
+        self.context_chain = self.context_prompt | self.llm
+        self.map_chain = self.map_prompt | self.llm
+        self.reduce_chain = self.reduce_prompt | self.llm
+        self.reduce_context_chain = self.reduce_context_prompt | self.llm
+
+        # Divisão em seções limitadas por tokens
+        self.section_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=section_tokens,
+            chunk_overlap=min(500, section_tokens // 10),
+            length_function=count_tokens
+        )
+
+        # Versões dos prompts para o cache de respostas
+        self.base_version = prompt_version(self.base_prompt, model, temperature)
+        self.context_version = prompt_version(self.context_prompt, model, temperature)
+        self.map_version = prompt_version(self.map_prompt, model, temperature)
+        self.reduce_version = prompt_version(self.reduce_prompt, model, temperature)
+        self.reduce_context_version = prompt_version(self.reduce_context_prompt, model, temperature)
+
+    def _select_chain(self, markdown_text: str, mpv_summary: str | None = None):
+        """Seleciona a chain adequada, monta a sua entrada e a chave de cache"""
+        if mpv_summary:
+            chain_input = {"input": markdown_text, "context": mpv_summary}
+            return self.context_chain, chain_input, llm_cache.make_key(CACHE_STAGE, self.context_version, chain_input)
+        chain_input = {"input": markdown_text}
+        return self.base_chain, chain_input, llm_cache.make_key(CACHE_STAGE, self.base_version, chain_input)
+
+    def _select_reduce_chain(self, partials: List[str], mpv_summary: str | None = None):
+        """Monta a chain, a entrada e a chave de cache da etapa de reduce"""
+        total = len(partials)
+        joined = "\n\n".join(
+            f"## Seção {index}/{total}\n\n{partial}" for index, partial in enumerate(partials, start=1)
+        )
+        if mpv_summary:
+            chain_input = {"input": joined, "context": mpv_summary}
+            return self.reduce_context_chain, chain_input, llm_cache.make_key(CACHE_STAGE, self.reduce_context_version, chain_input)
+        chain_input = {"input": joined}
+        return self.reduce_chain, chain_input, llm_cache.make_key(CACHE_STAGE, self.reduce_version, chain_input)
+
+    def _map_input(self, index: int, section: str):
+        """
+        Monta a entrada e a chave de cache de uma seção. Apenas o número da
+        seção: no resumo por páginas o total só é conhecido no fim da extração.
+        """
+        chain_input = {"input": section, "section": str(index)}
+        return chain_input, llm_cache.make_key(MAP_CACHE_STAGE, self.map_version, chain_input)
+
+    def is_long_document(self, markdown_text: str) -> bool:
+        """Indica se o texto excede o limite de tokens da chamada única"""
+        # Textos com menos caracteres que o limite não precisam ser tokenizados
+        if len(markdown_text) <= self.map_reduce_threshold_tokens:
+            return False
+        return count_tokens(markdown_text) > self.map_reduce_threshold_tokens
+
+    # ==================== MAP-REDUCE ====================
+
+    def _summarize_long(self, markdown_text: str, mpv_summary: str | None = None) -> str:
+        """Resume documentos longos: seções em paralelo (threads) e reduce final"""
+        sections = self.section_splitter.split_text(markdown_text)
+        total = len(sections)
+        logger.info(f"Documento longo: resumindo {total} seções (map-reduce)")
+
+        def summarize_section(item) -> str:
+            index, section = item
+            chain_input, cache_key = self._map_input(index, section)
+            return llm_cache.get_or_compute(
+                MAP_CACHE_STAGE, cache_key, lambda: self.map_chain.invoke(chain_input).content
+            )
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            partials = list(executor.map(summarize_section, enumerate(sections, start=1)))
+
+        chain, chain_input, cache_key = self._select_reduce_chain(partials, mpv_summary)
+        return llm_cache.get_or_compute(
+            CACHE_STAGE, cache_key, lambda: chain.invoke(chain_input).content
+        )
+
+    async def _asummarize_section(self, index: int, section: str, semaphore: asyncio.Semaphore) -> str:
+        """Resume uma seção (etapa de map), com no máximo max_concurrency chamadas simultâneas"""
+        chain_input, cache_key = self._map_input(index, section)
+
+        async def compute() -> str:
+            async with semaphore:
+                return (await self.map_chain.ainvoke(chain_input)).content
+
+        return await llm_cache.aget_or_compute(MAP_CACHE_STAGE, cache_key, compute)
+
+    async def _areduce(self, partials: List[str], mpv_summary: str | None = None) -> str:
+        chain, chain_input, cache_key = self._select_reduce_chain(partials, mpv_summary)
+
+        async def compute() -> str:
+            return (await chain.ainvoke(chain_input)).content
+
+        return await llm_cache.aget_or_compute(CACHE_STAGE, cache_key, compute)
+
+    async def _asummarize_long(self, markdown_text: str, mpv_summary: str | None = None) -> str:
+        """Resume documentos longos: seções concorrentes (com limite) e reduce final"""
+        sections = await asyncio.to_thread(self.section_splitter.split_text, markdown_text)
+        logger.info(f"Documento longo: resumindo {len(sections)} seções (map-reduce)")
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        partials = await asyncio.gather(*(
+            self._asummarize_section(index, section, semaphore) for index, section in enumerate(sections, start=1)
+        ))
+        return await self._areduce(partials, mpv_summary)
+
+    # ==================== API ====================
+
     def summarize_markdown_file(self, markdown_text: str, mpv_summary: str | None = None) -> str:
         try:
-            if mpv_summary:
-                chain = self.context_prompt | self.llm
-                response = chain.invoke({"input": markdown_text, "context": mpv_summary})
-            else:
-                chain = self.base_prompt | self.llm
-                response = chain.invoke({"input": markdown_text})
-            
-            return response.content
+            if self.is_long_document(markdown_text):
+                return self._summarize_long(markdown_text, mpv_summary)
+
+            chain, chain_input, cache_key = self._select_chain(markdown_text, mpv_summary)
+            return llm_cache.get_or_compute(
+                CACHE_STAGE, cache_key, lambda: chain.invoke(chain_input).content
+            )
+
+        except Exception as e:
+            print(f"Erro ao resumir arquivo: {e}")
+            raise
+
+    async def asummarize_markdown_file(self, markdown_text: str, mpv_summary: str | None = None) -> str:
+        """Versão assíncrona de summarize_markdown_file (não bloqueia o event loop)"""
+        try:
+            if self.is_long_document(markdown_text):
+                return await self._asummarize_long(markdown_text, mpv_summary)
+
+            chain, chain_input, cache_key = self._select_chain(markdown_text, mpv_summary)
+
+            async def compute() -> str:
+                return (await chain.ainvoke(chain_input)).content
+
+            return await llm_cache.aget_or_compute(CACHE_STAGE, cache_key, compute)
 
         except Exception as e:
             print(f"Erro ao resumir arquivo: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    async def asummarize_pages(self, pages: AsyncIterable[str], mpv_summary: str | None = None) -> str:
+        """
+        Resume o documento consumindo as páginas à medida que são extraídas.
+
+        Enquanto o texto cabe em uma única chamada, as páginas apenas se
+        acumulam. Acima de map_reduce_threshold_tokens, cada seção completa
+        já é enviada ao LLM (map) enquanto a extração das páginas seguintes
+        continua; o reduce acontece após a última página.
+        """
+        buffer: List[str] = []
+        buffer_tokens = 0
+        total_tokens = 0
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks: List[asyncio.Task] = []
+
+        def schedule(sections: List[str]) -> None:
+            for section in sections:
+                tasks.append(asyncio.create_task(self._asummarize_section(len(tasks) + 1, section, semaphore)))
+
+        try:
+            async for page in pages:
+                buffer.append(page)
+                page_tokens = count_tokens(page)
+                buffer_tokens += page_tokens
+                total_tokens += page_tokens
+                # Documento longo: envia as seções completas e mantém a última (parcial) acumulando
+                if total_tokens > self.map_reduce_threshold_tokens and buffer_tokens >= 2 * self.section_tokens:
+                    sections = await asyncio.to_thread(self.section_splitter.split_text, "\n".join(buffer))
+                    remainder = sections.pop()
+                    schedule(sections)
+                    buffer, buffer_tokens = [remainder], count_tokens(remainder)
+
+            text = "\n".join(buffer)
+            if not tasks and total_tokens <= self.map_reduce_threshold_tokens:
+                return await self.asummarize_markdown_file(text, mpv_summary)
+
+            schedule(await asyncio.to_thread(self.section_splitter.split_text, text))
+            logger.info(f"Documento longo: resumindo {len(tasks)} seções (map-reduce por páginas)")
+            partials = await asyncio.gather(*tasks)
+            return await self._areduce(list(partials), mpv_summary)
+
+        except Exception as e:
+            logger.error(f"Erro ao resumir arquivo: {e}")
+            raise
+        finally:
+            # Falha na extração ou em uma seção: cancela as seções ainda pendentes
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
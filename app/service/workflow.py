@@ -1,26 +1,37 @@
-from typing import TypedDict, List, Optional, Dict, Any
+import os
+from typing import TypedDict, List, Optional, Dict, Any, Annotated, Awaitable, Callable
 from langgraph.graph import StateGraph, END
 from langchain_core.runnables import RunnableConfig
-from sqlalchemy.orm import Session
 from fastapi import UploadFile
 
+from app.core.config import settings
 from app.db.models.documents import PrimaryDocumentModel
+from app.db.session import AsyncSessionLocal
+from app.service.llm_registry import llm_registry
 from app.service.summarization.summaryzer import SummaryzerModel
+from app.service.classifier.relevance_checker import RelevanceChecker
 from app.service.classifier.subjects_classifier import SubjectsClassifier
 from app.service.classifier.theme_classifier import ThemeClassifier
+from app.service.classifier.key_points_extractor import KeyPointsExtractor
+from app.service.classifier.combined_analyzer import CombinedAnalyzer
 from app.ingestion.convertor import converter
 
 
+def merge_stage_errors(left: Dict[str, str], right: Dict[str, str]) -> Dict[str, str]:
+    """Reducer que combina os erros de cada etapa executada em paralelo"""
+    return {**(left or {}), **(right or {})}
+
+
 class DocumentProcessingState(TypedDict):
     """Estado do workflow de processamento de documentos"""
     
     # Input inicial
-    file: UploadFile
+    file: Optional[UploadFile]
+    file_path: Optional[str]  # PDF já gravado em disco (alternativa ao upload)
     filename: str
-    db_session: Session
     
     # Processamento
-    text_content: str
+    total_pages: int  # Páginas do PDF (o texto é extraído sob demanda pela sumarização)
     document_type: str  # "primary" ou "secondary"
     primary_id: Optional[int]  # ID do documento principal (para secundários)
     primary_context: Optional[str]  # Contexto do documento principal
@@ -41,30 +52,47 @@ class DocumentProcessingState(TypedDict):
     chunks_processed: int
     processing_status: str  # "success", "irrelevant", "error"
     error_message: Optional[str]
+    stage_errors: Annotated[Dict[str, str], merge_stage_errors]  # Erros por etapa paralela
 
 
 class DocumentProcessingWorkflow:
     """Workflow principal para processamento de documentos"""
     
-    def __init__(self):
-        self.workflow = self._build_workflow()
+    # Etapas independentes executadas em paralelo após a verificação de relevância
+    CLASSIFICATION_NODES = ["classify_subjects", "classify_theme", "extract_key_points"]
+    
+    # Modos de análise suportados após a sumarização
+    ANALYSIS_MODES = ("per_stage", "combined")
     
-    def _build_workflow(self) -> StateGraph:
+    def __init__(self, analysis_mode: str = "per_stage"):
+        if analysis_mode not in self.ANALYSIS_MODES:
+            raise ValueError(f"Modo de análise inválido: {analysis_mode}")
+        self.analysis_mode = analysis_mode
+        self.workflows = {mode: self._build_workflow(mode) for mode in self.ANALYSIS_MODES}
+        self.workflow = self.workflows[analysis_mode]
+    
+    def _build_workflow(self, analysis_mode: str = "per_stage") -> StateGraph:
         """Constrói o grafo do workflow"""
         
         # Criar o grafo
         workflow = StateGraph(DocumentProcessingState)
         
+        # Nó que recebe o resumo: verificação de relevância (por estágio) ou análise combinada
+        analysis_node = "check_relevance" if analysis_mode == "per_stage" else "combined_analysis"
+        
         # Adicionar nós
         workflow.add_node("convert_to_text", self.convert_to_text_node)
         workflow.add_node("check_document_type", self.check_document_type_node)
         workflow.add_node("get_primary_context", self.get_primary_context_node)
         workflow.add_node("summarize", self.summarize_node)
         workflow.add_node("contextualized_summarize", self.contextualized_summarize_node)
-        workflow.add_node("check_relevance", self.check_relevance_node)
-        workflow.add_node("classify_subjects", self.classify_subjects_node)
-        workflow.add_node("classify_theme", self.classify_theme_node)
-        workflow.add_node("extract_key_points", self.extract_key_points_node)
+        if analysis_mode == "per_stage":
+            workflow.add_node("check_relevance", self.check_relevance_node)
+            workflow.add_node("classify_subjects", self.classify_subjects_node)
+            workflow.add_node("classify_theme", self.classify_theme_node)
+            workflow.add_node("extract_key_points", self.extract_key_points_node)
+        else:
+            workflow.add_node("combined_analysis", self.combined_analysis_node)
         workflow.add_node("combine_results", self.combine_results_node)
         workflow.add_node("mark_irrelevant", self.mark_irrelevant_node)
         workflow.add_node("store_document", self.store_document_node)
@@ -87,25 +115,32 @@ class DocumentProcessingWorkflow:
         
         # Fluxo dos documentos secundários
         workflow.add_edge("get_primary_context", "contextualized_summarize")
-        workflow.add_edge("contextualized_summarize", "check_relevance")
+        workflow.add_edge("contextualized_summarize", analysis_node)
         
         # Fluxo dos documentos principais
-        workflow.add_edge("summarize", "check_relevance")
-        
-        # Fluxo condicional de relevância
-        workflow.add_conditional_edges(
-            "check_relevance",
-            self.route_by_relevance,
-            {
-                "relevant": "classify_subjects",
-                "irrelevant": "mark_irrelevant"
-            }
-        )
+        workflow.add_edge("summarize", analysis_node)
         
-        # Classificações sequenciais (podem ser paralelizadas no futuro)
-        workflow.add_edge("classify_subjects", "classify_theme")
-        workflow.add_edge("classify_theme", "extract_key_points")
-        workflow.add_edge("extract_key_points", "combine_results")
+        if analysis_mode == "per_stage":
+            # Fluxo condicional de relevância: documentos relevantes disparam
+            # as classificações em paralelo (todas leem apenas o summary)
+            workflow.add_conditional_edges(
+                "check_relevance",
+                self.route_by_relevance,
+                self.CLASSIFICATION_NODES + ["mark_irrelevant"]
+            )
+            
+            # Junção: combine_results só executa após as três classificações
+            workflow.add_edge(self.CLASSIFICATION_NODES, "combine_results")
+        else:
+            # A análise combinada já traz as classificações
+            workflow.add_conditional_edges(
+                "combined_analysis",
+                self.route_by_combined_relevance,
+                {
+                    "relevant": "combine_results",
+                    "irrelevant": "mark_irrelevant"
+                }
+            )
         
         # Convergência
         workflow.add_edge("mark_irrelevant", "combine_results")
@@ -116,10 +151,19 @@ class DocumentProcessingWorkflow:
     
     # ==================== NÔES DO WORKFLOW ====================
     
+    @staticmethod
+    def _pages(state: DocumentProcessingState):
+        """Páginas do PDF, entregues conforme os lotes são extraídos"""
+        return converter.iter_pages(state["file_path"], state["total_pages"])
+    
     async def convert_to_text_node(self, state: DocumentProcessingState) -> DocumentProcessingState:
-        """Converte o arquivo para texto"""
+        """
+        Valida o PDF e conta as páginas. O texto não é extraído aqui: a
+        sumarização consome as páginas à medida que o pool de processos as
+        extrai, em vez de esperar o documento inteiro.
+        """
         try:
-            state["text_content"] = await converter.convert_file(state["file"], state["filename"])
+            state["total_pages"] = await converter.count_pages(state["file_path"])
             return state
         except Exception as e:
             state["processing_status"] = "error"
@@ -130,14 +174,17 @@ class DocumentProcessingWorkflow:
         """Verifica se é documento principal ou secundário"""
         return state
     
-    def get_primary_context_node(self, state: DocumentProcessingState) -> DocumentProcessingState:
+    async def get_primary_context_node(self, state: DocumentProcessingState) -> DocumentProcessingState:
         """Busca contexto do documento principal para documentos secundários"""
+        # Contexto já carregado pelo chamador (ex.: ingestão em lote)
+        if state.get("primary_context"):
+            return state
+        
         try:
             # Assumindo que documento principal é sempre MPV por enquanto
             # Isso pode ser generalizado futuramente
-            primary_doc = state["db_session"].query(PrimaryDocumentModel).filter(
-                PrimaryDocumentModel.id == state["primary_id"]
-            ).first()
+            async with AsyncSessionLocal() as db:
+                primary_doc = await db.get(PrimaryDocumentModel, state["primary_id"])
             
             if primary_doc:
                 state["primary_context"] = primary_doc.summary
@@ -150,23 +197,23 @@ class DocumentProcessingWorkflow:
             state["error_message"] = f"Erro ao buscar contexto do documento principal: {str(e)}"
             return state
     
-    def summarize_node(self, state: DocumentProcessingState) -> DocumentProcessingState:
+    async def summarize_node(self, state: DocumentProcessingState) -> DocumentProcessingState:
         """Gera resumo para documentos principais"""
         try:
-            summarizer = SummaryzerModel(state["db_session"])
-            state["summary"] = summarizer.summarize_markdown_file(state["text_content"])
+            summarizer = llm_registry.get_service(SummaryzerModel)
+            state["summary"] = await summarizer.asummarize_pages(self._pages(state))
             return state
         except Exception as e:
             state["processing_status"] = "error"
             state["error_message"] = f"Erro na sumarização: {str(e)}"
             return state
     
-    def contextualized_summarize_node(self, state: DocumentProcessingState) -> DocumentProcessingState:
+    async def contextualized_summarize_node(self, state: DocumentProcessingState) -> DocumentProcessingState:
         """Gera resumo contextualizado para documentos secundários"""
         try:
-            summarizer = SummaryzerModel(state["db_session"])
-            state["summary"] = summarizer.summarize_markdown_file(
-                state["text_content"], 
+            summarizer = llm_registry.get_service(SummaryzerModel)
+            state["summary"] = await summarizer.asummarize_pages(
+                self._pages(state),
                 state["primary_context"]
             )
             return state
@@ -175,13 +222,11 @@ class DocumentProcessingWorkflow:
             state["error_message"] = f"Erro na sumarização contextualizada: {str(e)}"
             return state
     
-    def check_relevance_node(self, state: DocumentProcessingState) -> DocumentProcessingState:
+    async def check_relevance_node(self, state: DocumentProcessingState) -> DocumentProcessingState:
         """Verifica se o documento é relevante para o mercado de energia"""
         try:
-            from app.service.classifier.relevance_checker import RelevanceChecker
-            
-            checker = RelevanceChecker(state["db_session"])
-            result = checker.check_relevance(state["summary"])
+            checker = llm_registry.get_service(RelevanceChecker)
+            result = await checker.acheck_relevance(state["summary"])
             
             state["is_energy_related"] = result["is_energy_related"]
             state["relevance_score"] = result["confidence_score"]
@@ -193,44 +238,58 @@ class DocumentProcessingWorkflow:
             state["error_message"] = f"Erro na verificação de relevância: {str(e)}"
             return state
     
-    def classify_subjects_node(self, state: DocumentProcessingState) -> DocumentProcessingState:
+    # Os nós de classificação rodam em paralelo: cada um devolve apenas as
+    # chaves que produz, e os erros vão para stage_errors (com reducer)
+    
+    async def classify_subjects_node(self, state: DocumentProcessingState) -> Dict[str, Any]:
         """Classifica os assuntos do documento"""
         try:
-            classifier = SubjectsClassifier(state["db_session"])
-            state["subjects"] = classifier.classify_document(state["summary"])
-            return state
+            classifier = llm_registry.get_service(SubjectsClassifier)
+            return {"subjects": await classifier.aclassify_document(state["summary"])}
         except Exception as e:
-            state["processing_status"] = "error"
-            state["error_message"] = f"Erro na classificação de assuntos: {str(e)}"
-            return state
+            return {"stage_errors": {"classify_subjects": f"Erro na classificação de assuntos: {str(e)}"}}
     
-    def classify_theme_node(self, state: DocumentProcessingState) -> DocumentProcessingState:
+    async def classify_theme_node(self, state: DocumentProcessingState) -> Dict[str, Any]:
         """Classifica o tema central do documento"""
         try:
-            classifier = ThemeClassifier(state["db_session"])
-            state["central_theme"] = classifier.classify_theme(state["summary"])
-            return state
+            classifier = llm_registry.get_service(ThemeClassifier)
+            return {"central_theme": await classifier.aclassify_theme(state["summary"])}
         except Exception as e:
-            state["processing_status"] = "error"
-            state["error_message"] = f"Erro na classificação de tema: {str(e)}"
-            return state
+            return {"stage_errors": {"classify_theme": f"Erro na classificação de tema: {str(e)}"}}
     
-    def extract_key_points_node(self, state: DocumentProcessingState) -> DocumentProcessingState:
+    async def extract_key_points_node(self, state: DocumentProcessingState) -> Dict[str, Any]:
         """Extrai pontos principais em formato JSON"""
         try:
-            from app.service.classifier.key_points_extractor import KeyPointsExtractor
+            extractor = llm_registry.get_service(KeyPointsExtractor)
+            return {"key_points": await extractor.aextract_key_points(state["summary"])}
+        except Exception as e:
+            return {"stage_errors": {"extract_key_points": f"Erro na extração de pontos-chave: {str(e)}"}}
+    
+    async def combined_analysis_node(self, state: DocumentProcessingState) -> DocumentProcessingState:
+        """Relevância, subjects, tema e pontos-chave em uma única chamada ao LLM"""
+        try:
+            analyzer = llm_registry.get_service(CombinedAnalyzer)
+            result = await analyzer.aanalyze(state["summary"])
             
-            extractor = KeyPointsExtractor(state["db_session"])
-            state["key_points"] = extractor.extract_key_points(state["summary"])
+            state["is_energy_related"] = result["is_energy_related"]
+            state["relevance_score"] = result["confidence_score"]
+            state["irrelevance_reasons"] = [result["main_reason"]] if not result["is_energy_related"] else []
+            state["subjects"] = result["subjects"]
+            state["central_theme"] = result["central_theme"]
+            state["key_points"] = result["key_points"]
             
             return state
         except Exception as e:
             state["processing_status"] = "error"
-            state["error_message"] = f"Erro na extração de pontos-chave: {str(e)}"
+            state["error_message"] = f"Erro na análise combinada: {str(e)}"
             return state
     
     def combine_results_node(self, state: DocumentProcessingState) -> DocumentProcessingState:
         """Combina todos os resultados"""
+        if state["stage_errors"] and state["processing_status"] != "error":
+            state["processing_status"] = "error"
+            state["error_message"] = "; ".join(state["stage_errors"].values())
+        
         if state["processing_status"] != "error":
             if state["is_energy_related"]:
                 state["processing_status"] = "success"
@@ -259,8 +318,14 @@ class DocumentProcessingWorkflow:
         """Roteia baseado no tipo de documento"""
         return "primary" if state["document_type"] == "primary" else "secondary"
     
-    def route_by_relevance(self, state: DocumentProcessingState) -> str:
+    def route_by_relevance(self, state: DocumentProcessingState) -> List[str]:
         """Roteia baseado na relevância do documento"""
+        if state["is_energy_related"]:
+            return list(self.CLASSIFICATION_NODES)
+        return ["mark_irrelevant"]
+    
+    def route_by_combined_relevance(self, state: DocumentProcessingState) -> str:
+        """Roteia baseado na relevância retornada pela análise combinada"""
         return "relevant" if state["is_energy_related"] else "irrelevant"
     
     # ==================== FUNÇÃO PRINCIPAL ====================
@@ -269,8 +334,11 @@ class DocumentProcessingWorkflow:
         self,
         file: UploadFile,
         filename: str,
-        db_session: Session,
-        primary_id: int = None
+        primary_id: int = None,
+        analysis_mode: Optional[str] = None,
+        file_path: Optional[str] = None,
+        on_node: Optional[Callable[[str], Awaitable[None]]] = None,
+        primary_context: Optional[str] = None
     ) -> DocumentProcessingState:
         """
         Processa um documento através do workflow completo
@@ -279,7 +347,10 @@ class DocumentProcessingWorkflow:
             file: Arquivo uploaded
             filename: Nome do arquivo
             primary_id: ID do documento principal (para documentos secundários)
-            db_session: Sessão do banco de dados
+            analysis_mode: "per_stage" ou "combined" (padrão: modo do workflow)
+            file_path: Caminho de um PDF já gravado em disco (usado no lugar de file)
+            on_node: Callback chamado com o nome de cada nó concluído (progresso)
+            primary_context: Resumo do documento principal já carregado (evita a consulta)
             
         Returns:
             Estado final do processamento
@@ -288,12 +359,12 @@ class DocumentProcessingWorkflow:
         # Estado inicial
         initial_state: DocumentProcessingState = {
             "file": file,
+            "file_path": file_path,
             "filename": filename,
-            "db_session": db_session,
-            "text_content": "",
+            "total_pages": 0,
             "document_type": "",
             "primary_id": primary_id,
-            "primary_context": None,
+            "primary_context": primary_context,
             "summary": "",
             "is_energy_related": False,
             "relevance_score": 0.0,
@@ -304,9 +375,20 @@ class DocumentProcessingWorkflow:
             "document_id": None,
             "chunks_processed": 0,
             "processing_status": "",
-            "error_message": None
+            "error_message": None,
+            "stage_errors": {}
         }
         
+        # Upload gravado em disco (em blocos): a extração das páginas lê do arquivo
+        temp_path = None
+        if file_path is None:
+            try:
+                temp_path = initial_state["file_path"] = await converter.save_upload(file)
+            except Exception as e:
+                initial_state["processing_status"] = "error"
+                initial_state["error_message"] = f"Erro na conversão: {str(e)}"
+                return initial_state
+        
         # Executar workflow
         try:
             if primary_id:
@@ -314,15 +396,33 @@ class DocumentProcessingWorkflow:
             else:
                 initial_state["document_type"] = "primary"
 
-            final_state = await self.workflow.ainvoke(initial_state)
+            workflow = self.workflows[analysis_mode] if analysis_mode else self.workflow
+            if on_node is None:
+                return await workflow.ainvoke(initial_state)
+
+            # Execução em streaming: "updates" informa cada nó concluído e
+            # "values" traz o estado completo após cada passo
+            final_state = initial_state
+            async for mode, chunk in workflow.astream(initial_state, stream_mode=["updates", "values"]):
+                if mode == "updates":
+                    for node_name in chunk:
+                        await on_node(node_name)
+                else:
+                    final_state = chunk
             return final_state
         except Exception as e:
             initial_state["processing_status"] = "error"
             initial_state["error_message"] = f"Erro no workflow: {str(e)}"
             return initial_state
+        finally:
+            if temp_path:
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
 
 
 # ==================== INSTÂNCIA GLOBAL ====================
 
 # Instância única do workflow para ser usada nos endpoints
-document_workflow = DocumentProcessingWorkflow()
\ No newline at end of file
+document_workflow = DocumentProcessingWorkflow(analysis_mode=settings.analysis_mode)
\ No newline at end of file
@@ -0,0 +1,129 @@
+import asyncio
+import time
+from typing import List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+from app.core.config import settings
+from app.ingestion.tokens import count_tokens
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Limites da API de embeddings da OpenAI por requisição
+OPENAI_MAX_INPUTS_PER_REQUEST = 2048
+OPENAI_MAX_TOKENS_PER_REQUEST = 300000
+
+
+def token_batches(texts: List[str], max_tokens: int, max_inputs: int) -> List[Tuple[List[int], int]]:
+    """
+    Agrupa os textos (pelos índices, na ordem) em lotes com no máximo
+    max_tokens tokens e max_inputs textos. Um texto maior que max_tokens
+    forma um lote sozinho.
+
+    Returns:
+        Lista de (índices do lote, total de tokens do lote)
+    """
+    max_tokens = min(max_tokens, OPENAI_MAX_TOKENS_PER_REQUEST)
+    max_inputs = min(max_inputs, OPENAI_MAX_INPUTS_PER_REQUEST)
+
+    batches: List[Tuple[List[int], int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for index, text in enumerate(texts):
+        tokens = count_tokens(text)
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_inputs):
+            batches.append((current, current_tokens))
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        batches.append((current, current_tokens))
+    return batches
+
+
+class TokenRateLimiter:
+    """
+    Limitador assíncrono de tokens por minuto (token bucket) com limite de
+    requisições simultâneas. Compartilhado por todos os documentos do
+    processo, para que ingestões em paralelo respeitem o mesmo limite da API.
+    """
+
+    def __init__(self, tokens_per_minute: int, max_concurrency: int):
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self._available = float(tokens_per_minute)
+        self._updated_at = time.monotonic()
+        self._lock = None
+        self._semaphore = None
+
+    def _primitives(self):
+        # Criados no primeiro uso, dentro do event loop que os utiliza
+        if self._semaphore is None:
+            self._lock = asyncio.Lock()
+            self._semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        return self._lock, self._semaphore
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        rate = self.tokens_per_minute / 60
+        self._available = min(self.tokens_per_minute, self._available + (now - self._updated_at) * rate)
+        self._updated_at = now
+
+    async def _reserve(self, tokens: int) -> None:
+        if self.tokens_per_minute <= 0:
+            return
+        lock, _ = self._primitives()
+        # Um lote maior que o limite por minuto espera apenas pelo bucket cheio
+        tokens = min(tokens, self.tokens_per_minute)
+        async with lock:
+            self._refill()
+            while self._available < tokens:
+                wait = (tokens - self._available) / (self.tokens_per_minute / 60)
+                logger.debug(f"Limite de tokens de embeddings atingido; aguardando {wait:.1f}s")
+                await asyncio.sleep(wait)
+                self._refill()
+            self._available -= tokens
+
+    async def run(self, tokens: int, call):
+        """Executa call() após reservar tokens e uma vaga de concorrência"""
+        await self._reserve(tokens)
+        _, semaphore = self._primitives()
+        async with semaphore:
+            return await call()
+
+
+async def aembed_in_batches(
+    embeddings: Embeddings,
+    texts: List[str],
+    limiter: Optional[TokenRateLimiter] = None,
+    max_tokens: int = settings.embedding_batch_max_tokens,
+    max_inputs: int = settings.embedding_batch_max_inputs
+) -> List[List[float]]:
+    """
+    Gera os embeddings dos textos em lotes limitados por tokens, enviados
+    em paralelo sob o limitador compartilhado.
+
+    Returns:
+        Vetores na mesma ordem dos textos
+    """
+    limiter = limiter or embedding_rate_limiter
+    batches = token_batches(texts, max_tokens, max_inputs)
+
+    async def embed(indices: List[int], tokens: int) -> List[List[float]]:
+        batch = [texts[index] for index in indices]
+        return await limiter.run(tokens, lambda: embeddings.aembed_documents(batch))
+
+    logger.info(f"Gerando embeddings de {len(texts)} textos em {len(batches)} lotes")
+    results = await asyncio.gather(*(embed(indices, tokens) for indices, tokens in batches))
+
+    vectors: List[List[float]] = [None] * len(texts)
+    for (indices, _), batch_vectors in zip(batches, results):
+        for index, vector in zip(indices, batch_vectors):
+            vectors[index] = vector
+    return vectors
+
+
+# Limitador único do processo (todas as ingestões compartilham a cota da API)
+embedding_rate_limiter = TokenRateLimiter(
+    tokens_per_minute=settings.embedding_tokens_per_minute,
+    max_concurrency=settings.embedding_max_concurrency
+)
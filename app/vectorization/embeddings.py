@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import threading
+from functools import lru_cache
+from typing import Dict, List
+from cachetools import TTLCache
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from app.core.config import settings
+from app.db.models.embedding_cache import EmbeddingCacheModel
+from app.db.session import SessionLocal
+import logging
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "text-embedding-3-large"
+NATIVE_EMBEDDING_DIMENSION = 3072
+EMBEDDING_DIMENSION = settings.embedding_dimensions
+
+# Identificador do modelo no cache: vetores reduzidos não se misturam aos completos
+EMBEDDING_CACHE_MODEL = (
+    EMBEDDING_MODEL if EMBEDDING_DIMENSION == NATIVE_EMBEDDING_DIMENSION
+    else f"{EMBEDDING_MODEL}:{EMBEDDING_DIMENSION}"
+)
+
+_dimension_checked = False
+_dimension_lock = threading.Lock()
+
+
+def content_hash(text: str) -> str:
+    """Hash SHA-256 do texto normalizado (espaços colapsados)"""
+    normalized = " ".join(text.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings com cache persistente no Postgres.
+
+    Cada texto é identificado pelo modelo e pelo hash do seu conteúdo
+    normalizado. As consultas ao cache são feitas em lote e apenas os
+    textos ausentes são enviados à API; os vetores novos são gravados
+    em seguida. Consultas (embed_query) usam um LRU em memória com TTL,
+    já que se repetem muito e não justificam a ida ao banco.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model_name: str,
+        lookup_batch_size: int = 500,
+        query_cache_size: int = 2048,
+        query_cache_ttl_seconds: int = 24 * 3600
+    ):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.lookup_batch_size = lookup_batch_size
+        self._stats = {"hits": 0, "misses": 0, "query_hits": 0, "query_misses": 0}
+        self._stats_lock = threading.Lock()
+        self._queries = TTLCache(maxsize=query_cache_size, ttl=query_cache_ttl_seconds)
+        self._queries_lock = threading.Lock()
+
+    def _lookup(self, hashes: List[str]) -> Dict[str, List[float]]:
+        """Busca no cache os vetores dos hashes informados, em lotes"""
+        found: Dict[str, List[float]] = {}
+        with SessionLocal() as session:
+            for i in range(0, len(hashes), self.lookup_batch_size):
+                batch = hashes[i:i + self.lookup_batch_size]
+                rows = session.execute(
+                    select(EmbeddingCacheModel.content_hash, EmbeddingCacheModel.embedding).where(
+                        EmbeddingCacheModel.model == self.model_name,
+                        EmbeddingCacheModel.content_hash.in_(batch)
+                    )
+                )
+                for row_hash, embedding in rows:
+                    found[row_hash] = [float(value) for value in embedding]
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]) -> None:
+        """Grava os vetores novos no cache (ignorando conflitos)"""
+        if not vectors:
+            return
+        rows = [
+            {"model": self.model_name, "content_hash": row_hash, "embedding": embedding}
+            for row_hash, embedding in vectors.items()
+        ]
+        with SessionLocal() as session:
+            session.execute(insert(EmbeddingCacheModel).values(rows).on_conflict_do_nothing())
+            session.commit()
+
+    def _split(self, texts: List[str]):
+        """Calcula os hashes e separa os textos únicos"""
+        hashes = [content_hash(text) for text in texts]
+        unique: Dict[str, str] = {}
+        for row_hash, text in zip(hashes, texts):
+            unique.setdefault(row_hash, text)
+        return hashes, unique
+
+    def _record(self, hits: int, misses: int) -> None:
+        with self._stats_lock:
+            self._stats["hits"] += hits
+            self._stats["misses"] += misses
+        logger.info(f"Cache de embeddings: {hits} hits, {misses} misses")
+
+    def _safe_lookup(self, hashes: List[str]) -> Dict[str, List[float]]:
+        """Consulta o cache sem deixar que falhas interrompam a vetorização"""
+        try:
+            return self._lookup(hashes)
+        except Exception as e:
+            logger.error(f"Erro ao consultar cache de embeddings: {e}")
+            return {}
+
+    def _safe_store(self, vectors: Dict[str, List[float]]) -> None:
+        try:
+            self._store(vectors)
+        except Exception as e:
+            logger.error(f"Erro ao gravar cache de embeddings: {e}")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes, unique = self._split(texts)
+        cached = self._safe_lookup(list(unique))
+        missing = [row_hash for row_hash in unique if row_hash not in cached]
+
+        if missing:
+            vectors = self.underlying.embed_documents([unique[row_hash] for row_hash in missing])
+            new_vectors = dict(zip(missing, vectors))
+            self._safe_store(new_vectors)
+            cached.update(new_vectors)
+
+        self._record(len(unique) - len(missing), len(missing))
+        return [cached[row_hash] for row_hash in hashes]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes, unique = self._split(texts)
+        cached = await asyncio.to_thread(self._safe_lookup, list(unique))
+        missing = [row_hash for row_hash in unique if row_hash not in cached]
+
+        if missing:
+            vectors = await self.underlying.aembed_documents([unique[row_hash] for row_hash in missing])
+            new_vectors = dict(zip(missing, vectors))
+            await asyncio.to_thread(self._safe_store, new_vectors)
+            cached.update(new_vectors)
+
+        self._record(len(unique) - len(missing), len(missing))
+        return [cached[row_hash] for row_hash in hashes]
+
+    def _get_query(self, row_hash: str):
+        with self._queries_lock:
+            vector = self._queries.get(row_hash)
+        with self._stats_lock:
+            self._stats["query_hits" if vector is not None else "query_misses"] += 1
+        # Cópia para que o chamador não altere a entrada em memória
+        return None if vector is None else list(vector)
+
+    def _set_query(self, row_hash: str, vector: List[float]) -> None:
+        with self._queries_lock:
+            self._queries[row_hash] = tuple(vector)
+
+    def embed_query(self, text: str) -> List[float]:
+        row_hash = content_hash(text)
+        vector = self._get_query(row_hash)
+        if vector is None:
+            vector = self.underlying.embed_query(text)
+            self._set_query(row_hash, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        row_hash = content_hash(text)
+        vector = self._get_query(row_hash)
+        if vector is None:
+            vector = await self.underlying.aembed_query(text)
+            self._set_query(row_hash, vector)
+        return vector
+
+    def get_stats(self) -> Dict[str, int]:
+        """Retorna os contadores de hits/misses do cache (documentos e consultas)"""
+        with self._stats_lock:
+            return dict(self._stats)
+
+
+@lru_cache(maxsize=1)
+def get_embeddings() -> CachedEmbeddings:
+    """Retorna o cliente de embeddings (com cache) compartilhado pelo processo"""
+    return CachedEmbeddings(
+        OpenAIEmbeddings(model=EMBEDDING_MODEL, dimensions=EMBEDDING_DIMENSION),
+        model_name=EMBEDDING_CACHE_MODEL,
+        query_cache_size=settings.query_embedding_cache_size,
+        query_cache_ttl_seconds=settings.query_embedding_cache_ttl_seconds
+    )
+
+
+def ensure_embedding_dimension() -> None:
+    """
+    Verifica, uma única vez por processo, se o modelo de embeddings
+    retorna vetores com a dimensão esperada.
+
+    Raises:
+        ValueError: Se a dimensão retornada for diferente da esperada
+    """
+    global _dimension_checked
+    if _dimension_checked:
+        return
+
+    with _dimension_lock:
+        if _dimension_checked:
+            return
+
+        test_vec = get_embeddings().embed_query("test")
+        if len(test_vec) != EMBEDDING_DIMENSION:
+            raise ValueError(f"Expected {EMBEDDING_DIMENSION}-dimension embeddings, but got {len(test_vec)}")
+
+        logger.info(f"Dimensão dos embeddings verificada: {EMBEDDING_DIMENSION}")
+        _dimension_checked = True
@@ -0,0 +1,582 @@
+import json
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+from sqlalchemy import text
+from app.core.config import settings
+from app.db.session import async_engine, engine
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tabelas criadas pelo langchain_postgres (PGVector)
+EMBEDDING_TABLE = "langchain_pg_embedding"
+COLLECTION_TABLE = "langchain_pg_collection"
+
+# Limites do HNSW no pgvector: vector até 2000 dimensões, halfvec até 4000
+HNSW_MAX_VECTOR_DIMENSIONS = 2000
+HNSW_MAX_HALFVEC_DIMENSIONS = 4000
+HNSW_MAX_EF_SEARCH = 1000
+
+# Configuração de full-text usada na coluna document_tsv e nas consultas
+TEXT_SEARCH_CONFIG = "portuguese"
+
+# Tabela dos documentos primários (uma coleção do PGVector por primário)
+PRIMARY_TABLE = "primary_documents"
+
+
+def vector_type(dimensions: int = settings.embedding_dimensions) -> str:
+    """Tipo usado no índice e nas consultas: vector(d) ou, acima do limite, halfvec(d)"""
+    if dimensions <= HNSW_MAX_VECTOR_DIMENSIONS:
+        return f"vector({dimensions})"
+    return f"halfvec({dimensions})"
+
+
+def embedding_expression(alias: Optional[str] = "e", dimensions: int = settings.embedding_dimensions) -> str:
+    """Expressão indexada da coluna de embeddings (deve ser idêntica no índice e nas consultas)"""
+    column = f"{alias}.embedding" if alias else "embedding"
+    return f"({column}::{vector_type(dimensions)})"
+
+
+def to_vector_literal(embedding: List[float]) -> str:
+    """Converte o vetor para o formato texto aceito pelo pgvector"""
+    return "[" + ",".join(repr(float(value)) for value in embedding) + "]"
+
+
+def binary_expression(alias: Optional[str] = "e", dimensions: int = settings.embedding_dimensions) -> str:
+    """Expressão indexada da cópia binária (1 bit por dimensão) dos embeddings"""
+    column = f"{alias}.embedding" if alias else "embedding"
+    return f"(binary_quantize({column})::bit({dimensions}))"
+
+
+def apply_search_settings(conn, ef_search: Optional[int] = None) -> None:
+    """Ajusta os parâmetros do HNSW apenas para a transação corrente"""
+    conn.execute(text("SELECT set_config('hnsw.ef_search', :value, true)"), {"value": str(ef_search or settings.hnsw_ef_search)})
+    if settings.hnsw_iterative_scan:
+        conn.execute(text("SELECT set_config('hnsw.iterative_scan', :value, true)"), {"value": settings.hnsw_iterative_scan})
+
+
+def _fetch_all(statement, params: Dict[str, Any], tune_hnsw: bool = True, ef_search: Optional[int] = None):
+    """Executa uma consulta de busca (com os parâmetros do HNSW da transação) e retorna as linhas"""
+    with engine.begin() as conn:
+        if tune_hnsw:
+            apply_search_settings(conn, ef_search)
+        return conn.execute(statement, params).all()
+
+
+async def _afetch_all(statement, params: Dict[str, Any], tune_hnsw: bool = True, ef_search: Optional[int] = None):
+    """Versão assíncrona de _fetch_all (engine assíncrono, sem ocupar threads)"""
+    async with async_engine.begin() as conn:
+        if tune_hnsw:
+            await conn.run_sync(apply_search_settings, ef_search)
+        return (await conn.execute(statement, params)).all()
+
+
+def _chunk_source(collection_name: str, filter: Optional[Dict[str, Any]], params: Dict[str, Any]) -> str:
+    """Monta o FROM/WHERE dos chunks da coleção (com filtro de metadados) e preenche params"""
+    conditions = [
+        "c.name = :collection_name",
+        f"vector_dims(e.embedding) = {int(settings.embedding_dimensions)}",
+    ]
+    params["collection_name"] = collection_name
+    if filter:
+        conditions.append("e.cmetadata @> CAST(:filter AS jsonb)")
+        params["filter"] = json.dumps(filter)
+    return (
+        f"FROM {EMBEDDING_TABLE} e JOIN {COLLECTION_TABLE} c ON e.collection_id = c.uuid "
+        f"WHERE {' AND '.join(conditions)} "
+    )
+
+
+def _nearest_chunks_sql(
+    source: str,
+    limit_param: str,
+    limit: int,
+    params: Dict[str, Any],
+    mode: str,
+    ef_search: Optional[int]
+) -> Tuple[str, Optional[int]]:
+    """
+    SELECT dos chunks mais próximos de :embedding (id, document, cmetadata,
+    distance), ordenados pela distância cosseno e limitados a :limit_param.
+
+    No modo "binary", os limit * BINARY_RERANK_FACTOR candidatos mais próximos
+    pela distância de Hamming são reordenados pela distância cosseno exata.
+
+    Returns:
+        SQL da consulta e o ef_search a aplicar na transação
+    """
+    if mode == "binary":
+        # Etapa 1: candidatos por Hamming; etapa 2: cosseno exato sobre os candidatos
+        candidates = limit * settings.binary_rerank_factor
+        params[f"{limit_param}_shortlist"] = candidates
+        ef_search = min(max(ef_search or settings.hnsw_ef_search, candidates), HNSW_MAX_EF_SEARCH)
+        query_bits = f"binary_quantize(CAST(:embedding AS vector))::bit({int(settings.embedding_dimensions)})"
+        return (
+            f"SELECT id, document, cmetadata, embedding <=> CAST(:embedding AS vector) AS distance "
+            f"FROM (SELECT e.id, e.document, e.cmetadata, e.embedding {source}"
+            f"ORDER BY {binary_expression()} <~> {query_bits} LIMIT :{limit_param}_shortlist) candidates "
+            f"ORDER BY distance LIMIT :{limit_param}"
+        ), ef_search
+
+    distance = f"{embedding_expression()} <=> CAST(:embedding AS {vector_type()})"
+    return (
+        f"SELECT e.id, e.document, e.cmetadata, {distance} AS distance {source}"
+        f"ORDER BY distance LIMIT :{limit_param}"
+    ), ef_search
+
+
+def weighted_similarity_search(
+    collection_name: str,
+    embedding: List[float],
+    weights: Dict[str, float],
+    k: int = 4,
+    default_weight: float = 1.0,
+    filter: Optional[Dict[str, Any]] = None,
+    candidates: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    mode: Optional[str] = None
+) -> List[Tuple[Document, float, float, float]]:
+    """
+    Busca com ranking ponderado pelo tipo do documento, calculado no banco.
+
+    Os candidatos são os max(k, candidates) chunks mais próximos pelo índice
+    vetorial (HNSW ou binário, conforme VECTOR_SEARCH_MODE); sobre eles, o
+    score é a similaridade cosseno (1 - distância) multiplicada pelo peso do
+    document_type, e os k melhores scores são retornados. Um chunk fora dos
+    candidatos não entra no ranking, mesmo com peso maior.
+
+    Args:
+        collection_name: Nome da coleção
+        embedding: Vetor da consulta
+        weights: Peso de cada document_type (ex.: {"MPV": 1.0, "EMENDA": 0.6})
+        k: Número de resultados
+        default_weight: Peso dos tipos ausentes em weights
+        filter: Igualdade sobre o cmetadata, via @>
+        candidates: Chunks pré-selecionados pelo índice (padrão: WEIGHTED_SEARCH_CANDIDATES)
+        ef_search: Tamanho da lista de candidatos do HNSW nesta consulta
+        mode: "hnsw" ou "binary" (padrão: VECTOR_SEARCH_MODE)
+
+    Returns:
+        Lista de (documento, score ponderado, similaridade, peso), do maior para o menor score
+    """
+    statement, params, ef_search = _weighted_query(
+        collection_name, embedding, weights, k, default_weight, filter, candidates, ef_search, mode
+    )
+    return _weighted_results(_fetch_all(statement, params, ef_search=ef_search))
+
+
+async def aweighted_similarity_search(
+    collection_name: str,
+    embedding: List[float],
+    weights: Dict[str, float],
+    k: int = 4,
+    default_weight: float = 1.0,
+    filter: Optional[Dict[str, Any]] = None,
+    candidates: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    mode: Optional[str] = None
+) -> List[Tuple[Document, float, float, float]]:
+    """Versão assíncrona de weighted_similarity_search"""
+    statement, params, ef_search = _weighted_query(
+        collection_name, embedding, weights, k, default_weight, filter, candidates, ef_search, mode
+    )
+    return _weighted_results(await _afetch_all(statement, params, ef_search=ef_search))
+
+
+def _weighted_query(collection_name, embedding, weights, k, default_weight, filter, candidates, ef_search, mode):
+    params: Dict[str, Any] = {"embedding": to_vector_literal(embedding), "k": k, "default_weight": default_weight}
+    source = _chunk_source(collection_name, filter, params)
+    candidates = max(k, candidates or settings.weighted_search_candidates)
+    params["candidates"] = candidates
+    nearest_sql, ef_search = _nearest_chunks_sql(
+        source, "candidates", candidates, params, mode or settings.vector_search_mode,
+        max(ef_search or settings.hnsw_ef_search, candidates)
+    )
+
+    cases = []
+    for index, (document_type, weight) in enumerate(weights.items()):
+        params[f"type_{index}"] = document_type
+        params[f"weight_{index}"] = float(weight)
+        cases.append(f"WHEN :type_{index} THEN CAST(:weight_{index} AS float8)")
+    weight_sql = (
+        f"CASE cmetadata->>'document_type' {' '.join(cases)} ELSE CAST(:default_weight AS float8) END"
+        if cases else "CAST(:default_weight AS float8)"
+    )
+
+    # Ponderação sobre os vizinhos mais próximos encontrados pelo índice
+    statement = text(
+        f"SELECT id, document, cmetadata, similarity, weight, similarity * weight AS score FROM ("
+        f"SELECT id, document, cmetadata, 1 - distance AS similarity, {weight_sql} AS weight "
+        f"FROM ({nearest_sql}) nearest) scored "
+        f"ORDER BY score DESC LIMIT :k"
+    )
+    return statement, params, min(ef_search, HNSW_MAX_EF_SEARCH)
+
+
+def _weighted_results(rows) -> List[Tuple[Document, float, float, float]]:
+    return [
+        (
+            Document(id=row.id, page_content=row.document, metadata=row.cmetadata or {}),
+            float(row.score), float(row.similarity), float(row.weight)
+        )
+        for row in rows
+    ]
+
+
+def hybrid_search(
+    collection_name: str,
+    query: str,
+    embedding: List[float],
+    k: int = 4,
+    filter: Optional[Dict[str, Any]] = None,
+    candidates: int = settings.hybrid_candidates,
+    rrf_k: int = settings.hybrid_rrf_k,
+    ef_search: Optional[int] = None,
+    mode: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Busca híbrida: full-text em português (tsvector + GIN) e similaridade
+    vetorial, combinadas por reciprocal rank fusion em uma única consulta.
+
+    Cada lista contribui com até `candidates` chunks; o score de cada chunk
+    é a soma de 1 / (rrf_k + posição) nas listas em que aparece.
+
+    Args:
+        collection_name: Nome da coleção
+        query: Texto da consulta (sintaxe de websearch_to_tsquery: "frase exata", -termo, OR)
+        embedding: Vetor da consulta
+        k: Número de resultados
+        filter: Igualdade sobre o cmetadata, via @>
+        candidates: Tamanho de cada lista antes da fusão
+        rrf_k: Constante de suavização do RRF
+        ef_search: Tamanho da lista de candidatos do HNSW nesta consulta
+        mode: "hnsw" ou "binary" (padrão: VECTOR_SEARCH_MODE)
+
+    Returns:
+        Resultados ordenados pelo score, com as posições em cada lista
+        (None quando o chunk não aparece na lista)
+    """
+    statement, params, ef_search = _hybrid_query(
+        collection_name, query, embedding, k, filter, candidates, rrf_k, ef_search, mode
+    )
+    return _hybrid_results(_fetch_all(statement, params, ef_search=ef_search))
+
+
+async def ahybrid_search(
+    collection_name: str,
+    query: str,
+    embedding: List[float],
+    k: int = 4,
+    filter: Optional[Dict[str, Any]] = None,
+    candidates: int = settings.hybrid_candidates,
+    rrf_k: int = settings.hybrid_rrf_k,
+    ef_search: Optional[int] = None,
+    mode: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Versão assíncrona de hybrid_search"""
+    statement, params, ef_search = _hybrid_query(
+        collection_name, query, embedding, k, filter, candidates, rrf_k, ef_search, mode
+    )
+    return _hybrid_results(await _afetch_all(statement, params, ef_search=ef_search))
+
+
+def _hybrid_query(collection_name, query, embedding, k, filter, candidates, rrf_k, ef_search, mode):
+    params: Dict[str, Any] = {
+        "embedding": to_vector_literal(embedding),
+        "query": query,
+        "k": k,
+        "candidates": candidates,
+        "rrf_k": rrf_k,
+    }
+    source = _chunk_source(collection_name, filter, params)
+    # A lista do HNSW precisa cobrir os candidatos da metade vetorial do RRF
+    ef_search = min(max(ef_search or settings.hnsw_ef_search, candidates), HNSW_MAX_EF_SEARCH)
+    nearest_sql, ef_search = _nearest_chunks_sql(
+        source, "candidates", candidates, params, mode or settings.vector_search_mode, ef_search
+    )
+
+    statement = text(
+        f"WITH vector_ranked AS ("
+        f"SELECT id, row_number() OVER (ORDER BY distance) AS rank FROM ({nearest_sql}) nearest"
+        f"), keyword_ranked AS ("
+        f"SELECT id, row_number() OVER (ORDER BY text_rank DESC) AS rank FROM ("
+        f"SELECT e.id, ts_rank_cd(e.document_tsv, websearch_to_tsquery('{TEXT_SEARCH_CONFIG}', :query)) AS text_rank "
+        f"{source}AND e.document_tsv @@ websearch_to_tsquery('{TEXT_SEARCH_CONFIG}', :query) "
+        f"ORDER BY text_rank DESC LIMIT :candidates) matches"
+        f"), fused AS ("
+        f"SELECT COALESCE(v.id, t.id) AS id, v.rank AS vector_rank, t.rank AS keyword_rank, "
+        f"COALESCE(1.0 / (:rrf_k + v.rank), 0) + COALESCE(1.0 / (:rrf_k + t.rank), 0) AS score "
+        f"FROM vector_ranked v FULL OUTER JOIN keyword_ranked t ON v.id = t.id"
+        f") "
+        f"SELECT e.id, e.document, e.cmetadata, f.score, f.vector_rank, f.keyword_rank "
+        f"FROM fused f JOIN {EMBEDDING_TABLE} e ON e.id = f.id "
+        f"ORDER BY f.score DESC LIMIT :k"
+    )
+    return statement, params, ef_search
+
+
+def _hybrid_results(rows) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": row.id,
+            "content": row.document,
+            "metadata": row.cmetadata or {},
+            "score": float(row.score),
+            "vector_rank": row.vector_rank,
+            "keyword_rank": row.keyword_rank,
+        }
+        for row in rows
+    ]
+
+
+def _corpus_source(
+    collections: Optional[List[str]],
+    document_types: Optional[List[str]],
+    years: Optional[List[int]],
+    filter: Optional[Dict[str, Any]],
+    params: Dict[str, Any]
+) -> str:
+    """
+    Monta o FROM/WHERE dos chunks de todas as coleções, ligados ao primário
+    a que pertencem (parent_id nos secundários, doc_id nos primários).
+    """
+    conditions = [f"vector_dims(e.embedding) = {int(settings.embedding_dimensions)}"]
+    if collections:
+        conditions.append("c.name = ANY(:collections)")
+        params["collections"] = list(collections)
+    if document_types:
+        conditions.append("p.document_type = ANY(:document_types)")
+        params["document_types"] = list(document_types)
+    if years:
+        conditions.append("p.document_year = ANY(:years)")
+        params["years"] = [int(year) for year in years]
+    if filter:
+        conditions.append("e.cmetadata @> CAST(:filter AS jsonb)")
+        params["filter"] = json.dumps(filter)
+    return (
+        f"FROM {EMBEDDING_TABLE} e JOIN {COLLECTION_TABLE} c ON e.collection_id = c.uuid "
+        f"JOIN {PRIMARY_TABLE} p ON p.collection_name = c.name "
+        f"AND p.id = COALESCE(e.cmetadata->>'parent_id', e.cmetadata->>'doc_id')::int "
+        f"WHERE {' AND '.join(conditions)} "
+    )
+
+
+def corpus_search(
+    embedding: List[float],
+    k: int = 5,
+    chunks_per_document: int = 3,
+    collections: Optional[List[str]] = None,
+    document_types: Optional[List[str]] = None,
+    years: Optional[List[int]] = None,
+    filter: Optional[Dict[str, Any]] = None,
+    candidates: int = settings.corpus_search_candidates,
+    ef_search: Optional[int] = None,
+    mode: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Busca vetorial em todas as coleções com uma única consulta.
+
+    Os chunks de todas as MPVs estão na mesma tabela e o índice HNSW é
+    global, então a busca não abre um PGVector por coleção e o custo não
+    cresce com o número de coleções. Os `candidates` chunks mais próximos
+    são agrupados por documento primário: retornam os k primários com o
+    chunk mais próximo, cada um com até chunks_per_document chunks.
+
+    Args:
+        embedding: Vetor da consulta
+        k: Número de documentos primários
+        chunks_per_document: Chunks retornados por primário
+        collections: Restringe às coleções informadas
+        document_types: Restringe aos tipos de primário (ex.: ["MPV"])
+        years: Restringe aos anos dos primários
+        filter: Igualdade sobre o cmetadata dos chunks, via @> (ex.: {"hierarchy_level": 0})
+        candidates: Chunks avaliados antes do agrupamento
+        ef_search: Tamanho da lista de candidatos do HNSW (padrão: ao menos candidates)
+        mode: "hnsw" ou "binary" (padrão: VECTOR_SEARCH_MODE)
+
+    Returns:
+        Primários ordenados pela similaridade do melhor chunk, com seus chunks
+    """
+    statement, params, ef_search = _corpus_query(
+        embedding, k, chunks_per_document, collections, document_types, years, filter, candidates, ef_search, mode
+    )
+    return _corpus_results(_fetch_all(statement, params, ef_search=ef_search))
+
+
+async def acorpus_search(
+    embedding: List[float],
+    k: int = 5,
+    chunks_per_document: int = 3,
+    collections: Optional[List[str]] = None,
+    document_types: Optional[List[str]] = None,
+    years: Optional[List[int]] = None,
+    filter: Optional[Dict[str, Any]] = None,
+    candidates: int = settings.corpus_search_candidates,
+    ef_search: Optional[int] = None,
+    mode: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Versão assíncrona de corpus_search"""
+    statement, params, ef_search = _corpus_query(
+        embedding, k, chunks_per_document, collections, document_types, years, filter, candidates, ef_search, mode
+    )
+    return _corpus_results(await _afetch_all(statement, params, ef_search=ef_search))
+
+
+def _corpus_query(embedding, k, chunks_per_document, collections, document_types, years, filter, candidates, ef_search, mode):
+    candidates = max(candidates, k * chunks_per_document)
+    params: Dict[str, Any] = {
+        "embedding": to_vector_literal(embedding),
+        "k": k,
+        "candidates": candidates,
+        "chunks_per_document": chunks_per_document,
+    }
+    source = _corpus_source(collections, document_types, years, filter, params)
+    # Filtros são aplicados durante a varredura do HNSW: a lista precisa cobrir os candidatos
+    ef_search = min(max(ef_search or settings.hnsw_ef_search, candidates), HNSW_MAX_EF_SEARCH)
+    nearest_sql, ef_search = _nearest_chunks_sql(
+        source, "candidates", candidates, params, mode or settings.vector_search_mode, ef_search
+    )
+
+    statement = text(
+        f"WITH nearest AS ("
+        f"SELECT n.*, COALESCE(n.cmetadata->>'parent_id', n.cmetadata->>'doc_id')::int AS primary_id "
+        f"FROM ({nearest_sql}) n"
+        f"), ranked AS ("
+        f"SELECT nearest.*, row_number() OVER (PARTITION BY primary_id ORDER BY distance) AS chunk_rank "
+        f"FROM nearest"
+        f"), top_primaries AS ("
+        f"SELECT primary_id, distance AS best_distance FROM ranked WHERE chunk_rank = 1 "
+        f"ORDER BY best_distance LIMIT :k"
+        f") "
+        f"SELECT r.id, r.document, r.cmetadata, r.distance, t.primary_id, t.best_distance, "
+        f"p.document_name, p.document_type, p.document_number, p.document_year, p.collection_name "
+        f"FROM ranked r JOIN top_primaries t ON t.primary_id = r.primary_id "
+        f"JOIN {PRIMARY_TABLE} p ON p.id = r.primary_id "
+        f"WHERE r.chunk_rank <= :chunks_per_document "
+        f"ORDER BY t.best_distance, t.primary_id, r.chunk_rank"
+    )
+    return statement, params, ef_search
+
+
+def _corpus_results(rows) -> List[Dict[str, Any]]:
+    documents: Dict[int, Dict[str, Any]] = {}
+    for row in rows:
+        document = documents.get(row.primary_id)
+        if document is None:
+            document = documents[row.primary_id] = {
+                "primary_id": row.primary_id,
+                "document_name": row.document_name,
+                "document_type": row.document_type,
+                "document_number": row.document_number,
+                "document_year": row.document_year,
+                "collection_name": row.collection_name,
+                "score": 1 - float(row.best_distance),
+                "chunks": [],
+            }
+        document["chunks"].append({
+            "id": row.id,
+            "content": row.document,
+            "metadata": row.cmetadata or {},
+            "score": 1 - float(row.distance),
+        })
+    return list(documents.values())
+
+
+def insert_chunks(collection_name: str, chunks: List[Document], embeddings: List[List[float]]) -> int:
+    """
+    Grava os chunks de um documento com um único COPY na tabela de
+    embeddings (em vez de um INSERT por chunk). A coleção já deve existir
+    (criada pelo PGVector no registro); chunks sem id recebem um UUID.
+
+    Returns:
+        Número de chunks gravados
+    """
+    if not chunks:
+        return 0
+    if len(chunks) != len(embeddings):
+        raise ValueError(f"{len(chunks)} chunks para {len(embeddings)} embeddings")
+
+    with engine.begin() as conn:
+        collection_id = conn.execute(
+            text(f"SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :name"), {"name": collection_name}
+        ).scalar()
+        if collection_id is None:
+            raise ValueError(f"Coleção '{collection_name}' não encontrada")
+
+        # COPY em formato texto pela conexão psycopg da própria transação
+        cursor = conn.connection.driver_connection.cursor()
+        with cursor.copy(
+            f"COPY {EMBEDDING_TABLE} (id, collection_id, embedding, document, cmetadata) FROM STDIN"
+        ) as copy:
+            for chunk, embedding in zip(chunks, embeddings):
+                copy.write_row((
+                    chunk.id or str(uuid.uuid4()),
+                    str(collection_id),
+                    to_vector_literal(embedding),
+                    chunk.page_content,
+                    json.dumps(chunk.metadata),
+                ))
+        cursor.close()
+
+    return len(chunks)
+
+
+def delete_chunks(
+    collection_name: str,
+    doc_id: Optional[int] = None,
+    parent_id: Optional[int] = None,
+    include_secondaries: bool = False
+) -> int:
+    """
+    Remove chunks de uma coleção com um único DELETE (sem busca vetorial).
+
+    - doc_id sem parent_id: chunks do documento primário doc_id; com
+      include_secondaries, também os chunks de todos os seus secundários.
+    - doc_id com parent_id: chunks do secundário doc_id do primário parent_id.
+    - sem doc_id: todos os chunks da coleção.
+
+    Os IDs de primários e secundários vêm de tabelas diferentes e podem
+    coincidir na mesma coleção, por isso o parent_id sempre faz parte do filtro.
+
+    Returns:
+        Número de chunks removidos
+    """
+    statement, params = _delete_chunks_query(collection_name, doc_id, parent_id, include_secondaries)
+    with engine.begin() as conn:
+        return conn.execute(statement, params).rowcount
+
+
+async def adelete_chunks(
+    collection_name: str,
+    doc_id: Optional[int] = None,
+    parent_id: Optional[int] = None,
+    include_secondaries: bool = False
+) -> int:
+    """Versão assíncrona de delete_chunks"""
+    statement, params = _delete_chunks_query(collection_name, doc_id, parent_id, include_secondaries)
+    async with async_engine.begin() as conn:
+        return (await conn.execute(statement, params)).rowcount
+
+
+def _delete_chunks_query(collection_name, doc_id, parent_id, include_secondaries):
+    conditions = ["e.collection_id = c.uuid", "c.name = :collection_name"]
+    params = {"collection_name": collection_name}
+
+    if doc_id is not None:
+        params["doc_id"] = str(doc_id)
+        if parent_id is not None:
+            params["parent_id"] = str(parent_id)
+            conditions.append("e.cmetadata->>'doc_id' = :doc_id AND e.cmetadata->>'parent_id' = :parent_id")
+        elif include_secondaries:
+            conditions.append(
+                "((e.cmetadata->>'doc_id' = :doc_id AND e.cmetadata->>'parent_id' IS NULL)"
+                " OR e.cmetadata->>'parent_id' = :doc_id)"
+            )
+        else:
+            conditions.append("e.cmetadata->>'doc_id' = :doc_id AND e.cmetadata->>'parent_id' IS NULL")
+
+    statement = text(
+        f"DELETE FROM {EMBEDDING_TABLE} e USING {COLLECTION_TABLE} c WHERE " + " AND ".join(conditions)
+    )
+    return statement, params
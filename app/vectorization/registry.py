@@ -0,0 +1,55 @@
+import threading
+from typing import Dict, List
+from langchain_postgres import PGVector
+from app.db.session import engine
+from app.vectorization.embeddings import get_embeddings, EMBEDDING_DIMENSION
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class VectorStoreRegistry:
+    """
+    Registro de instâncias PGVector por nome de coleção.
+
+    Todas as instâncias usam o engine compartilhado do processo, de modo
+    que o vector store não abre pools de conexão próprios. A criação da
+    extensão, das tabelas e da coleção acontece apenas no primeiro acesso
+    a cada coleção.
+    """
+
+    def __init__(self):
+        self._stores: Dict[str, PGVector] = {}
+        self._lock = threading.Lock()
+
+    def get(self, collection_name: str) -> PGVector:
+        """Retorna o PGVector da coleção, criando-o no primeiro acesso"""
+        store = self._stores.get(collection_name)
+        if store is None:
+            with self._lock:
+                store = self._stores.get(collection_name)
+                if store is None:
+                    logger.info(f"Conectando vector store da coleção '{collection_name}'")
+                    store = PGVector(
+                        embeddings=get_embeddings(),
+                        connection=engine,
+                        collection_name=collection_name,
+                        distance_strategy="cosine",
+                        embedding_length=EMBEDDING_DIMENSION,
+                        use_jsonb=True
+                    )
+                    self._stores[collection_name] = store
+        return store
+
+    def discard(self, collection_name: str) -> None:
+        """Remove a coleção do registro (ex.: após apagar a coleção)"""
+        with self._lock:
+            self._stores.pop(collection_name, None)
+
+    def collections(self) -> List[str]:
+        """Lista as coleções com instância ativa no processo"""
+        return list(self._stores)
+
+
+# Instância única do registro para o processo
+vectorstore_registry = VectorStoreRegistry()
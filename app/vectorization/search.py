@@ -1,44 +1,101 @@
-from typing import List, Dict
-from datetime import datetime, timedelta
+from typing import Any, List, Dict, Optional
+from app.core.config import settings
+from app.vectorization.embeddings import get_embeddings
+from app.vectorization.queries import acorpus_search, ahybrid_search, hybrid_search
+from app.vectorization.search_cache import search_cache
 
 class SearchFilter:
-    def __init__(self, collection_name: str):
+    # Filtros padrão: documentos principais (MPV) apenas
+    DEFAULT_FILTERS = {
+        "document_type": "MPV",  # Prioritize MPV documents
+        "hierarchy_level": 0,    # Main documents only
+    }
+
+    def __init__(self, collection_name: str, default_filters: Optional[Dict] = None):
         self.collection_name = collection_name
-        
+        self.default_filters = self.DEFAULT_FILTERS if default_filters is None else default_filters
+
     def apply_filters(self, query: str, filters: Dict = None) -> Dict:
-        base_filters = {
-            "document_type": "MPV",  # Prioritize MPV documents
-            "hierarchy_level": 0,    # Main documents only
-        }
-        
+        """Combina os filtros padrão com os da consulta (igualdade sobre os metadados dos chunks)"""
+        base_filters = dict(self.default_filters)
+
         if filters:
-            base_filters.update(filters)
-            
-        # Add temporal filters if needed
-        if "time_range" in filters:
-            base_filters["timestamp"] = {
-                "$gte": datetime.now() - timedelta(days=filters["time_range"])
-            }
-            
+            base_filters.update({key: value for key, value in filters.items() if value is not None})
+
         return base_filters
 
 class HybridSearch:
-    def __init__(self, vector_store, search_filter: SearchFilter):
-        self.vector_store = vector_store
+    """
+    Busca híbrida (full-text em português + similaridade vetorial) em uma
+    coleção, com as duas listas combinadas por reciprocal rank fusion no
+    próprio Postgres.
+    """
+
+    def __init__(self, search_filter: SearchFilter):
+        self.embeddings = get_embeddings()
         self.search_filter = search_filter
-        
-    def search(self, query: str, k: int = 4, filters: Dict = None):
+
+    def _cache_params(self, query: str, k: int, filters: Dict, candidates: int) -> Dict[str, Any]:
+        # O texto entra na chave: a parte full-text depende dele, não só do embedding
+        return {"search": "hybrid", "query": " ".join(query.split()), "k": k, "filters": filters, "candidates": candidates}
+
+    def search(self, query: str, k: int = 4, filters: Dict = None, candidates: int = settings.hybrid_candidates) -> List[Dict[str, Any]]:
         # Apply pre-search filters
         search_filters = self.search_filter.apply_filters(query, filters)
-        
-        # Perform hybrid search (vector + keyword)
-        vector_results = self.vector_store.similarity_search(
-            query,
+        collection_name = self.search_filter.collection_name
+        embedding = self.embeddings.embed_query(query)
+        candidates = max(candidates, k)
+
+        # Vector + keyword ranking fused in a single query
+        return search_cache.get_or_compute(
+            collection_name,
+            self._cache_params(query, k, search_filters, candidates),
+            embedding,
+            lambda: hybrid_search(collection_name, query, embedding, k=k, filter=search_filters, candidates=candidates)
+        )
+
+    async def asearch(self, query: str, k: int = 4, filters: Dict = None, candidates: int = settings.hybrid_candidates) -> List[Dict[str, Any]]:
+        """Versão assíncrona de search (consulta pelo engine assíncrono)"""
+        search_filters = self.search_filter.apply_filters(query, filters)
+        collection_name = self.search_filter.collection_name
+        embedding = await self.embeddings.aembed_query(query)
+        candidates = max(candidates, k)
+
+        return await search_cache.aget_or_compute(
+            collection_name,
+            self._cache_params(query, k, search_filters, candidates),
+            embedding,
+            lambda: ahybrid_search(collection_name, query, embedding, k=k, filter=search_filters, candidates=candidates)
+        )
+
+
+class CorpusSearch:
+    """
+    Busca vetorial em todas as coleções (todas as MPVs) com uma única
+    consulta sobre a tabela de embeddings, com resultados agrupados por
+    documento primário.
+    """
+
+    def __init__(self):
+        self.embeddings = get_embeddings()
+
+    async def asearch(
+        self,
+        query: str,
+        k: int = 5,
+        chunks_per_document: int = 3,
+        collections: Optional[List[str]] = None,
+        document_types: Optional[List[str]] = None,
+        years: Optional[List[int]] = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        embedding = await self.embeddings.aembed_query(query)
+        return await acorpus_search(
+            embedding,
             k=k,
-            filter=search_filters
+            chunks_per_document=chunks_per_document,
+            collections=collections,
+            document_types=document_types,
+            years=years,
+            filter=filter
         )
-        
-        # Apply post-search reranking
-        reranked_results = self._rerank_results(vector_results, query)
-        
-        return reranked_results[:k]
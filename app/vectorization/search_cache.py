@@ -0,0 +1,218 @@
+import copy
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import numpy as np
+from cachetools import TTLCache
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from app.core.config import settings
+from app.db.models.collection_generation import CollectionGenerationModel
+from app.db.session import AsyncSessionLocal, SessionLocal
+import logging
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+@dataclass
+class _Entry:
+    """Resultado em cache, com a geração da coleção em que foi calculado"""
+    generation: int
+    vector: np.ndarray  # Embedding normalizado da consulta
+    value: Any
+
+
+def _normalize(embedding: List[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SearchResultCache:
+    """
+    Cache em memória de resultados de busca por coleção.
+
+    As entradas são agrupadas pela coleção e pelos parâmetros da busca
+    (tipo, filtros, k...). Dentro do grupo, uma consulta reaproveita o
+    resultado de outra cujo embedding tenha similaridade de cosseno igual
+    ou acima de similarity_threshold (1.0 = apenas consultas idênticas).
+
+    A validade vem da tabela collection_generations: a ingestão e a remoção
+    de chunks incrementam a geração da coleção (bump), e entradas calculadas
+    em outra geração são descartadas, inclusive entre processos (API e workers).
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        max_entries: int = 1024,
+        ttl_seconds: int = 600,
+        similarity_threshold: float = 0.98
+    ):
+        self.enabled = enabled
+        self.similarity_threshold = similarity_threshold
+        self._entries = TTLCache(maxsize=max_entries, ttl=ttl_seconds)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "similar_hits": 0, "misses": 0}
+
+    @staticmethod
+    def make_key(collection_name: str, params: Dict[str, Any]) -> str:
+        """Monta a chave do grupo de entradas: coleção + parâmetros da busca"""
+        payload = json.dumps([collection_name, params], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # ==================== GERAÇÕES ====================
+
+    @staticmethod
+    def _generation_query(collection_name: str):
+        return select(CollectionGenerationModel.generation).where(
+            CollectionGenerationModel.collection_name == collection_name
+        )
+
+    @staticmethod
+    def _bump_statement(collection_name: str):
+        statement = insert(CollectionGenerationModel).values(collection_name=collection_name, generation=1)
+        return statement.on_conflict_do_update(
+            index_elements=[CollectionGenerationModel.collection_name],
+            set_={"generation": CollectionGenerationModel.generation + 1}
+        )
+
+    def generation(self, collection_name: str) -> Optional[int]:
+        """Geração atual da coleção (None se não for possível consultá-la)"""
+        try:
+            with SessionLocal() as session:
+                return session.execute(self._generation_query(collection_name)).scalar() or 0
+        except Exception as e:
+            logger.error(f"Erro ao consultar geração da coleção '{collection_name}': {e}")
+            return None
+
+    async def ageneration(self, collection_name: str) -> Optional[int]:
+        """Versão assíncrona de generation"""
+        try:
+            async with AsyncSessionLocal() as session:
+                return (await session.execute(self._generation_query(collection_name))).scalar() or 0
+        except Exception as e:
+            logger.error(f"Erro ao consultar geração da coleção '{collection_name}': {e}")
+            return None
+
+    def bump(self, collection_name: str) -> None:
+        """Incrementa a geração da coleção, invalidando os resultados em cache"""
+        try:
+            with SessionLocal() as session:
+                session.execute(self._bump_statement(collection_name))
+                session.commit()
+        except Exception as e:
+            logger.error(f"Erro ao incrementar geração da coleção '{collection_name}': {e}")
+
+    async def abump(self, collection_name: str) -> None:
+        """Versão assíncrona de bump"""
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(self._bump_statement(collection_name))
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Erro ao incrementar geração da coleção '{collection_name}': {e}")
+
+    # ==================== ENTRADAS ====================
+
+    def _get(self, key: str, vector: np.ndarray, generation: int) -> Any:
+        exact_key = (key, self._vector_key(vector))
+        best_key, best_similarity = None, self.similarity_threshold
+        with self._lock:
+            # Percorre apenas as chaves (sem alterar a ordem do LRU) e lê as entradas do grupo
+            for entry_key in [entry_key for entry_key in self._entries.keys() if entry_key[0] == key]:
+                entry = self._entries.get(entry_key)
+                if entry is None:
+                    continue
+                if entry.generation != generation:
+                    # Calculada antes de uma escrita na coleção
+                    del self._entries[entry_key]
+                    continue
+                similarity = float(np.dot(entry.vector, vector))
+                if similarity >= best_similarity:
+                    best_key, best_similarity = entry_key, similarity
+
+            if best_key is None:
+                self._stats["misses"] += 1
+                return _MISSING
+
+            value = self._entries[best_key].value  # Leitura por último: entrada mais recente no LRU
+            self._stats["hits" if best_key == exact_key else "similar_hits"] += 1
+        # Cópia para que o chamador não altere a entrada em memória
+        return copy.deepcopy(value)
+
+    def _set(self, key: str, vector: np.ndarray, generation: int, value: Any) -> None:
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[(key, self._vector_key(vector))] = _Entry(generation, vector, value)
+
+    @staticmethod
+    def _vector_key(vector: np.ndarray) -> str:
+        return hashlib.sha256(vector.tobytes()).hexdigest()
+
+    # ==================== API ====================
+
+    def get_or_compute(
+        self,
+        collection_name: str,
+        params: Dict[str, Any],
+        embedding: List[float],
+        compute: Callable[[], Any]
+    ) -> Any:
+        """Retorna o resultado em cache ou executa compute() e o armazena"""
+        if not self.enabled:
+            return compute()
+
+        # Geração lida antes da busca: uma escrita concorrente invalida o resultado
+        generation = self.generation(collection_name)
+        if generation is None:
+            return compute()
+
+        key = self.make_key(collection_name, params)
+        vector = _normalize(embedding)
+        value = self._get(key, vector, generation)
+        if value is _MISSING:
+            value = compute()
+            self._set(key, vector, generation, value)
+        return value
+
+    async def aget_or_compute(
+        self,
+        collection_name: str,
+        params: Dict[str, Any],
+        embedding: List[float],
+        compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Versão assíncrona de get_or_compute (consulta à geração pelo engine assíncrono)"""
+        if not self.enabled:
+            return await compute()
+
+        generation = await self.ageneration(collection_name)
+        if generation is None:
+            return await compute()
+
+        key = self.make_key(collection_name, params)
+        vector = _normalize(embedding)
+        value = self._get(key, vector, generation)
+        if value is _MISSING:
+            value = await compute()
+            self._set(key, vector, generation, value)
+        return value
+
+    def get_stats(self) -> Dict[str, int]:
+        """Retorna os contadores de hits (exatos e por similaridade) e misses"""
+        with self._lock:
+            return dict(self._stats)
+
+
+# Instância única do cache para o processo
+search_cache = SearchResultCache(
+    enabled=settings.search_cache_enabled,
+    max_entries=settings.search_cache_size,
+    ttl_seconds=settings.search_cache_ttl_seconds,
+    similarity_threshold=settings.search_cache_similarity_threshold
+)
@@ -1,37 +1,94 @@
 # src/app/vectorization/vector_store.py
-from langchain_openai import OpenAIEmbeddings
-from langchain_postgres.vectorstores import PGVector
-from app.core.config import settings
+from typing import Dict, List
+from langchain_core.documents import Document
+from app.vectorization.embeddings import get_embeddings
+from app.vectorization.registry import vectorstore_registry
+from app.vectorization.queries import aweighted_similarity_search, weighted_similarity_search
+from app.vectorization.search_cache import search_cache
 
 class WeightedVectorStore:
+    # Pesos padrão por tipo de documento
+    DEFAULT_WEIGHTS = {
+        "MPV": 1.0,  # Base weight
+        "EMENDA": 0.6,  # Lower weight for amendments
+    }
+
     def __init__(self, collection_name: str):
-        self.embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
-        self.vector_store = PGVector(
-            embeddings=self.embeddings,
-            connection=settings.database_url,
-            collection_name=collection_name,
-            distance_strategy="cosine",
-            use_jsonb=True
-        )
-        
-    def similarity_search(self, query: str, k: int = 4, document_type: str = None):
-        # Base search results
-        results = self.vector_store.similarity_search(query, k=k*2)  # Get more results for reranking
-        
-        # Apply weights based on document type
-        weights = {
-            "MPV": 1.0,  # Base weight
-            "EMENDA": 0.6,  # Lower weight for amendments
+        self.embeddings = get_embeddings()
+        self.collection_name = collection_name
+
+    @property
+    def vector_store(self):
+        """PGVector da coleção, obtido do registro compartilhado (a busca usa SQL direto)"""
+        return vectorstore_registry.get(self.collection_name)
+
+    def _search(self, embedding: List[float], k: int, document_type: str = None, weights: Dict[str, float] = None, default_weight: float = 1.0) -> List[Document]:
+        """Ranking ponderado calculado no banco: uma consulta, exatamente k linhas"""
+        return self._to_documents(weighted_similarity_search(
+            self.collection_name, embedding, **self._query_args(k, document_type, weights, default_weight)
+        ))
+
+    async def _asearch(self, embedding: List[float], k: int, document_type: str = None, weights: Dict[str, float] = None, default_weight: float = 1.0) -> List[Document]:
+        return self._to_documents(await aweighted_similarity_search(
+            self.collection_name, embedding, **self._query_args(k, document_type, weights, default_weight)
+        ))
+
+    def _query_args(self, k: int, document_type: str, weights: Dict[str, float], default_weight: float) -> Dict:
+        return {
+            "weights": self.DEFAULT_WEIGHTS if weights is None else weights,
+            "k": k,
+            "default_weight": default_weight,
+            "filter": {"document_type": document_type} if document_type else None,
         }
-        
-        # Rerank results with weights
-        weighted_results = []
-        for doc in results:
-            doc_type = doc.metadata.get("document_type", "MPV")
-            weight = weights.get(doc_type, 1.0)
-            doc.metadata["relevance_score"] = doc.metadata.get("score", 0) * weight
-            weighted_results.append(doc)
-            
-        # Sort by weighted score and return top k
-        weighted_results.sort(key=lambda x: x.metadata["relevance_score"], reverse=True)
-        return weighted_results[:k]
\ No newline at end of file
+
+    @staticmethod
+    def _to_documents(results) -> List[Document]:
+        documents = []
+        for doc, score, similarity, weight in results:
+            doc.metadata["relevance_score"] = score
+            doc.metadata["similarity"] = similarity
+            doc.metadata["weight"] = weight
+            documents.append(doc)
+        return documents
+
+    def _cache_params(self, k: int, document_type: str, weights: Dict[str, float], default_weight: float) -> Dict:
+        # Busca puramente vetorial: consultas com embeddings próximos reaproveitam o resultado
+        return {
+            "search": "weighted",
+            "k": k,
+            "document_type": document_type,
+            "weights": self.DEFAULT_WEIGHTS if weights is None else weights,
+            "default_weight": default_weight,
+        }
+
+    def similarity_search(self, query: str, k: int = 4, document_type: str = None, weights: Dict[str, float] = None, default_weight: float = 1.0) -> List[Document]:
+        """
+        Busca os k chunks com maior similaridade ponderada pelo tipo do documento.
+
+        Args:
+            query: Texto da consulta
+            k: Número de resultados
+            document_type: Restringe a busca a um tipo de documento
+            weights: Peso de cada document_type (padrão: DEFAULT_WEIGHTS)
+            default_weight: Peso dos tipos ausentes em weights
+
+        Returns:
+            Documentos com relevance_score (similaridade x peso), similarity e weight nos metadados
+        """
+        embedding = self.embeddings.embed_query(query)
+        return search_cache.get_or_compute(
+            self.collection_name,
+            self._cache_params(k, document_type, weights, default_weight),
+            embedding,
+            lambda: self._search(embedding, k, document_type, weights, default_weight)
+        )
+
+    async def asimilarity_search(self, query: str, k: int = 4, document_type: str = None, weights: Dict[str, float] = None, default_weight: float = 1.0) -> List[Document]:
+        """Versão assíncrona de similarity_search (consulta pelo engine assíncrono)"""
+        embedding = await self.embeddings.aembed_query(query)
+        return await search_cache.aget_or_compute(
+            self.collection_name,
+            self._cache_params(k, document_type, weights, default_weight),
+            embedding,
+            lambda: self._asearch(embedding, k, document_type, weights, default_weight)
+        )
@@ -0,0 +1,132 @@
+"""
+Worker da fila de ingestão assíncrona.
+
+Uso:
+    python -m app.worker [--concurrency N]
+
+Cada processo executa N jobs simultâneos; a vazão escala com o número de
+processos (em uma ou várias máquinas apontando para o mesmo banco).
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import tempfile
+from typing import Any, Dict
+from fastapi.encoders import jsonable_encoder
+from app.core.config import settings
+from app.ingestion.convertor import converter
+from app.service.ingestion import INGESTORS, IngestionError
+from app.service.job_queue import job_queue
+
+logger = logging.getLogger(__name__)
+
+
+def _write_payload(payload: bytes) -> str:
+    """Grava o conteúdo do job em um arquivo temporário"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
+        temp_file.write(payload)
+        return temp_file.name
+
+
+async def _keep_alive(job_id: str, worker_id: str) -> None:
+    """Renova o lock do job enquanto ele estiver em execução"""
+    interval = max(settings.job_lock_timeout_seconds / 3, 1)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(job_queue.heartbeat, job_id, worker_id)
+        except Exception as e:
+            logger.error(f"Erro ao renovar lock do job {job_id}: {e}")
+
+
+async def process_job(job: Dict[str, Any], worker_id: str) -> None:
+    """Executa o workflow de ingestão de um job reservado"""
+    job_id = job["id"]
+    logger.info(f"Processando job {job_id} ({job['kind']}, tentativa {job['attempts']})")
+
+    async def on_node(node_name: str) -> None:
+        await asyncio.to_thread(job_queue.heartbeat, job_id, worker_id, node_name)
+
+    path = await asyncio.to_thread(_write_payload, job["payload"])
+    keep_alive = asyncio.create_task(_keep_alive(job_id, worker_id))
+    try:
+        # Sem sessão compartilhada: cada etapa da ingestão abre (e fecha) a sua,
+        # então jobs simultâneos não retêm conexões ociosas em transação
+        result = await INGESTORS[job["kind"]](
+            job["params"],
+            filename=job["filename"],
+            content_hash=job["content_hash"],
+            force_reprocess=job["force_reprocess"],
+            file_path=path,
+            on_node=on_node
+        )
+        await asyncio.to_thread(job_queue.complete, job_id, worker_id, jsonable_encoder(result))
+        logger.info(f"Job {job_id} concluído")
+    except IngestionError as e:
+        # Erros do cliente (ex.: primário inexistente) não são repetidos
+        await asyncio.to_thread(
+            job_queue.fail, job_id, worker_id, e.detail, job["attempts"], e.status_code >= 500
+        )
+    except Exception as e:
+        await asyncio.to_thread(job_queue.fail, job_id, worker_id, str(e), job["attempts"])
+    finally:
+        keep_alive.cancel()
+        try:
+            os.unlink(path)
+        except Exception as e:
+            logger.warning(f"Não foi possível deletar arquivo temporário {path}: {e}")
+
+
+async def worker_loop(worker_id: str, stop: asyncio.Event) -> None:
+    """Reserva e processa jobs até receber o sinal de parada"""
+    while not stop.is_set():
+        try:
+            job = await asyncio.to_thread(job_queue.claim, worker_id)
+        except Exception as e:
+            logger.error(f"Erro ao reservar job: {e}")
+            job = None
+
+        if job is None:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.job_poll_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        await process_job(job, worker_id)
+
+
+async def run_worker(concurrency: int) -> None:
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stop = asyncio.Event()
+
+    # Parada graciosa: os jobs em andamento terminam antes do processo sair
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    logger.info(f"Worker {worker_id} iniciado com {concurrency} jobs simultâneos")
+    try:
+        await asyncio.gather(*(worker_loop(worker_id, stop) for _ in range(concurrency)))
+    finally:
+        converter.shutdown()
+    logger.info(f"Worker {worker_id} encerrado")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Worker da fila de ingestão de documentos")
+    parser.add_argument(
+        "--concurrency", type=int, default=settings.job_worker_concurrency,
+        help="Número de jobs processados simultaneamente por este processo"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    asyncio.run(run_worker(args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
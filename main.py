@@ -1,11 +1,36 @@
 # src/app/main.py
+import asyncio
+import sys
+from contextlib import asynccontextmanager
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import documents
 from app.api import subjects
+from app.api import metrics
+from app.api import search
+from app.ingestion.convertor import converter
+from app.vectorization.embeddings import ensure_embedding_dimension
+from app.db.migrate import check_schema
+from app.db.session import async_engine
+
+# O psycopg assíncrono não funciona com o ProactorEventLoop (padrão no Windows)
+if sys.platform == "win32":
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Verifica a dimensão dos embeddings uma única vez, na subida do processo
+    await asyncio.to_thread(ensure_embedding_dimension)
+    # Apenas verifica o schema: colunas e índices são criados por `python -m app.db.migrate`
+    await asyncio.to_thread(check_schema)
+    yield
+    # Encerra o pool de processos da extração de PDFs
+    converter.shutdown()
+    await async_engine.dispose()
 
 app = FastAPI(
+    lifespan=lifespan,
     title="Vector Service",
     version="1.0.0",
     description="Micro-serviço para ingestão, vetorização e sumarização de documentos",
@@ -24,6 +49,8 @@ app.add_middleware(
 # Registrar rotas
 app.include_router(documents.router)
 app.include_router(subjects.router)
+app.include_router(metrics.router)
+app.include_router(search.router)
 
 if __name__ == "__main__":
     # Configurações específicas para Windows